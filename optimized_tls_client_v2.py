@@ -17,37 +17,49 @@ import sys
 import os
 import itertools
 
+from pow_affinity import available_cpu_count
+from pow_control import ControlBlock
+from pow_engine import (NonceEnumerator, PrefixHasher, difficulty_limit, plan_suffix, suffix_length,
+                        verify_suffix)
+from tls_line_reader import LineReader
+from tls_responses import ResponseTable
+from tls_session_cache import client_context, session_reused
+
 # Global function for multiprocessing worker (must be at module level)
-def pow_worker_function(authdata, difficulty, worker_id, result_queue, stop_event, stats_counter, valid_chars):
+def pow_worker_function(authdata, difficulty, worker_id, control, num_workers):
     """Optimized worker function for proof-of-work calculation"""
-    target = '0' * int(difficulty)
+    limit = difficulty_limit(difficulty)
     local_counter = 0
     
-    # Each worker starts with different random seed to avoid overlap
-    local_random = secrets.SystemRandom(worker_id)
+    # Each worker walks its own disjoint slice of the nonce space, at the
+    # suffix length planned for this authdata and difficulty
+    nonces = NonceEnumerator.partition(worker_id, num_workers, suffix_length(authdata, difficulty))
     
-    while not stop_event.is_set():
-        # Generate candidates more efficiently
-        suffix_length = local_random.randint(4, 8)
-        suffix = ''.join(local_random.choice(valid_chars) for _ in range(suffix_length))
-        
-        # Optimized hash calculation
-        combined = authdata + suffix
-        hasher = hashlib.sha1()
-        hasher.update(combined.encode('utf-8'))
-        cksum = hasher.hexdigest()
+    # Absorb authdata once; each candidate copies the midstate
+    root = PrefixHasher(authdata)
+    
+    for head, tails in nonces.blocks():
+        # Plain shared-memory read, no IPC
+        if control.is_set():
+            return
         
-        local_counter += 1
+        # Absorb the nonce head once, vary only the last character
+        new_hasher = root.extend(head).copy
         
-        if cksum.startswith(target):
-            result_queue.put((suffix, local_counter))
-            stop_event.set()
-            return
+        for tail in tails:
+            hasher = new_hasher()
+            hasher.update(tail)
+            digest = hasher.digest()
+            
+            if digest < limit:
+                position = tails.index(tail) + 1
+                control.add_hashes(worker_id, position)
+                control.post_winner(worker_id, (head + tail).decode('ascii'), local_counter + position)
+                return
         
-        # Update stats every 50000 iterations
-        if local_counter % 50000 == 0:
-            with stats_counter.get_lock():
-                stats_counter.value += 50000
+        # Exact count in this worker's own counter slot
+        local_counter += len(tails)
+        control.add_hashes(worker_id, len(tails))
 
 class OptimizedTLSClient:
     def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None):
@@ -56,6 +68,8 @@ class OptimizedTLSClient:
         self.cert_path = cert_path
         self.key_path = key_path
         self.conn = None
+        self.reader = None
+        self.tls_cache = None
         self.authdata = ""
         
         # Optimized character set for random string generation
@@ -71,24 +85,24 @@ class OptimizedTLSClient:
             'country': 'India',
             'address_lines': ['Whitefield', 'Benguluru', 'Karnataka', '560066']
         }
+        
+        # Response bytes per command, compiled once from personal_info
+        self.responses = ResponseTable(self.personal_info)
     
     def tls_connect(self):
         """Establish TLS connection with client certificates"""
         try:
-            # Create SSL context
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
+            # Process-wide SSL context with the client certificate (tls_session_cache.py)
+            self.tls_cache = client_context(self.cert_path, self.key_path)
             
-            # Load client certificate and key if provided
-            if self.cert_path and self.key_path:
-                context.load_cert_chain(self.cert_path, self.key_path)
-            
-            # Create socket and wrap with SSL
+            # Create socket and wrap with SSL, resuming a stored session if any
             sock = socket.create_connection((self.host, self.port), timeout=30)
-            self.conn = context.wrap_socket(sock, server_hostname=self.host)
+            self.conn = self.tls_cache.wrap_socket(sock, self.host, self.port)
+            self.reader = LineReader(self.conn)
             
-            print(f"Connected to {self.host}:{self.port}")
+            resumed = session_reused(self.conn)
+            print(f"Connected to {self.host}:{self.port} "
+                  f"({'resumed TLS session' if resumed else 'full TLS handshake'})")
             return True
             
         except Exception as e:
@@ -98,23 +112,19 @@ class OptimizedTLSClient:
     def read_line(self):
         """Read a line from the connection"""
         try:
-            data = b''
-            while True:
-                chunk = self.conn.recv(1)
-                if not chunk:
-                    break
-                data += chunk
-                if chunk == b'\n':
-                    break
-            return data.decode('utf-8').strip()
+            return self.reader.readline().decode('utf-8').strip()
         except Exception as e:
             print(f"Read error: {e}")
             return ""
     
     def write_line(self, data):
         """Write a line to the connection"""
+        return self.write_bytes((data + '\n').encode('utf-8'))
+    
+    def write_bytes(self, payload):
+        """Write an encoded, newline-terminated line to the connection"""
         try:
-            self.conn.sendall((data + '\n').encode('utf-8'))
+            self.conn.sendall(payload)
             return True
         except Exception as e:
             print(f"Write error: {e}")
@@ -138,36 +148,41 @@ class OptimizedTLSClient:
         """Optimized SHA1 hash calculation"""
         return hashlib.sha1(data.encode('utf-8')).hexdigest()
     
-    def pow_worker_threaded(self, authdata, difficulty, worker_id, result_queue, stop_event, stats_counter):
+    def pow_worker_threaded(self, authdata, difficulty, worker_id, control,
+                            num_workers=1):
         """Threaded worker function for proof-of-work calculation"""
-        target = '0' * int(difficulty)
+        limit = difficulty_limit(difficulty)
         local_counter = 0
         
-        # Each worker starts with different random seed to avoid overlap
-        local_random = secrets.SystemRandom(worker_id)
+        # Each worker walks its own disjoint slice of the nonce space, at the
+        # suffix length planned for this authdata and difficulty
+        nonces = NonceEnumerator.partition(worker_id, num_workers, suffix_length(authdata, difficulty))
         
-        while not stop_event.is_set():
-            # Generate candidates more efficiently
-            suffix_length = local_random.randint(4, 8)
-            suffix = ''.join(local_random.choice(self.valid_chars) for _ in range(suffix_length))
-            
-            # Optimized hash calculation
-            combined = authdata + suffix
-            hasher = hashlib.sha1()
-            hasher.update(combined.encode('utf-8'))
-            cksum = hasher.hexdigest()
+        # Absorb authdata once; each candidate copies the midstate
+        root = PrefixHasher(authdata)
+        
+        for head, tails in nonces.blocks():
+            # Plain shared-memory read, no IPC
+            if control.is_set():
+                return
             
-            local_counter += 1
+            # Absorb the nonce head once, vary only the last character
+            new_hasher = root.extend(head).copy
             
-            if cksum.startswith(target):
-                result_queue.put((suffix, local_counter))
-                stop_event.set()
-                return
+            for tail in tails:
+                hasher = new_hasher()
+                hasher.update(tail)
+                digest = hasher.digest()
+                
+                if digest < limit:
+                    position = tails.index(tail) + 1
+                    control.add_hashes(worker_id, position)
+                    control.post_winner(worker_id, (head + tail).decode('ascii'), local_counter + position)
+                    return
             
-            # Update stats every 50000 iterations
-            if local_counter % 50000 == 0:
-                with stats_counter.get_lock():
-                    stats_counter.value += 50000
+            # Exact count in this worker's own counter slot
+            local_counter += len(tails)
+            control.add_hashes(worker_id, len(tails))
     
     def solve_proof_of_work_optimized(self, authdata, difficulty):
         """Optimized proof-of-work solver using multiprocessing and threading fallback"""
@@ -175,7 +190,7 @@ class OptimizedTLSClient:
         start_time = time.time()
         
         # Use all available CPU cores
-        cpu_count = multiprocessing.cpu_count()
+        cpu_count = available_cpu_count()
         print(f"CPU cores available: {cpu_count}")
         
         # Try multiprocessing first, fall back to threading if it fails
@@ -190,33 +205,27 @@ class OptimizedTLSClient:
         num_workers = cpu_count
         print(f"Using {num_workers} processes for proof-of-work")
         
-        # Shared variables for inter-process communication
-        manager = multiprocessing.Manager()
-        result_queue = manager.Queue()
-        stop_event = manager.Event()
-        stats_counter = manager.Value('i', 0)
+        # Shared-memory stop word, winner slot and per-worker counters
+        control = ControlBlock(num_workers)
         
         # Start worker processes
         processes = []
         for i in range(num_workers):
             p = multiprocessing.Process(
                 target=pow_worker_function,
-                args=(authdata, difficulty, i, result_queue, stop_event, stats_counter, self.valid_chars)
+                args=(authdata, difficulty, i, control, num_workers)
             )
             p.start()
             processes.append(p)
         
-        return self._monitor_and_collect_result(start_time, stop_event, stats_counter, result_queue, processes, authdata, difficulty)
+        return self._monitor_and_collect_result(start_time, control, processes, authdata, difficulty)
     
     def _solve_with_threading(self, authdata, difficulty, num_threads, start_time):
         """Solve using threading"""
         print(f"Using {num_threads} threads for proof-of-work")
         
-        # Shared variables for threading
-        result_queue = []
-        stop_event = threading.Event()
-        stats_counter = threading.Lock()
-        stats_counter.value = 0
+        # Same control block as the process workers; threads share it directly
+        control = ControlBlock(num_threads)
         
         # Start worker threads
         threads = []
@@ -224,7 +233,7 @@ class OptimizedTLSClient:
             for i in range(num_threads):
                 future = executor.submit(
                     self.pow_worker_threaded,
-                    authdata, difficulty, i, result_queue, stop_event, stats_counter
+                    authdata, difficulty, i, control, num_threads
                 )
                 threads.append(future)
             
@@ -232,10 +241,9 @@ class OptimizedTLSClient:
             last_stats_time = start_time
             last_count = 0
             
-            while not stop_event.is_set():
-                time.sleep(1)
+            while not control.wait(1):
                 current_time = time.time()
-                current_count = getattr(stats_counter, 'value', 0)
+                current_count = control.total_hashes()
                 
                 if current_time - last_stats_time >= 10:
                     rate = (current_count - last_count) / (current_time - last_stats_time)
@@ -243,21 +251,18 @@ class OptimizedTLSClient:
                     print(f"Progress: {current_count:,} hashes in {elapsed:.1f}s (rate: {rate:,.0f} H/s)")
                     last_stats_time = current_time
                     last_count = current_count
-                
-                if result_queue:
-                    break
         
-        if result_queue:
-            solution, hash_count = result_queue[0]
+        winner = control.winner()
+        if winner:
+            solution = winner[0]
+            hash_count = control.total_hashes()
             elapsed = time.time() - start_time
             rate = hash_count / elapsed if elapsed > 0 else 0
             print(f"Proof-of-work solved in {elapsed:.2f} seconds")
             print(f"Total hashes: {hash_count:,} (rate: {rate:,.0f} H/s)")
             
             # Verify solution
-            verification_hash = self.sha1_hash_optimized(authdata + solution)
-            target = '0' * int(difficulty)
-            if verification_hash.startswith(target):
+            if verify_suffix(authdata, solution, difficulty):
                 print(f"Solution verified: {solution}")
                 return solution
             else:
@@ -265,16 +270,15 @@ class OptimizedTLSClient:
         
         return None
     
-    def _monitor_and_collect_result(self, start_time, stop_event, stats_counter, result_queue, processes, authdata, difficulty):
+    def _monitor_and_collect_result(self, start_time, control, processes, authdata, difficulty):
         """Monitor progress and collect results"""
         last_stats_time = start_time
         last_count = 0
         
         try:
-            while not stop_event.is_set():
-                time.sleep(1)
+            while not control.wait(1):
                 current_time = time.time()
-                current_count = stats_counter.value
+                current_count = control.total_hashes()
                 
                 if current_time - last_stats_time >= 10:
                     rate = (current_count - last_count) / (current_time - last_stats_time)
@@ -282,13 +286,10 @@ class OptimizedTLSClient:
                     print(f"Progress: {current_count:,} hashes in {elapsed:.1f}s (rate: {rate:,.0f} H/s)")
                     last_stats_time = current_time
                     last_count = current_count
-                
-                if not result_queue.empty():
-                    break
         
         except KeyboardInterrupt:
             print("\nStopping workers...")
-            stop_event.set()
+            control.set()
         
         # Wait for all processes to finish
         for p in processes:
@@ -296,17 +297,17 @@ class OptimizedTLSClient:
             if p.is_alive():
                 p.terminate()
         
-        if not result_queue.empty():
-            solution, hash_count = result_queue.get()
+        winner = control.winner()
+        if winner:
+            solution = winner[0]
+            hash_count = control.total_hashes()
             elapsed = time.time() - start_time
             rate = hash_count / elapsed if elapsed > 0 else 0
             print(f"Proof-of-work solved in {elapsed:.2f} seconds")
             print(f"Total hashes: {hash_count:,} (rate: {rate:,.0f} H/s)")
             
             # Verify solution
-            verification_hash = self.sha1_hash_optimized(authdata + solution)
-            target = '0' * int(difficulty)
-            if verification_hash.startswith(target):
+            if verify_suffix(authdata, solution, difficulty):
                 print(f"Solution verified: {solution}")
                 return solution
             else:
@@ -314,24 +315,19 @@ class OptimizedTLSClient:
         
         return None
     
-    def create_authenticated_response(self, nonce, data):
-        """Create authenticated response with SHA1 hash"""
-        return self.sha1_hash_optimized(self.authdata + nonce) + " " + data
-    
     def handle_command(self, args):
         """Handle server commands"""
         cmd = args[0]
         
-        if cmd == "HELO":
-            return self.write_line("TOAKUEI")
-        
-        elif cmd == "ERROR":
+        if cmd == "ERROR":
             print("ERROR: " + " ".join(args[1:]))
             return False
         
         elif cmd == "POW":
             self.authdata = args[1]
+            self.responses.set_authdata(self.authdata)
             difficulty = args[2]
+            print(f"Suffix plan: {plan_suffix(self.authdata, difficulty).describe()}")
             solution = self.solve_proof_of_work_optimized(self.authdata, difficulty)
             if solution:
                 return self.write_line(solution)
@@ -339,53 +335,16 @@ class OptimizedTLSClient:
                 print("Failed to solve proof-of-work")
                 return False
         
-        elif cmd == "END":
-            print("Data submission confirmed")
-            return self.write_line("OK")
-        
-        elif cmd == "NAME":
-            response = self.create_authenticated_response(args[1], self.personal_info['name'])
-            return self.write_line(response)
-        
-        elif cmd == "MAILNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['emails'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("MAIL"):
-            mail_idx = int(cmd[4:]) - 1
-            if mail_idx < len(self.personal_info['emails']):
-                email = self.personal_info['emails'][mail_idx]
-                response = self.create_authenticated_response(args[1], email)
-                return self.write_line(response)
-            return False
-        
-        elif cmd == "SKYPE":
-            response = self.create_authenticated_response(args[1], self.personal_info['skype'])
-            return self.write_line(response)
-        
-        elif cmd == "BIRTHDATE":
-            response = self.create_authenticated_response(args[1], self.personal_info['birthdate'])
-            return self.write_line(response)
-        
-        elif cmd == "COUNTRY":
-            response = self.create_authenticated_response(args[1], self.personal_info['country'])
-            return self.write_line(response)
-        
-        elif cmd == "ADDRNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['address_lines'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("ADDRLINE"):
-            addr_idx = int(cmd[8:]) - 1
-            if addr_idx < len(self.personal_info['address_lines']):
-                addr_line = self.personal_info['address_lines'][addr_idx]
-                response = self.create_authenticated_response(args[1], addr_line)
-                return self.write_line(response)
-            return False
-        
         else:
-            print(f"Unknown command: {cmd}")
-            return False
+            if cmd == "END":
+                print("Data submission confirmed")
+            
+            # HELO, END and the personal-data commands come from the response table
+            response = self.responses.answer(args)
+            if response is None:
+                print(f"Unknown command: {cmd}")
+                return False
+            return self.write_bytes(response)
     
     def run(self):
         """Main protocol loop"""
@@ -422,6 +381,7 @@ class OptimizedTLSClient:
         
         finally:
             if self.conn:
+                self.tls_cache.remember(self.host, self.port, self.conn)
                 self.conn.close()
                 print("Connection closed")
 
@@ -4,60 +4,62 @@ Optimized TLS Protocol Client Implementation
 Implements the challenge-response protocol with proof-of-work authentication.
 """
 
-import ssl
 import socket
 import hashlib
-import secrets
-import string
 import threading
-import multiprocessing
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import time
 import sys
-import os
-import queue
 
-def pow_worker_function(args):
-    """Multiprocessing worker function for proof-of-work calculation"""
-    authdata, difficulty, worker_id, batch_size = args
-    target = '0' * int(difficulty)
-    local_counter = 0
-    
-    # Use different character sets for different workers to reduce collision
-    charset = string.ascii_letters + string.digits + "!@#$%^&*()-_=+[]{}|;:,.<>?"
-    
-    # Each worker uses a different random seed
-    random_gen = secrets.SystemRandom(worker_id + time.time_ns())
-    
-    start_time = time.time()
-    timeout = 300  # 5 minutes timeout per worker
-    
-    while local_counter < batch_size and (time.time() - start_time) < timeout:
-        # Generate candidate with varying lengths
-        suffix_length = random_gen.randint(4, 12)
-        suffix = ''.join(random_gen.choice(charset) for _ in range(suffix_length))
-        
-        # Calculate hash
-        combined = authdata + suffix
-        hasher = hashlib.sha1()
-        hasher.update(combined.encode('utf-8'))
-        cksum = hasher.hexdigest()
-        
-        local_counter += 1
-        
-        if cksum.startswith(target):
-            return suffix, local_counter, True
-    
-    return None, local_counter, False
+from pow_affinity import Placement, available_cpu_count, pin_to_cpu
+from pow_backends import available_backends, calibration_report, calibration_results
+from pow_cluster import PowCoordinator, parse_address
+from pow_control import ControlBlock
+from pow_deadline import DeadlinePlanner
+from pow_engine import (NonceEnumerator, PrefixHasher, difficulty_limit, plan_suffix, suffix_length,
+                        verify_suffix)
+from pow_metrics import SolverMetrics, start_exporters
+from pow_pool import PowWorkerPool, choose_start_method, gil_enabled
+from pow_profile import DEFAULT_PROFILE_ATTEMPTS, run_profile
+from pow_tuning import load_profile, profile_backend, tune_and_save
+from tls_connect_race import PortStats, race_connect, race_ports
+from tls_line_reader import LineReader
+from tls_responses import ResponseTable
+from tls_session_cache import client_context, session_reused
 
 class OptimizedTLSClient:
-    def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None):
+    def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None,
+                 backend='auto', tuning=None, cluster=None, reserve_cpu=False, metrics=None,
+                 ports=None, port_stats=None):
         self.host = host
         self.port = port
+        # With several ports, tls_connect races them (tls_connect_race.py)
+        self.ports = ports
+        self.port_stats = port_stats
         self.cert_path = cert_path
         self.key_path = key_path
         self.conn = None
+        self.reader = None
         self.authdata = ""
+        # Shared context of this certificate and its TLS sessions (tls_session_cache.py)
+        self.tls_cache = None
+        self.completed = False
+        # Per-machine tuning profile (--tune), built-in defaults otherwise
+        self.tuning = tuning or load_profile()
+        self.backend = profile_backend(backend, self.tuning)
+        # Worker -> CPU placement from the affinity mask
+        self.placement = Placement(self.tuning.workers, reserve_cpu)
+        # Persistent worker processes, pre-warmed by run() during connect
+        self.pow_pool = None
+        self.pow_pool_lock = threading.Lock()
+        self.prewarm_reported = False
+        # Coordinator for remote pow_cluster.py agents, if any
+        self.cluster = cluster
+        # Solver timeouts follow the server's POW deadline from the POW line
+        self.pow_received_at = None
+        self.planner = None
+        # Live solver and protocol metrics (pow_metrics.py)
+        self.metrics = metrics or SolverMetrics()
         
         # Personal information - UPDATE THESE WITH YOUR ACTUAL DETAILS
         self.personal_info = {
@@ -68,24 +70,30 @@ class OptimizedTLSClient:
             'country': 'India',
             'address_lines': ['Whitefield', 'Benguluru', 'Karnataka', '560066']
         }
+        
+        # Response bytes per command, compiled once from personal_info
+        self.responses = ResponseTable(self.personal_info)
     
     def tls_connect(self):
         """Establish TLS connection with client certificates"""
         try:
-            # Create SSL context
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
+            # Process-wide SSL context; the certificate is parsed once and a
+            # stored session makes reconnects an abbreviated handshake
+            self.tls_cache = client_context(self.cert_path, self.key_path)
             
-            # Load client certificate and key if provided
-            if self.cert_path and self.key_path:
-                context.load_cert_chain(self.cert_path, self.key_path)
-            
-            # Create socket and wrap with SSL
-            sock = socket.create_connection((self.host, self.port), timeout=30)
-            self.conn = context.wrap_socket(sock, server_hostname=self.host)
+            # Race the configured ports, or connect to the single one
+            if self.ports:
+                self.conn, self.port = race_connect(self.host, self.ports, self.tls_cache.context,
+                                                    self.port_stats, sessions=self.tls_cache)
+            else:
+                sock = socket.create_connection((self.host, self.port), timeout=30)
+                self.conn = self.tls_cache.wrap_socket(sock, self.host, self.port)
+            self.reader = LineReader(self.conn)
             
-            print(f"Connected to {self.host}:{self.port}")
+            resumed = session_reused(self.conn)
+            self.metrics.observe_handshake(resumed)
+            print(f"Connected to {self.host}:{self.port} "
+                  f"({'resumed TLS session' if resumed else 'full TLS handshake'})")
             return True
             
         except Exception as e:
@@ -95,23 +103,19 @@ class OptimizedTLSClient:
     def read_line(self):
         """Read a line from the connection"""
         try:
-            data = b''
-            while True:
-                chunk = self.conn.recv(1)
-                if not chunk:
-                    break
-                data += chunk
-                if chunk == b'\n':
-                    break
-            return data.decode('utf-8').strip()
+            return self.reader.readline().decode('utf-8').strip()
         except Exception as e:
             print(f"Read error: {e}")
             return ""
     
     def write_line(self, data):
         """Write a line to the connection"""
+        return self.write_bytes((data + '\n').encode('utf-8'))
+    
+    def write_bytes(self, payload):
+        """Write an encoded, newline-terminated line to the connection"""
         try:
-            self.conn.sendall((data + '\n').encode('utf-8'))
+            self.conn.sendall(payload)
             return True
         except Exception as e:
             print(f"Write error: {e}")
@@ -121,249 +125,288 @@ class OptimizedTLSClient:
         """Optimized SHA1 hash calculation"""
         return hashlib.sha1(data.encode('utf-8')).hexdigest()
     
-    def solve_proof_of_work_threaded(self, authdata, difficulty):
+    def solve_proof_of_work_threaded(self, authdata, difficulty, allow_processes=True):
         """Solve proof-of-work using threading with timeout"""
+        if allow_processes and gil_enabled():
+            # GIL build: threads would serialise on the GIL, processes scale
+            print("GIL enabled, routing threaded proof-of-work to worker processes")
+            return self.solve_proof_of_work_multiprocessing(authdata, difficulty)
+        
         print(f"Solving proof-of-work (difficulty: {difficulty}) using threading...")
         start_time = time.time()
-        target = '0' * int(difficulty)
+        limit = difficulty_limit(difficulty)
+        length = suffix_length(authdata, difficulty)
+        
+        # One thread per core; on a free-threaded build they run in parallel
+        num_threads = self.tuning.threads
         
-        # Threading approach with proper synchronization
-        result_found = threading.Event()
-        result_data = {}
-        total_hashes = 0
-        hash_lock = threading.Lock()
+        # Stop word, winner slot and per-thread counters; nothing in the hot
+        # loop takes a lock
+        control = ControlBlock(num_threads)
+        self.metrics.attach(control.worker_hashes)
         
         def worker_thread(thread_id):
-            nonlocal total_hashes
+            pin_to_cpu(self.placement.cpus[thread_id % len(self.placement.cpus)])
             local_counter = 0
-            charset = string.ascii_letters + string.digits + "!@#$%^&*()-_=+[]{}|;:,.<>?"
-            random_gen = secrets.SystemRandom(thread_id + time.time_ns())
+            # Thread-local hasher tree
+            root = PrefixHasher(authdata)
             
-            while not result_found.is_set():
-                suffix_length = random_gen.randint(4, 12)
-                suffix = ''.join(random_gen.choice(charset) for _ in range(suffix_length))
-                
-                combined = authdata + suffix
-                hasher = hashlib.sha1()
-                hasher.update(combined.encode('utf-8'))
-                cksum = hasher.hexdigest()
-                
-                local_counter += 1
-                
-                if cksum.startswith(target):
-                    if not result_found.is_set():
-                        result_data['suffix'] = suffix
-                        result_data['hashes'] = local_counter
-                        result_found.set()
+            # Each thread walks its own disjoint slice of the nonce space
+            nonces = NonceEnumerator.partition(thread_id, num_threads, length)
+            for head, tails in nonces.blocks():
+                if control.is_set():
                     return
                 
-                # Update global counter periodically
-                if local_counter % 10000 == 0:
-                    with hash_lock:
-                        total_hashes += 10000
-        
-        # Start worker threads
-        num_threads = min(multiprocessing.cpu_count() * 2, 16)
-        threads = []
+                new_hasher = root.extend(head).copy
+                for tail in tails:
+                    hasher = new_hasher()
+                    hasher.update(tail)
+                    digest = hasher.digest()
+                    
+                    if digest < limit:
+                        position = tails.index(tail) + 1
+                        control.add_hashes(thread_id, position)
+                        control.post_winner(thread_id, (head + tail).decode('ascii'), local_counter + position)
+                        return
+                
+                local_counter += len(tails)
+                control.add_hashes(thread_id, len(tails))
         
         with ThreadPoolExecutor(max_workers=num_threads) as executor:
             futures = [executor.submit(worker_thread, i) for i in range(num_threads)]
             
-            # Monitor progress with timeout
-            timeout = 600  # 10 minutes timeout
-            last_report = start_time
+            # Monitor progress until the POW deadline, or until it is hopeless
+            planner = self.deadline_planner(difficulty)
+            planner.begin()
             
-            while not result_found.is_set():
-                if time.time() - start_time > timeout:
-                    print("Proof-of-work timed out after 10 minutes")
-                    result_found.set()
+            # The winner's post wakes the wait at once
+            while not control.wait(1):
+                if not planner.check(control.total_hashes()):
+                    control.set()
                     break
-                
-                time.sleep(1)
-                
-                # Report progress every 30 seconds
-                if time.time() - last_report >= 30:
-                    elapsed = time.time() - start_time
-                    with hash_lock:
-                        current_total = total_hashes
-                    rate = current_total / elapsed if elapsed > 0 else 0
-                    print(f"Progress: {current_total:,} hashes in {elapsed:.1f}s (rate: {rate:,.0f} H/s)")
-                    last_report = time.time()
         
-        if 'suffix' in result_data:
+        winner = control.winner()
+        if winner:
+            self.metrics.mark_found(control.found_at())
+            suffix = winner[0]
+            hash_count = control.total_hashes()
             elapsed = time.time() - start_time
-            rate = result_data['hashes'] / elapsed if elapsed > 0 else 0
+            rate = hash_count / elapsed if elapsed > 0 else 0
             print(f"Proof-of-work solved in {elapsed:.2f} seconds")
-            print(f"Total hashes: {result_data['hashes']:,} (rate: {rate:,.0f} H/s)")
+            print(f"Total hashes: {hash_count:,} (rate: {rate:,.0f} H/s)")
             
             # Verify solution
-            verification_hash = self.sha1_hash_optimized(authdata + result_data['suffix'])
-            if verification_hash.startswith(target):
-                print(f"Solution verified: {result_data['suffix']}")
-                return result_data['suffix']
+            if verify_suffix(authdata, suffix, difficulty):
+                print(f"Solution verified: {suffix}")
+                return suffix
             else:
                 print("Solution verification failed!")
         
         return None
     
+    def start_pow_pool(self, start_method=None):
+        """Start the persistent worker pool once; later challenges reuse it"""
+        # The pre-warm thread may be starting it right now; wait and attach
+        with self.pow_pool_lock:
+            if self.pow_pool is None:
+                self.pow_pool = PowWorkerPool(backend=self.backend, chunk_size=self.tuning.chunk_size,
+                                              start_method=start_method, placement=self.placement)
+            if not self.pow_pool.started:
+                self.pow_pool.start()
+                if self.backend == 'auto':
+                    print(f"PoW backend calibration:\n{calibration_report()}")
+                print(f"Started {self.pow_pool.num_workers} PoW worker processes "
+                      f"(backend: {self.pow_pool.backend}, start method: {self.pow_pool.start_method})")
+                print(f"Worker placement: {self.placement.describe()}")
+            return self.pow_pool
+    
+    def stop_pow_pool(self):
+        """Shut down the persistent worker pool"""
+        with self.pow_pool_lock:
+            if self.pow_pool is not None:
+                self.pow_pool.close()
+                self.pow_pool = None
+    
+    def prewarm_pow_pool(self):
+        """Start the worker pool in the background during connect and HELO.
+
+        Process creation, imports and JIT warm-up then overlap with network
+        round-trips instead of following the POW line. The workers park on
+        the pool's job event until a challenge is published.
+        """
+        def warm():
+            # The protocol thread keeps running, so fork() is not safe here
+            pool = self.start_pow_pool(start_method=choose_start_method(threads_running=True))
+            pool.wait_ready()
+        
+        threading.Thread(target=warm, daemon=True).start()
+    
+    def report_prewarm(self, pow_at):
+        """Print how much pool start-up the pre-warm moved off the POW path"""
+        pool = self.pow_pool
+        if pool is None or pool.started_at is None or self.prewarm_reported:
+            return
+        self.prewarm_reported = True
+        ready_at = pool.ready_at
+        overlapped = (min(ready_at or pow_at, pow_at) - pool.started_at) * 1000
+        if ready_at is None:
+            print(f"PoW pool pre-warm ({pool.start_method}): {overlapped:.0f} ms overlapped "
+                  f"with connect/HELO, workers still warming up")
+        else:
+            remaining = max(0.0, ready_at - pow_at) * 1000
+            print(f"PoW pool pre-warm ({pool.start_method}): ready in "
+                  f"{(ready_at - pool.started_at) * 1000:.0f} ms, {overlapped:.0f} ms saved on the "
+                  f"POW path, {remaining:.0f} ms left")
+    
+    def profile_pow(self, attempts: int = DEFAULT_PROFILE_ATTEMPTS) -> None:
+        """Run the pool's backend for a fixed attempt count in the pool's
+        worker layout and print the per-stage time breakdown"""
+        report = run_profile(self.backend, attempts=attempts, chunk_size=self.tuning.chunk_size,
+                             placement=self.placement)
+        print(report.describe())
+    
     def solve_proof_of_work_multiprocessing(self, authdata, difficulty):
-        """Solve proof-of-work using multiprocessing with timeout"""
+        """Solve proof-of-work using the persistent worker pool with timeout"""
         print(f"Solving proof-of-work (difficulty: {difficulty}) using multiprocessing...")
         start_time = time.time()
         
-        cpu_count = multiprocessing.cpu_count()
+        cpu_count = available_cpu_count()
         print(f"CPU cores available: {cpu_count}")
-
-        """Solve using multiprocessing"""
-        num_workers = cpu_count
-        print(f"Using {num_workers} processes for proof-of-work")        
-        batch_size = 100000  # Each worker processes this many hashes before returning
         
         try:
-            with ProcessPoolExecutor(max_workers=num_workers) as executor:
-                timeout = 600  # 10 minutes timeout
-                
-                while time.time() - start_time < timeout:
-                    # Submit batch of work to all workers
-                    worker_args = [
-                        (authdata, difficulty, i, batch_size) 
-                        for i in range(num_workers)
-                    ]
-                    
-                    # Submit all tasks
-                    future_to_worker = {
-                        executor.submit(pow_worker_function, args): i 
-                        for i, args in enumerate(worker_args)
-                    }
-                    
-                    # Check for completion
-                    for future in as_completed(future_to_worker, timeout=60):
-                        worker_id = future_to_worker[future]
-                        try:
-                            result, hash_count, found = future.result()
-                            if found:
-                                elapsed = time.time() - start_time
-                                rate = hash_count / elapsed if elapsed > 0 else 0
-                                print(f"Proof-of-work solved in {elapsed:.2f} seconds")
-                                print(f"Total hashes: {hash_count:,} (rate: {rate:,.0f} H/s)")
-                                
-                                # Verify solution
-                                verification_hash = self.sha1_hash_optimized(authdata + result)
-                                target = '0' * int(difficulty)
-                                if verification_hash.startswith(target):
-                                    print(f"Solution verified: {result}")
-                                    return result
-                                else:
-                                    print("Solution verification failed!")
-                        except Exception as e:
-                            print(f"Worker {worker_id} error: {e}")
-                            continue
-                    
-                    # Report progress
-                    elapsed = time.time() - start_time
-                    total_hashes = num_workers * batch_size
-                    rate = total_hashes / elapsed if elapsed > 0 else 0
-                    print(f"Batch completed: {total_hashes:,} hashes in {elapsed:.1f}s (rate: {rate:,.0f} H/s)")
-                
-                print("Proof-of-work timed out after 10 minutes")
+            pool = self.start_pow_pool()
+            
+            planner = self.deadline_planner(difficulty)
+            planner.begin(calibration_results().get(pool.backend, 0.0) * pool.num_workers or None)
+            self.metrics.attach(pool.worker_hashes)
+            result = pool.solve(authdata, difficulty, timeout=planner.timeout(), progress=planner.check)
+            if result is None:
+                print("Proof-of-work stopped: POW deadline reached or success unlikely")
                 return None
-                
+            self.metrics.mark_found(pool.found_at())
+            
+            elapsed = time.time() - start_time
+            print(f"Proof-of-work solved in {elapsed:.2f} seconds")
+            
+            # Verify solution
+            if verify_suffix(authdata, result, difficulty):
+                print(f"Solution verified: {result}")
+                return result
+            print("Solution verification failed!")
+            return None
+            
         except Exception as e:
             print(f"Multiprocessing error: {e}")
             return None
     
+    def solve_proof_of_work_cluster(self, authdata, difficulty):
+        """Solve proof-of-work across the connected cluster agents and the local pool"""
+        print(f"Solving proof-of-work (difficulty: {difficulty}) using the cluster...")
+        start_time = time.time()
+        
+        try:
+            self.cluster.start_local_agent(self.start_pow_pool())
+            print(f"Cluster agents: {self.cluster.agent_count}")
+            
+            planner = self.deadline_planner(difficulty)
+            planner.begin(self.cluster.aggregate_rate() or None)
+            self.metrics.attach(self.cluster.agent_hashes)
+            
+            # The coordinator verifies every reported suffix before accepting it
+            result = self.cluster.solve(authdata, difficulty, timeout=planner.timeout(),
+                                        progress=planner.check)
+            if result is None:
+                print("Proof-of-work stopped: POW deadline reached or success unlikely")
+                return None
+            self.metrics.mark_found(self.cluster.found_at)
+            
+            elapsed = time.time() - start_time
+            print(f"Proof-of-work solved in {elapsed:.2f} seconds")
+            return result
+            
+        except Exception as e:
+            print(f"Cluster error: {e}")
+            return None
+    
+    def deadline_planner(self, difficulty):
+        """Planner for the challenge being solved; fallbacks share it"""
+        if self.planner is None or self.planner.difficulty != int(difficulty):
+            self.planner = DeadlinePlanner(difficulty, started=self.pow_received_at)
+        return self.planner
+    
     def solve_proof_of_work_optimized(self, authdata, difficulty):
         """Optimized proof-of-work solver with fallback strategies"""
         print(f"Solving proof-of-work (difficulty: {difficulty})...")
+        self.planner = None
+        self.metrics.begin_solve(int(difficulty))
         
-        # For low difficulty, use threading
-        if int(difficulty) <= 4:
-            return self.solve_proof_of_work_threaded(authdata, difficulty)
-        
-        # For higher difficulty, try multiprocessing first, then fallback to threading
-        result = self.solve_proof_of_work_multiprocessing(authdata, difficulty)
-        if result is None:
-            print("Multiprocessing failed, falling back to threading...")
+        # For low difficulty, use threading (crossover from the tuning profile)
+        if int(difficulty) <= self.tuning.threaded_max_difficulty:
             result = self.solve_proof_of_work_threaded(authdata, difficulty)
+        else:
+            # For higher difficulty, try the cluster or multiprocessing first, then fallback to threading
+            if self.cluster is not None and self.cluster.agent_count:
+                result = self.solve_proof_of_work_cluster(authdata, difficulty)
+            else:
+                result = self.solve_proof_of_work_multiprocessing(authdata, difficulty)
+            if result is None and not self.deadline_planner(difficulty).expired:
+                print("Multiprocessing failed, falling back to threading...")
+                result = self.solve_proof_of_work_threaded(authdata, difficulty, allow_processes=False)
         
+        self.metrics.end_solve(result is not None)
         return result
     
-    def create_authenticated_response(self, nonce, data):
-        """Create authenticated response with SHA1 hash"""
-        return self.sha1_hash_optimized(self.authdata + nonce) + " " + data
-    
     def handle_command(self, args):
         """Handle server commands"""
         cmd = args[0]
         
-        if cmd == "HELO":
-            return self.write_line("TOAKUEI")
-        
-        elif cmd == "ERROR":
+        if cmd == "ERROR":
             print("ERROR: " + " ".join(args[1:]))
             return False
         
         elif cmd == "POW":
+            pow_at = time.perf_counter()
+            self.pow_received_at = time.time()
             self.authdata = args[1]
+            self.responses.set_authdata(self.authdata)
             difficulty = args[2]
+            self.report_prewarm(pow_at)
+            print(f"Suffix plan: {plan_suffix(self.authdata, difficulty).describe()}")
             solution = self.solve_proof_of_work_optimized(self.authdata, difficulty)
+            self.pow_received_at = None
             if solution:
-                return self.write_line(solution)
+                sent = self.write_line(solution)
+                found_to_sent = self.metrics.observe_sent()
+                if found_to_sent is not None:
+                    print(f"Found-to-sent: {found_to_sent * 1000:.3f} ms")
+                return sent
             else:
                 print("Failed to solve proof-of-work")
                 return False
         
-        elif cmd == "END":
-            print("Data submission confirmed")
-            return self.write_line("OK")
-        
-        elif cmd == "NAME":
-            response = self.create_authenticated_response(args[1], self.personal_info['name'])
-            return self.write_line(response)
-        
-        elif cmd == "MAILNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['emails'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("MAIL"):
-            mail_idx = int(cmd[4:]) - 1
-            if mail_idx < len(self.personal_info['emails']):
-                email = self.personal_info['emails'][mail_idx]
-                response = self.create_authenticated_response(args[1], email)
-                return self.write_line(response)
-            return False
-        
-        elif cmd == "SKYPE":
-            response = self.create_authenticated_response(args[1], self.personal_info['skype'])
-            return self.write_line(response)
-        
-        elif cmd == "BIRTHDATE":
-            response = self.create_authenticated_response(args[1], self.personal_info['birthdate'])
-            return self.write_line(response)
-        
-        elif cmd == "COUNTRY":
-            response = self.create_authenticated_response(args[1], self.personal_info['country'])
-            return self.write_line(response)
-        
-        elif cmd == "ADDRNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['address_lines'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("ADDRLINE"):
-            addr_idx = int(cmd[8:]) - 1
-            if addr_idx < len(self.personal_info['address_lines']):
-                addr_line = self.personal_info['address_lines'][addr_idx]
-                response = self.create_authenticated_response(args[1], addr_line)
-                return self.write_line(response)
-            return False
-        
         else:
-            print(f"Unknown command: {cmd}")
-            return False
+            if cmd == "END":
+                print("Data submission confirmed")
+            
+            # HELO, END and the personal-data commands come from the response table
+            response = self.responses.answer(args)
+            if response is None:
+                print(f"Unknown command: {cmd}")
+                return False
+            return self.write_bytes(response)
     
     def run(self):
         """Main protocol loop"""
+        # The protocol loop gets its own CPU when one is reserved; threads
+        # and processes started from here re-pin themselves
+        if pin_to_cpu(self.placement.protocol_cpu):
+            print(f"Protocol loop pinned to CPU {self.placement.protocol_cpu}")
+        
+        # Worker start-up overlaps the TCP connect, TLS handshake and HELO
+        self.completed = False
+        self.prewarm_pow_pool()
         if not self.tls_connect():
+            self.stop_pow_pool()
             return False
         
         try:
@@ -376,16 +419,20 @@ class OptimizedTLSClient:
                     print("Connection closed by server")
                     break
                 
+                received = time.perf_counter()
                 print(f"Received: {line}")
                 args = line.split(' ')
                 
                 # Handle command
-                if not self.handle_command(args):
+                handled = self.handle_command(args)
+                self.metrics.observe_command(args[0], time.perf_counter() - received)
+                if not handled:
                     break
                 
                 # Check for END command
                 if args[0] == "END":
                     print("Protocol completed successfully")
+                    self.completed = True
                     break
             
             return True
@@ -395,7 +442,10 @@ class OptimizedTLSClient:
             return False
         
         finally:
+            self.stop_pow_pool()
             if self.conn:
+                # Keep the session for a reconnect; TLS 1.3 tickets arrive after the handshake
+                self.tls_cache.remember(self.host, self.port, self.conn)
                 self.conn.close()
                 print("Connection closed")
 
@@ -408,21 +458,85 @@ def main():
     parser.add_argument('--port', type=int, default=3336, help='Server port')
     parser.add_argument('--cert', help='Client certificate file path')
     parser.add_argument('--key', help='Client private key file path')
+    parser.add_argument('--backend', default='auto', choices=['auto'] + available_backends(),
+                        help='PoW hash backend for the multiprocessing solver')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time the stages of the pool worker loop in the pool worker layout')
+    parser.add_argument('--profile-attempts', type=int, default=DEFAULT_PROFILE_ATTEMPTS,
+                        help='Attempts per worker in --profile mode')
+    parser.add_argument('--tune', action='store_true', help='Measure this host and write the tuning profile')
+    parser.add_argument('--tuning-file', default=None, help='Tuning profile path')
+    parser.add_argument('--reserve-cpu', action='store_true',
+                        help='Keep one CPU for the TLS/protocol loop; PoW workers are pinned to the rest')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-textfile', default=None,
+                        help='Write Prometheus metrics to a node-exporter textfile (*.prom)')
+    parser.add_argument('--cluster-listen', metavar='HOST[:PORT]',
+                        help='Accept pow_cluster.py agents and distribute high-difficulty PoW to them')
+    parser.add_argument('--race', action='store_true',
+                        help='Race TLS handshakes on all server ports and keep the first to finish')
+    parser.add_argument('--ports', type=int, nargs='+', default=None,
+                        help='Ports for --race (default: the six server ports)')
+    parser.add_argument('--port-stats', default=None, help='Port latency/failure history file for --race')
+    parser.add_argument('--retries', type=int, default=0,
+                        help='Reconnect up to N times after ERROR or a dropped connection, resuming the TLS session')
     
     args = parser.parse_args()
     
+    if args.tune:
+        tune_and_save(args.tuning_file)
+        return
+    
+    tuning = load_profile(args.tuning_file)
+    print(f"Tuning: {tuning.describe()}")
+    
+    if args.profile:
+        client = OptimizedTLSClient(backend=args.backend, tuning=tuning, reserve_cpu=args.reserve_cpu)
+        client.profile_pow(args.profile_attempts)
+        return
+    
+    cluster = None
+    if args.cluster_listen:
+        cluster = PowCoordinator(*parse_address(args.cluster_listen)).start()
+    
+    # --race / --ports: race the TLS handshakes, historically fastest port first
+    ports = race_ports(args.port, args.ports) if args.race or args.ports else None
+    
     # Create and run client
     client = OptimizedTLSClient(
         host=args.host,
         port=args.port,
         cert_path=args.cert,
-        key_path=args.key
+        key_path=args.key,
+        backend=args.backend,
+        tuning=tuning,
+        cluster=cluster,
+        reserve_cpu=args.reserve_cpu,
+        ports=ports,
+        port_stats=PortStats.load(args.port_stats) if ports else None
     )
     
     print("=== TLS Protocol Client ===")
-    print(f"Connecting to {args.host}:{args.port}")
+    if ports:
+        order = client.port_stats.order(args.host, ports)
+        print(f"Connecting to {args.host}, racing ports {', '.join(map(str, order))}")
+    else:
+        print(f"Connecting to {args.host}:{args.port}")
+    
+    exporters = start_exporters(client.metrics, args.metrics_port, args.metrics_textfile)
+    success = client.run()
+    for retry in range(1, args.retries + 1):
+        if client.completed:
+            break
+        print(f"Reconnecting ({retry}/{args.retries})...")
+        success = client.run()
+    if cluster is not None:
+        cluster.close()
+    for exporter in exporters:
+        exporter.close()
     
-    if client.run():
+    if success:
         print("Client completed successfully")
         sys.exit(0)
     else:
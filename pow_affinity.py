@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+CPU Affinity and NUMA Placement
+Sizes PoW workers from the CPU mask and pins each to its own logical CPU.
+"""
+
+import glob
+import multiprocessing
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+NODE_ROOT = '/sys/devices/system/node'
+CPU_ROOT = '/sys/devices/system/cpu'
+
+CAN_PIN = hasattr(os, 'sched_setaffinity')
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a kernel cpulist such as ``0-3,8-11``"""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpulist(cpus: List[int]) -> str:
+    """Inverse of ``parse_cpulist``"""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def available_cpus() -> List[int]:
+    """Logical CPUs this process may run on; honours container and taskset masks"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+def available_cpu_count() -> int:
+    """Drop-in for ``multiprocessing.cpu_count()`` that respects the CPU mask"""
+    return len(available_cpus())
+
+
+def numa_nodes(cpus: List[int] = None) -> Dict[int, List[int]]:
+    """Map NUMA node -> usable CPUs; a single node 0 when sysfs has no topology"""
+    cpus = available_cpus() if cpus is None else cpus
+    usable = set(cpus)
+    nodes = {}
+    for path in glob.glob(os.path.join(NODE_ROOT, 'node[0-9]*')):
+        cpulist = _read(os.path.join(path, 'cpulist'))
+        if cpulist is None:
+            continue
+        members = [cpu for cpu in parse_cpulist(cpulist) if cpu in usable]
+        if members:
+            nodes[int(re.sub(r'\D', '', os.path.basename(path)))] = members
+    placed = {cpu for members in nodes.values() for cpu in members}
+    missing = [cpu for cpu in cpus if cpu not in placed]
+    if missing:
+        nodes.setdefault(0, []).extend(missing)
+    return {node: sorted(members) for node, members in sorted(nodes.items())}
+
+
+def _split_siblings(cpus: List[int]) -> Tuple[List[int], List[int]]:
+    """Split CPUs into each physical core's first hardware thread and the
+    remaining SMT siblings; hashing threads on sibling pairs share one core"""
+    first, siblings = [], []
+    seen = set()
+    for cpu in cpus:
+        text = _read(os.path.join(CPU_ROOT, f'cpu{cpu}', 'topology', 'thread_siblings_list'))
+        core = tuple(parse_cpulist(text)) if text else (cpu,)
+        (siblings if core in seen else first).append(cpu)
+        seen.add(core)
+    return first, siblings
+
+
+class Placement:
+    """Worker -> CPU assignment with an optional CPU kept for the protocol loop"""
+
+    def __init__(self, num_workers: int = None, reserve_protocol_cpu: bool = False):
+        cpus = available_cpus()
+        self.nodes = numa_nodes(cpus)
+        # Every physical core on every node before any SMT sibling
+        split = [_split_siblings(members) for members in self.nodes.values()]
+        ordered = [cpu for first, _ in split for cpu in first] + \
+                  [cpu for _, siblings in split for cpu in siblings]
+
+        self.protocol_cpu = None
+        if reserve_protocol_cpu and len(ordered) > 1:
+            self.protocol_cpu = ordered.pop(0)
+            # Never double a worker up on a CPU just to keep the reservation
+            num_workers = num_workers and min(num_workers, len(ordered))
+
+        self.num_workers = num_workers or len(ordered)
+        chosen = [ordered[i % len(ordered)] for i in range(self.num_workers)]
+        # Consecutive workers share a node, so they also share its memory and caches
+        rank = {cpu: i for i, cpu in enumerate(ordered)}
+        self.cpus = sorted(chosen, key=lambda cpu: (self.node_of(cpu), rank[cpu]))
+
+    def node_of(self, cpu: int) -> int:
+        for node, members in self.nodes.items():
+            if cpu in members:
+                return node
+        return 0
+
+    def describe(self) -> str:
+        groups = {}
+        for cpu in self.cpus:
+            groups.setdefault(self.node_of(cpu), []).append(cpu)
+        parts = [f"node{node}: cpus {format_cpulist(cpus)} ({len(cpus)} workers)"
+                 for node, cpus in sorted(groups.items())]
+        if self.protocol_cpu is not None:
+            parts.append(f"protocol: cpu {self.protocol_cpu}")
+        return ', '.join(parts)
+
+
+def pin_to_cpu(cpu: Optional[int]) -> bool:
+    """Pin the calling thread (and processes it forks later) to one CPU"""
+    if cpu is None or not CAN_PIN:
+        return False
+    try:
+        os.sched_setaffinity(0, {cpu})
+        return True
+    except OSError:
+        return False
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='CPU Affinity and NUMA Placement')
+    parser.add_argument('--workers', type=int, default=None, help='Worker count (default: usable CPUs)')
+    parser.add_argument('--reserve-cpu', action='store_true', help='Keep one CPU for the protocol loop')
+
+    args = parser.parse_args()
+
+    print(f"multiprocessing.cpu_count(): {multiprocessing.cpu_count()}")
+    print(f"Usable CPUs: {format_cpulist(available_cpus())} ({available_cpu_count()})")
+    for node, cpus in numa_nodes().items():
+        print(f"NUMA node {node}: {format_cpulist(cpus)}")
+    print(f"Placement: {Placement(args.workers, args.reserve_cpu).describe()}")
+
+
+if __name__ == "__main__":
+    main()
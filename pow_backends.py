@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Proof-of-Work Hash Backend Registry
+Pluggable PoW search backends with start-up micro-calibration.
+"""
+
+import hashlib
+import importlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from pow_engine import NONCE_LENGTH, NonceEnumerator, PrefixHasher, difficulty_limit
+
+# Optional backend modules probed at runtime; each exposes BACKEND (or None)
+OPTIONAL_BACKEND_MODULES = ('pow_numpy_backend', 'pow_numba_backend')
+
+# Fixed challenge used for calibration; difficulty 40 never matches, so every
+# backend hashes its whole range
+CALIBRATION_AUTHDATA = 'calibration'.ljust(64, '.')
+CALIBRATION_DIFFICULTY = 40
+CALIBRATION_DURATION = 0.25
+
+
+class PowBackend:
+    """A named proof-of-work search engine over a nonce range.
+
+    ``search(authdata, difficulty, nonces, stop_event=None)`` returns
+    ``(suffix, attempts)``, where ``suffix`` is None when the range holds
+    no solution or ``stop_event`` was set.
+    """
+
+    def __init__(self, name: str, search: Callable, description: str,
+                 batched: bool = False, supports: Callable[[str, int], bool] = None):
+        self.name = name
+        self.search = search
+        self.description = description
+        self.batched = batched
+        self._supports = supports
+
+    def supports(self, authdata: str, suffix_length: int = NONCE_LENGTH) -> bool:
+        """Whether this backend can search the given challenge and suffix length"""
+        return self._supports is None or self._supports(authdata, suffix_length)
+
+    def __repr__(self):
+        return f"PowBackend({self.name!r})"
+
+
+def hashlib_search(authdata: str, difficulty: Union[int, str], nonces: NonceEnumerator,
+                   stop_event=None) -> Tuple[Optional[str], int]:
+    """Hash authdata + suffix from scratch for every candidate"""
+    limit = difficulty_limit(difficulty)
+    prefix = authdata.encode('utf-8')
+    sha1 = hashlib.sha1
+    attempts = 0
+    for head, tails in nonces.blocks():
+        if stop_event is not None and stop_event.is_set():
+            return None, attempts
+        base = prefix + head
+        for tail in tails:
+            if sha1(base + tail).digest() < limit:
+                return (head + tail).decode('ascii'), attempts + tails.index(tail) + 1
+        attempts += len(tails)
+    return None, attempts
+
+
+def midstate_search(authdata: str, difficulty: Union[int, str], nonces: NonceEnumerator,
+                    stop_event=None) -> Tuple[Optional[str], int]:
+    """Copy the absorbed authdata + nonce head state for every candidate"""
+    limit = difficulty_limit(difficulty)
+    root = PrefixHasher(authdata)
+    attempts = 0
+    for head, tails in nonces.blocks():
+        if stop_event is not None and stop_event.is_set():
+            return None, attempts
+        new_hasher = root.extend(head).copy
+        for tail in tails:
+            hasher = new_hasher()
+            hasher.update(tail)
+            if hasher.digest() < limit:
+                return (head + tail).decode('ascii'), attempts + tails.index(tail) + 1
+        attempts += len(tails)
+    return None, attempts
+
+
+_BACKENDS: Dict[str, PowBackend] = {}
+_discovered = False
+_calibration: Dict[str, float] = {}
+# Held for a whole calibration: a concurrent caller (e.g. the pool pre-warm
+# thread and the protocol thread) waits for the complete table
+_calibration_lock = threading.Lock()
+
+
+def register_backend(backend: PowBackend) -> PowBackend:
+    """Add a backend to the registry, replacing any backend with the same name"""
+    _BACKENDS[backend.name] = backend
+    return backend
+
+
+register_backend(PowBackend('hashlib', hashlib_search, 'hashlib.sha1 over the full message'))
+register_backend(PowBackend('midstate', midstate_search, 'hashlib.sha1 with authdata midstate copy'))
+
+
+def _discover() -> None:
+    global _discovered
+    if _discovered:
+        return
+    _discovered = True
+    for module_name in OPTIONAL_BACKEND_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        backend = getattr(module, 'BACKEND', None)
+        if backend is not None:
+            register_backend(backend)
+
+
+def available_backends() -> List[str]:
+    """Names of every backend usable in this interpreter"""
+    _discover()
+    return list(_BACKENDS)
+
+
+def get_backend(name: str) -> PowBackend:
+    """Look up a backend by name"""
+    _discover()
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown PoW backend: {name} (available: {', '.join(_BACKENDS)})")
+
+
+def measure_backend(backend: PowBackend, duration: float = CALIBRATION_DURATION) -> float:
+    """Measure a backend's hash rate (H/s) on the calibration challenge"""
+    # Warm-up: imports, JIT compilation, first-call allocations
+    backend.search(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY, NonceEnumerator(0, 64))
+
+    count = 1024
+    while True:
+        start = time.perf_counter()
+        backend.search(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY, NonceEnumerator(0, count))
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration / 4 or count >= 1 << 26:
+            return count / elapsed if elapsed > 0 else 0.0
+        count *= 4
+
+
+def calibrate(duration: float = CALIBRATION_DURATION, force: bool = False) -> Dict[str, float]:
+    """Measure every available backend once and cache the rates (H/s)"""
+    with _calibration_lock:
+        if _calibration and not force:
+            return dict(_calibration)
+
+        # Published only once complete, never backend by backend
+        rates = {}
+        for name in available_backends():
+            try:
+                rates[name] = measure_backend(_BACKENDS[name], duration)
+            except Exception as e:
+                print(f"Backend {name} failed calibration: {e}")
+        _calibration.clear()
+        _calibration.update(rates)
+        return dict(rates)
+
+
+def calibration_results() -> Dict[str, float]:
+    """Rates measured by the last calibration, empty if none ran yet"""
+    with _calibration_lock:
+        return dict(_calibration)
+
+
+def select_backend(name: Optional[str] = None, authdata: Optional[str] = None,
+                   suffix_length: int = NONCE_LENGTH) -> PowBackend:
+    """Return the named backend, or the fastest calibrated one for this challenge"""
+    if name and name != 'auto':
+        return get_backend(name)
+
+    rates = calibrate()
+    ranked = sorted(rates, key=rates.get, reverse=True)
+    for candidate in ranked:
+        backend = _BACKENDS[candidate]
+        if authdata is None or backend.supports(authdata, suffix_length):
+            return backend
+    return _BACKENDS['midstate']
+
+
+def calibration_report() -> str:
+    """Human-readable calibration table"""
+    rates = calibrate()
+    best = max(rates, key=rates.get) if rates else None
+    lines = []
+    for name, rate in sorted(rates.items(), key=lambda item: item[1], reverse=True):
+        marker = '*' if name == best else ' '
+        lines.append(f" {marker} {name:10s} {rate:>14,.0f} H/s  {_BACKENDS[name].description}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Proof-of-Work Hash Backend Calibration')
+    parser.add_argument('--duration', type=float, default=CALIBRATION_DURATION,
+                        help='Seconds of measurement per backend')
+
+    args = parser.parse_args()
+
+    print(f"Available backends: {', '.join(available_backends())}")
+    calibrate(args.duration)
+    print(calibration_report())
+    print(f"Selected backend: {select_backend().name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Cross-Implementation PoW Benchmark
+Runs every solver in the repo on the same seeded challenges and writes
+attempts/second with confidence intervals as JSON. ``--overhead`` fires
+thousands of low-difficulty challenges to measure fixed per-call costs.
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import time
+from typing import List, NamedTuple, Optional
+
+from pow_engine import verify_suffix
+from pow_tuning import host_fingerprint
+
+BENCHMARK_VERSION = 1
+
+DEFAULT_DIFFICULTY = 5
+DEFAULT_TRIALS = 10
+DEFAULT_SEED = 1
+CONFIDENCE = 0.95
+BOOTSTRAP_ROUNDS = 2000
+
+# Server-style authdata: 64 printable characters
+AUTHDATA_ALPHABET = ''.join(c for c in (chr(i) for i in range(33, 127)))
+AUTHDATA_LENGTH = 64
+
+# --overhead: at difficulty 1-3 the hashing is negligible and the per-call
+# cost (pool or thread start-up, result collection, teardown) is what remains
+OVERHEAD_DIFFICULTIES = (1, 2, 3)
+OVERHEAD_CALLS = 2000
+# Seconds per solver and difficulty; slow entry points stop early
+OVERHEAD_TIME_LIMIT = 10.0
+# Latency histogram upper bounds: 16 us doubling up to about 4 s
+OVERHEAD_BUCKETS = tuple(16e-6 * 2 ** i for i in range(19))
+
+# Solvers that print their own exact count
+_TOTAL_HASHES = re.compile(r'Total hashes: ([\d,]+)')
+
+
+class SolverSpec(NamedTuple):
+    """One solver entry point: ``module.cls().method(authdata, difficulty)``"""
+
+    name: str
+    module: str
+    cls: str
+    method: str
+    description: str
+    # solve_proof_of_work_simple stops after 1M attempts
+    max_difficulty: Optional[int] = None
+
+
+SOLVERS = (
+    SolverSpec('tls_client', 'tls_client', 'OptimizedTLSClient', 'solve_proof_of_work',
+               'tls_client.pow_worker threads'),
+    SolverSpec('optimized', 'optimized_tls_client', 'OptimizedTLSClient', 'solve_proof_of_work_optimized',
+               'optimized_tls_client processes'),
+    SolverSpec('v2', 'optimized_tls_client_v2', 'OptimizedTLSClient', 'solve_proof_of_work_optimized',
+               'optimized_tls_client_v2 processes, thread fallback'),
+    SolverSpec('v3', 'optimized_tls_client_v3', 'OptimizedTLSClient', 'solve_proof_of_work_optimized',
+               'optimized_tls_client_v3 processes, thread fallback'),
+    SolverSpec('v4', 'optimized_tls_client_v4', 'OptimizedTLSClient', 'solve_proof_of_work_optimized',
+               'optimized_tls_client_v4 threads / worker pool by difficulty'),
+    SolverSpec('v4-threaded', 'optimized_tls_client_v4', 'OptimizedTLSClient', 'solve_proof_of_work_threaded',
+               'optimized_tls_client_v4 threads'),
+    SolverSpec('v4-multiprocessing', 'optimized_tls_client_v4', 'OptimizedTLSClient',
+               'solve_proof_of_work_multiprocessing', 'optimized_tls_client_v4 persistent worker pool'),
+    SolverSpec('ultra', 'tls_protocol_client', 'UltraOptimizedTLSClient', 'solve_proof_of_work',
+               'UltraOptimizedTLSClient adaptive strategy, as used by the protocol loop'),
+    SolverSpec('ultra-hybrid', 'tls_protocol_client', 'UltraOptimizedTLSClient', 'solve_proof_of_work_hybrid',
+               'UltraOptimizedTLSClient threads / worker pool by difficulty'),
+    SolverSpec('ultra-simple', 'tls_protocol_client', 'UltraOptimizedTLSClient', 'solve_proof_of_work_simple',
+               'UltraOptimizedTLSClient single-thread midstate loop', max_difficulty=4),
+    SolverSpec('ultra-threaded', 'tls_protocol_client', 'UltraOptimizedTLSClient', 'solve_proof_of_work_threaded',
+               'UltraOptimizedTLSClient batch_pow_worker threads'),
+    SolverSpec('ultra-multiprocess', 'tls_protocol_client', 'UltraOptimizedTLSClient',
+               'solve_proof_of_work_multiprocess', 'UltraOptimizedTLSClient persistent worker pool'),
+)
+
+
+def seeded_challenges(seed: int, count: int) -> List[str]:
+    """The same authdata sequence for every solver"""
+    rng = random.Random(seed)
+    return [''.join(rng.choices(AUTHDATA_ALPHABET, k=AUTHDATA_LENGTH)) for _ in range(count)]
+
+
+def chi2_quantile(p: float, k: int) -> float:
+    """Wilson-Hilferty approximation of the chi-square quantile"""
+    z = statistics.NormalDist().inv_cdf(p)
+    h = 2 / (9 * k)
+    return k * (1 - h + z * math.sqrt(h)) ** 3
+
+
+def expected_rate_interval(difficulty: int, solves: int, seconds: float,
+                           confidence: float = CONFIDENCE) -> tuple:
+    """Rate from solve times alone.
+
+    Attempts to a hit are geometric with mean 16^d, so n solves in T seconds
+    give R = n·16^d / T and 2·R·T / 16^d ~ chi-square(2n).
+    """
+    if solves == 0 or seconds <= 0:
+        return 0.0, 0.0, 0.0
+    scale = 16 ** difficulty / (2 * seconds)
+    alpha = 1 - confidence
+    return (solves * 16 ** difficulty / seconds,
+            chi2_quantile(alpha / 2, 2 * solves) * scale,
+            chi2_quantile(1 - alpha / 2, 2 * solves) * scale)
+
+
+def counted_rate_interval(attempts: List[int], seconds: List[float], seed: int,
+                          confidence: float = CONFIDENCE) -> tuple:
+    """Sum(attempts) / sum(seconds) with a percentile bootstrap over trials"""
+    rate = sum(attempts) / sum(seconds)
+    rng = random.Random(seed)
+    n = len(attempts)
+    samples = []
+    for _ in range(BOOTSTRAP_ROUNDS):
+        picks = [rng.randrange(n) for _ in range(n)]
+        samples.append(sum(attempts[i] for i in picks) / sum(seconds[i] for i in picks))
+    samples.sort()
+    alpha = 1 - confidence
+    return (rate, samples[int(alpha / 2 * BOOTSTRAP_ROUNDS)],
+            samples[min(BOOTSTRAP_ROUNDS - 1, int((1 - alpha / 2) * BOOTSTRAP_ROUNDS))])
+
+
+def _make_solver(spec: SolverSpec):
+    instance = getattr(importlib.import_module(spec.module), spec.cls)()
+    return instance, getattr(instance, spec.method)
+
+
+def _counted_attempts(instance, output: str) -> Optional[int]:
+    metrics = getattr(instance, 'metrics', None)
+    if metrics is not None:
+        return metrics.folded
+    found = _TOTAL_HASHES.findall(output)
+    return int(found[-1].replace(',', '')) if found else None
+
+
+def _timed_solve(instance, solve, authdata: str, difficulty: int):
+    metrics = getattr(instance, 'metrics', None)
+    if metrics is not None:
+        metrics.begin_solve(difficulty)
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        suffix = solve(authdata, difficulty)
+    elapsed = time.perf_counter() - started
+    solved = bool(suffix) and verify_suffix(authdata, suffix, difficulty)
+    if metrics is not None:
+        metrics.end_solve(solved)
+    return solved, elapsed, _counted_attempts(instance, output.getvalue())
+
+
+def benchmark_solver(spec: SolverSpec, challenges: List[str], difficulty: int, seed: int) -> dict:
+    """Warm up once, then solve every challenge and summarise"""
+    result = {'solver': spec.name, 'description': spec.description, 'trials': len(challenges)}
+    if spec.max_difficulty is not None and difficulty > spec.max_difficulty:
+        result['skipped'] = f"difficulty above {spec.max_difficulty}"
+        return result
+    try:
+        instance, solve = _make_solver(spec)
+    except Exception as e:
+        result['skipped'] = f"{type(e).__name__}: {e}"
+        return result
+
+    try:
+        # Warm-up: pools, JIT compilation, calibration
+        _timed_solve(instance, solve, 'warm-up'.ljust(AUTHDATA_LENGTH, '.'), 1)
+
+        seconds, attempts, failed = [], [], 0
+        for authdata in challenges:
+            solved, elapsed, counted = _timed_solve(instance, solve, authdata, difficulty)
+            seconds.append(elapsed)
+            attempts.append(counted)
+            failed += not solved
+    finally:
+        stop = getattr(instance, 'stop_pow_pool', None)
+        if stop is not None:
+            stop()
+
+    solves = len(challenges) - failed
+    result.update(solved=solves, failed=failed, seconds=[round(s, 6) for s in seconds],
+                  median_seconds=statistics.median(seconds))
+    if None not in attempts and sum(seconds) > 0:
+        rate, low, high = counted_rate_interval(attempts, seconds, seed)
+        result.update(attempts=attempts, attempts_source='counted')
+    else:
+        rate, low, high = expected_rate_interval(difficulty, solves, sum(seconds))
+        result.update(attempts=None, attempts_source='expected')
+    result.update(rate=round(rate, 1), rate_low=round(low, 1), rate_high=round(high, 1))
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(solvers: List[str] = None, difficulty: int = DEFAULT_DIFFICULTY,
+              trials: int = DEFAULT_TRIALS, seed: int = DEFAULT_SEED, log=print) -> dict:
+    """Benchmark the named solvers (default: all) and return the JSON document"""
+    challenges = seeded_challenges(seed, trials)
+    results = []
+    for spec in SOLVERS:
+        if solvers and spec.name not in solvers:
+            continue
+        log(f"Benchmarking {spec.name} ({trials} x difficulty {difficulty})...")
+        results.append(benchmark_solver(spec, challenges, difficulty, seed))
+        log(f"  {format_result(results[-1])}")
+    return {
+        'version': BENCHMARK_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'host': host_fingerprint(),
+        'platform': platform.platform(),
+        'config': {'difficulty': difficulty, 'trials': trials, 'seed': seed, 'confidence': CONFIDENCE},
+        'results': results,
+    }
+
+
+def latency_percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted latencies"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def latency_histogram(latencies: List[float]) -> List[int]:
+    """Counts per ``OVERHEAD_BUCKETS`` bound, plus one for anything slower"""
+    counts = [0] * (len(OVERHEAD_BUCKETS) + 1)
+    for latency in latencies:
+        for i, bound in enumerate(OVERHEAD_BUCKETS):
+            if latency <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def overhead_solver(spec: SolverSpec, challenges: List[str], difficulties: List[int],
+                    time_limit: float = OVERHEAD_TIME_LIMIT) -> dict:
+    """Fire the challenges at one entry point per difficulty, call after call"""
+    result = {'solver': spec.name, 'description': spec.description, 'difficulties': {}}
+    try:
+        instance, solve = _make_solver(spec)
+    except Exception as e:
+        result['skipped'] = f"{type(e).__name__}: {e}"
+        return result
+
+    try:
+        _timed_solve(instance, solve, 'warm-up'.ljust(AUTHDATA_LENGTH, '.'), 1)
+        for difficulty in difficulties:
+            latencies, failed = [], 0
+            started = time.perf_counter()
+            for authdata in challenges:
+                solved, elapsed, _ = _timed_solve(instance, solve, authdata, difficulty)
+                latencies.append(elapsed)
+                failed += not solved
+                if time.perf_counter() - started >= time_limit:
+                    break
+            wall = time.perf_counter() - started
+            ordered = sorted(latencies)
+            result['difficulties'][str(difficulty)] = {
+                'calls': len(latencies),
+                'failed': failed,
+                'solves_per_second': round(len(latencies) / wall, 2),
+                'p50': latency_percentile(ordered, 0.50),
+                'p90': latency_percentile(ordered, 0.90),
+                'p99': latency_percentile(ordered, 0.99),
+                'max': ordered[-1],
+                'histogram': latency_histogram(latencies),
+            }
+    finally:
+        stop = getattr(instance, 'stop_pow_pool', None)
+        if stop is not None:
+            stop()
+    return result
+
+
+def run_overhead_suite(solvers: List[str] = None, difficulties: List[int] = OVERHEAD_DIFFICULTIES,
+                       calls: int = OVERHEAD_CALLS, time_limit: float = OVERHEAD_TIME_LIMIT,
+                       seed: int = DEFAULT_SEED, log=print) -> dict:
+    """Fixed-overhead benchmark of the named entry points (default: all)"""
+    challenges = seeded_challenges(seed, calls)
+    results = []
+    for spec in SOLVERS:
+        if solvers and spec.name not in solvers:
+            continue
+        log(f"Overhead {spec.name} ({calls} calls x difficulty {', '.join(map(str, difficulties))}, "
+            f"{time_limit:g}s limit each)...")
+        results.append(overhead_solver(spec, challenges, list(difficulties), time_limit))
+        for line in format_overhead(results[-1]):
+            log(f"  {line}")
+    return {
+        'version': BENCHMARK_VERSION,
+        'mode': 'overhead',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': _git_commit(),
+        'host': host_fingerprint(),
+        'platform': platform.platform(),
+        'config': {'difficulties': list(difficulties), 'calls': calls, 'time_limit': time_limit,
+                   'seed': seed, 'buckets': list(OVERHEAD_BUCKETS)},
+        'results': results,
+    }
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.3f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+def format_overhead(result: dict) -> List[str]:
+    if 'skipped' in result:
+        return [f"{result['solver']:20s} skipped ({result['skipped']})"]
+    return [f"{result['solver']:20s} d{difficulty} {stats['calls']:>6,} calls "
+            f"{stats['solves_per_second']:>10,.1f} solves/s  p50 {_ms(stats['p50'])}  "
+            f"p99 {_ms(stats['p99'])}  max {_ms(stats['max'])}  failed {stats['failed']}"
+            for difficulty, stats in result['difficulties'].items()]
+
+
+def format_histogram(histogram: List[int]) -> List[str]:
+    width = max(histogram) or 1
+    lines = []
+    bounds = [f"<= {_ms(bound)}" for bound in OVERHEAD_BUCKETS] + [f"> {_ms(OVERHEAD_BUCKETS[-1])}"]
+    # Only the populated span
+    used = [i for i, count in enumerate(histogram) if count]
+    for i in range(used[0], used[-1] + 1) if used else ():
+        lines.append(f"{bounds[i]:>13s} {histogram[i]:>7,} {'#' * round(40 * histogram[i] / width)}")
+    return lines
+
+
+def format_result(result: dict) -> str:
+    if 'skipped' in result:
+        return f"{result['solver']:20s} skipped ({result['skipped']})"
+    return (f"{result['solver']:20s} {result['rate']:>12,.0f} H/s "
+            f"[{result['rate_low']:,.0f} - {result['rate_high']:,.0f}] "
+            f"{result['attempts_source']:8s} median {result['median_seconds']:.3f}s "
+            f"failed {result['failed']}/{result['trials']}")
+
+
+def compare(baseline: dict, current: dict) -> str:
+    """Side-by-side rates of two result files"""
+    if current.get('mode') == 'overhead':
+        return compare_overhead(baseline, current)
+    rates = {r['solver']: r for r in baseline['results'] if 'rate' in r}
+    lines = [f"baseline {baseline.get('commit') or '?'} on {baseline['host'].get('hostname')}, "
+             f"current {current.get('commit') or '?'} on {current['host'].get('hostname')}"]
+    for result in current['results']:
+        before = rates.get(result['solver'])
+        if 'rate' not in result or before is None or not before['rate']:
+            continue
+        # Intervals that do not overlap mark a real change
+        overlap = result['rate_low'] <= before['rate_high'] and before['rate_low'] <= result['rate_high']
+        lines.append(f"  {result['solver']:20s} {before['rate']:>12,.0f} -> {result['rate']:>12,.0f} H/s "
+                     f"({result['rate'] / before['rate']:.2f}x{'' if overlap else ', significant'})")
+    return '\n'.join(lines)
+
+
+def compare_overhead(baseline: dict, current: dict) -> str:
+    """Side-by-side solves/s and p99 of two overhead result files"""
+    before = {r['solver']: r.get('difficulties', {}) for r in baseline['results']}
+    lines = [f"baseline {baseline.get('commit') or '?'} on {baseline['host'].get('hostname')}, "
+             f"current {current.get('commit') or '?'} on {current['host'].get('hostname')}"]
+    for result in current['results']:
+        for difficulty, stats in result.get('difficulties', {}).items():
+            old = before.get(result['solver'], {}).get(difficulty)
+            if old is None:
+                continue
+            lines.append(f"  {result['solver']:20s} d{difficulty} "
+                         f"{old['solves_per_second']:>10,.1f} -> {stats['solves_per_second']:>10,.1f} solves/s, "
+                         f"p99 {_ms(old['p99'])} -> {_ms(stats['p99'])}")
+    return '\n'.join(lines)
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cross-Implementation PoW Benchmark')
+    parser.add_argument('--difficulty', type=int, default=DEFAULT_DIFFICULTY, help='Challenge difficulty')
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help='Challenges per solver')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Seed of the challenge sequence')
+    parser.add_argument('--solver', action='append', choices=[spec.name for spec in SOLVERS],
+                        help='Solver to run (repeatable, default: all)')
+    parser.add_argument('--overhead', action='store_true',
+                        help='Fixed-overhead mode: many low-difficulty solves per entry point')
+    parser.add_argument('--difficulties', type=int, nargs='+', default=list(OVERHEAD_DIFFICULTIES),
+                        help='Difficulties for --overhead')
+    parser.add_argument('--calls', type=int, default=OVERHEAD_CALLS,
+                        help='Challenges per entry point and difficulty for --overhead')
+    parser.add_argument('--time-limit', type=float, default=OVERHEAD_TIME_LIMIT,
+                        help='Seconds per entry point and difficulty for --overhead')
+    parser.add_argument('--histogram', action='store_true', help='Print latency histograms for --overhead')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='Compare with an earlier result file')
+
+    args = parser.parse_args()
+
+    if args.overhead:
+        document = run_overhead_suite(args.solver, args.difficulties, args.calls, args.time_limit, args.seed)
+        print()
+        for result in document['results']:
+            for line in format_overhead(result):
+                print(line)
+            if args.histogram:
+                for difficulty, stats in result.get('difficulties', {}).items():
+                    print(f"  {result['solver']} difficulty {difficulty}:")
+                    for line in format_histogram(stats['histogram']):
+                        print(f"  {line}")
+    else:
+        document = run_suite(args.solver, args.difficulty, args.trials, args.seed)
+        print(f"\n{'solver':20s} {'attempts/s':>12s}     [{CONFIDENCE:.0%} interval]")
+        for result in document['results']:
+            print(format_result(result))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), document))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Distributed Proof-of-Work Cluster
+A coordinator leases disjoint nonce ranges to solver agents over TCP.
+"""
+
+import collections
+import json
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+from pow_backends import calibration_results, get_backend, measure_backend
+from pow_engine import NONCE_BASE, suffix_length, verify_suffix
+from pow_pool import PowWorkerPool
+
+DEFAULT_CLUSTER_PORT = 7336
+
+# Leases last about this long at the agent's measured rate; short enough to
+# lose little work on a disconnect, long enough to hide the round-trip
+LEASE_SECONDS = 2.0
+MIN_LEASE = 1 << 20
+MAX_LEASE = 1 << 34
+
+# Leases queued on an agent behind the one it is running. The coordinator
+# sends the next lease when the previous one is reported done, so the queued
+# lease arrives while the current one runs and the pool moves straight on to
+# it instead of idling for a network round-trip.
+PREFETCH_LEASES = 1
+
+# Weight of the newest sample in an agent's rate estimate
+RATE_SMOOTHING = 0.3
+
+PROGRESS_INTERVAL = 10.0
+
+
+def parse_address(address: str, default_port: int = DEFAULT_CLUSTER_PORT) -> Tuple[str, int]:
+    """Split ``HOST[:PORT]``"""
+    host, _, port = address.rpartition(':')
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+def _send(sock: socket.socket, lock: threading.Lock, message: dict) -> bool:
+    data = (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+    try:
+        with lock:
+            sock.sendall(data)
+        return True
+    except OSError:
+        return False
+
+
+def _messages(sock: socket.socket):
+    """Yield newline-delimited JSON messages until the peer disconnects"""
+    with sock.makefile('r', encoding='utf-8') as stream:
+        try:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+        except (OSError, ValueError):
+            return
+
+
+class _AgentLink:
+    """Coordinator-side state of one connected agent"""
+
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = address
+        self.send_lock = threading.Lock()
+        self.name = f"{address[0]}:{address[1]}"
+        self.workers = 0
+        self.rate = 0.0
+        self.hashes = 0
+        self.job_hashes = 0
+        self.leases: Dict[int, Tuple[int, int, int]] = {}  # lease id -> (job, start, stop)
+
+    def send(self, message: dict) -> bool:
+        return _send(self.sock, self.send_lock, message)
+
+    def lease_size(self) -> int:
+        return int(min(MAX_LEASE, max(MIN_LEASE, self.rate * LEASE_SECONDS)))
+
+
+class PowCoordinator:
+    """Hands out nonce-range leases and collects winners from remote agents.
+
+    Runs its own accept and per-agent reader threads; ``solve()`` is called
+    from the protocol thread and only blocks on an event, so the TLS
+    connection stays owned by that thread alone.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = DEFAULT_CLUSTER_PORT):
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.agents: Dict[int, _AgentLink] = {}
+        self.server = None
+        self.local_agent = None
+
+        self.job = 0
+        self.authdata = None
+        self.difficulty = 0
+        self.space = 0
+        self.next_nonce = 0
+        self.reclaimed = collections.deque()
+        self.lease_id = 0
+        self.winner = None
+        self.found_at = None
+        self.job_hashes = 0
+        self.done = threading.Event()
+
+    def start(self) -> 'PowCoordinator':
+        """Listen for agents; a no-op when already listening"""
+        if self.server is not None:
+            return self
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"PoW coordinator listening on {self.host}:{self.port}")
+        return self
+
+    def start_local_agent(self, pool: PowWorkerPool) -> None:
+        """Let this machine's worker pool take leases like any remote agent.
+
+        A client replaces its pool after every session; the agent of the
+        closed pool is then shut down and a new one drives ``pool``.
+        """
+        if self.local_agent is not None and self.local_agent.pool is not pool:
+            self.local_agent.close()
+            self.local_agent = None
+        if self.local_agent is None:
+            self.start()
+            self.local_agent = PowAgent('127.0.0.1', self.port, pool, name='local')
+            threading.Thread(target=self.local_agent.run, daemon=True).start()
+
+    @property
+    def agent_count(self) -> int:
+        with self.lock:
+            return sum(1 for agent in self.agents.values() if agent.workers)
+
+    def aggregate_rate(self) -> float:
+        with self.lock:
+            return sum(agent.rate for agent in self.agents.values())
+
+    def agent_hashes(self) -> Dict[str, int]:
+        """Hashes of completed leases per agent for the current job"""
+        with self.lock:
+            return {agent.name: agent.job_hashes for agent in self.agents.values() if agent.workers}
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                sock, address = self.server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            agent = _AgentLink(sock, address)
+            threading.Thread(target=self._agent_loop, args=(agent,), daemon=True).start()
+
+    def _agent_loop(self, agent: _AgentLink) -> None:
+        with self.lock:
+            self.agents[id(agent)] = agent
+        try:
+            for message in _messages(agent.sock):
+                kind = message.get('type')
+                if kind == 'hello':
+                    self._on_hello(agent, message)
+                elif kind == 'done':
+                    self._on_done(agent, message)
+                elif kind == 'found':
+                    self._on_found(agent, message)
+        finally:
+            self._drop(agent)
+
+    def _on_hello(self, agent: _AgentLink, message: dict) -> None:
+        with self.lock:
+            agent.name = message.get('name') or agent.name
+            agent.workers = int(message.get('workers', 1))
+            agent.rate = float(message.get('rate', 0.0))
+            active = self.authdata is not None and not self.done.is_set()
+            if active:
+                agent.send(self._job_message())
+                self._fill_leases(agent)
+        print(f"Agent {agent.name} joined: {agent.workers} workers, {agent.rate:,.0f} H/s")
+
+    def _on_done(self, agent: _AgentLink, message: dict) -> None:
+        with self.lock:
+            lease = agent.leases.pop(message.get('lease'), None)
+            if lease is None or lease[0] != self.job:
+                return
+            hashes = lease[2] - lease[1]
+            seconds = float(message.get('seconds', 0.0))
+            agent.hashes += hashes
+            agent.job_hashes += hashes
+            self.job_hashes += hashes
+            if seconds > 0:
+                sample = hashes / seconds
+                agent.rate = sample if not agent.rate else (
+                    RATE_SMOOTHING * sample + (1 - RATE_SMOOTHING) * agent.rate)
+            if not self.done.is_set():
+                self._fill_leases(agent)
+                self._check_exhausted()
+
+    def _on_found(self, agent: _AgentLink, message: dict) -> None:
+        suffix = message.get('suffix', '')
+        with self.lock:
+            if message.get('job') != self.job or self.done.is_set():
+                return
+            if not verify_suffix(self.authdata, suffix, self.difficulty):
+                print(f"Agent {agent.name} sent an invalid suffix: {suffix!r}")
+                return
+            self.winner = suffix
+            self.found_at = time.monotonic()
+            self.done.set()
+            print(f"Agent {agent.name} found the winning suffix")
+            self._broadcast({'type': 'cancel', 'job': self.job})
+
+    def _drop(self, agent: _AgentLink) -> None:
+        with self.lock:
+            self.agents.pop(id(agent), None)
+            # Ranges the agent never finished go back to the others
+            for job, start, stop in agent.leases.values():
+                if job == self.job:
+                    self.reclaimed.append((start, stop))
+            agent.leases.clear()
+            if self.authdata is not None and not self.done.is_set():
+                for other in self.agents.values():
+                    self._fill_leases(other)
+        try:
+            agent.sock.close()
+        except OSError:
+            pass
+        print(f"Agent {agent.name} left")
+
+    def _job_message(self) -> dict:
+        return {'type': 'job', 'job': self.job, 'authdata': self.authdata,
+                'difficulty': self.difficulty}
+
+    def _next_range(self, size: int) -> Optional[Tuple[int, int]]:
+        if self.reclaimed:
+            return self.reclaimed.popleft()
+        if self.next_nonce >= self.space:
+            return None
+        start = self.next_nonce
+        self.next_nonce = min(self.space, start + size)
+        return start, self.next_nonce
+
+    def _fill_leases(self, agent: _AgentLink) -> None:
+        """Top the agent up to its running lease plus PREFETCH_LEASES queued
+        ones (caller holds the lock)"""
+        if not agent.workers:
+            return
+        while len(agent.leases) < 1 + PREFETCH_LEASES:
+            nonce_range = self._next_range(agent.lease_size())
+            if nonce_range is None:
+                return
+            self.lease_id += 1
+            agent.leases[self.lease_id] = (self.job,) + nonce_range
+            agent.send({'type': 'lease', 'job': self.job, 'lease': self.lease_id,
+                        'start': nonce_range[0], 'stop': nonce_range[1]})
+
+    def _check_exhausted(self) -> None:
+        outstanding = any(agent.leases for agent in self.agents.values())
+        if self.next_nonce >= self.space and not self.reclaimed and not outstanding:
+            self.done.set()
+
+    def _broadcast(self, message: dict) -> None:
+        for agent in list(self.agents.values()):
+            agent.send(message)
+
+    def solve(self, authdata: str, difficulty: Union[int, str], timeout: Optional[float] = None,
+              progress: Optional[Callable[[int], bool]] = None) -> Optional[str]:
+        """Lease the challenge out to every agent and wait for a verified winner.
+
+        ``progress`` is called with the hashes of completed leases at every
+        status line and stops the job by returning False.
+        """
+        self.start()
+        difficulty = int(difficulty)
+        with self.lock:
+            self.job += 1
+            self.authdata = authdata
+            self.difficulty = difficulty
+            self.space = NONCE_BASE ** suffix_length(authdata, difficulty)
+            self.next_nonce = 0
+            self.reclaimed.clear()
+            self.winner = None
+            self.found_at = None
+            self.job_hashes = 0
+            self.done.clear()
+            for agent in self.agents.values():
+                agent.leases.clear()
+                agent.job_hashes = 0
+                if agent.workers:
+                    agent.send(self._job_message())
+                    self._fill_leases(agent)
+
+        start_time = time.time()
+        deadline = None if timeout is None else start_time + timeout
+        try:
+            while not self.done.is_set():
+                wait = PROGRESS_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.time())
+                    if wait <= 0:
+                        break
+                if not self.done.wait(wait):
+                    elapsed = time.time() - start_time
+                    print(f"Cluster: {self.agent_count} agents, {self.job_hashes:,} hashes, "
+                          f"{self.aggregate_rate():,.0f} H/s, {elapsed:.0f}s")
+                    if progress is not None and not progress(self.job_hashes):
+                        break
+        finally:
+            with self.lock:
+                self.done.set()
+                self._broadcast({'type': 'cancel', 'job': self.job})
+        return self.winner
+
+    def close(self) -> None:
+        """Stop listening and disconnect every agent"""
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        with self.lock:
+            agents = list(self.agents.values())
+        for agent in agents:
+            try:
+                agent.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.local_agent is not None:
+            self.local_agent.close()
+            self.local_agent = None
+
+
+class PowAgent:
+    """Solver node: runs leased nonce ranges on a local ``PowWorkerPool``"""
+
+    def __init__(self, host: str, port: int, pool: PowWorkerPool, name: str = None):
+        self.host = host
+        self.port = port
+        self.pool = pool
+        self.name = name or socket.gethostname()
+        self.sock = None
+        self.send_lock = threading.Lock()
+        self.jobs: Dict[int, Tuple[str, int]] = {}
+        self.leases = collections.deque()
+        self.cancelled = 0
+        self.current_job = 0
+        self.wakeup = threading.Condition()
+        self.closed = False
+
+    def _hello(self) -> dict:
+        # An explicit --backend skips calibration; measure that backend instead
+        rate = calibration_results().get(self.pool.backend) or measure_backend(get_backend(self.pool.backend))
+        rate *= self.pool.num_workers
+        return {'type': 'hello', 'name': self.name, 'workers': self.pool.num_workers, 'rate': rate}
+
+    def run(self) -> None:
+        """Connect, then solve leases until the coordinator goes away"""
+        self.pool.start()
+        self.sock = socket.create_connection((self.host, self.port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        _send(self.sock, self.send_lock, self._hello())
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+        while True:
+            with self.wakeup:
+                while not self.leases and not self.closed:
+                    self.wakeup.wait()
+                if self.closed:
+                    return
+                job, lease, start, stop = self.leases.popleft()
+                if job <= self.cancelled or job not in self.jobs:
+                    continue
+                self.current_job = job
+            authdata, difficulty = self.jobs[job]
+
+            lease_start = time.time()
+            suffix = self.pool.solve(authdata, difficulty, start=start, stop=stop)
+            seconds = time.time() - lease_start
+            if suffix:
+                _send(self.sock, self.send_lock, {'type': 'found', 'job': job, 'suffix': suffix})
+            elif job > self.cancelled:
+                _send(self.sock, self.send_lock,
+                      {'type': 'done', 'job': job, 'lease': lease, 'seconds': seconds})
+
+    def _read_loop(self) -> None:
+        for message in _messages(self.sock):
+            kind = message.get('type')
+            with self.wakeup:
+                if kind == 'job':
+                    # Only the newest job matters; older leases are dropped
+                    self.jobs = {message['job']: (message['authdata'], int(message['difficulty']))}
+                elif kind == 'lease':
+                    self.leases.append((message['job'], message['lease'],
+                                        message['start'], message['stop']))
+                    self.wakeup.notify()
+                elif kind == 'cancel':
+                    self.cancelled = max(self.cancelled, message['job'])
+                    self.leases.clear()
+                    if self.current_job <= self.cancelled:
+                        self.pool.cancel()
+        self.close()
+
+    def close(self) -> None:
+        with self.wakeup:
+            self.closed = True
+            self.wakeup.notify()
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Distributed PoW Cluster')
+    parser.add_argument('--coordinator', help='Run as an agent of the coordinator at HOST[:PORT]')
+    parser.add_argument('--listen', help='Run a test coordinator on HOST[:PORT]')
+    parser.add_argument('--workers', type=int, default=None, help='Agent worker processes (default: CPU count)')
+    parser.add_argument('--backend', default='auto', help='Agent PoW hash backend')
+    parser.add_argument('--difficulty', type=int, default=6, help='Difficulty of each test challenge')
+    parser.add_argument('--challenges', type=int, default=3, help='Number of test challenges')
+    parser.add_argument('--wait', type=float, default=10.0, help='Seconds to wait for agents to join')
+
+    args = parser.parse_args()
+
+    if args.coordinator:
+        host, port = parse_address(args.coordinator)
+        with PowWorkerPool(args.workers, args.backend) as pool:
+            print(f"Agent: {pool.num_workers} workers (backend: {pool.backend}), "
+                  f"coordinator {host}:{port}")
+            PowAgent(host, port, pool).run()
+        return
+
+    host, port = parse_address(args.listen or f"0.0.0.0:{DEFAULT_CLUSTER_PORT}")
+    coordinator = PowCoordinator(host, port).start()
+    try:
+        deadline = time.time() + args.wait
+        while coordinator.agent_count == 0 and time.time() < deadline:
+            time.sleep(0.1)
+        print(f"{coordinator.agent_count} agents connected")
+        for i in range(args.challenges):
+            authdata = f"challenge-{i}-{time.time()}".ljust(64, '.')
+            start_time = time.time()
+            suffix = coordinator.solve(authdata, args.difficulty, timeout=600)
+            elapsed = time.time() - start_time
+            valid = suffix is not None and verify_suffix(authdata, suffix, args.difficulty)
+            print(f"Challenge {i}: {suffix} in {elapsed:.3f}s (valid: {valid})")
+    finally:
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    main()
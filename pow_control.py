@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Shared-Memory PoW Control Block
+Stop word, winner slot and per-worker hash counters without a Manager process.
+"""
+
+import ctypes
+import multiprocessing
+import time
+from typing import List, Optional, Tuple
+
+# Words per 64-byte cache line; every counter gets a line of its own so
+# workers never write to a line another worker is writing to
+CACHE_LINE_WORDS = 8
+WINNER_SIZE = 64
+
+# Header line (word index)
+_STOP = 0
+_WINNER_SET = 1
+_WINNER_WORKER = 2
+_WINNER_ATTEMPTS = 3
+_WINNER_LENGTH = 4
+_WINNER_FOUND = 5
+
+
+class ControlBlock:
+    """Coordination state shared by a group of PoW workers.
+
+    Backed by ``RawArray`` memory, so ``is_set()`` and ``add_hashes()`` are
+    plain memory accesses instead of Manager proxy round-trips. Each
+    counter has a single writer (its worker) and the monitor only reads,
+    so counters need no lock; the lock only serialises winner claims.
+    Works the same between threads and between forked processes, and
+    stands in for ``stop_event`` in the ``pow_backends`` searches.
+
+    Stopping also writes a byte to a pipe, so the monitor blocks in
+    ``wait()`` and wakes the moment a winner is posted instead of polling.
+    """
+
+    def __init__(self, num_workers: int, ctx=multiprocessing):
+        self.num_workers = num_workers
+        self.words = ctx.RawArray(ctypes.c_uint64, CACHE_LINE_WORDS * (num_workers + 1))
+        self.winner_buf = ctx.RawArray(ctypes.c_uint8, WINNER_SIZE)
+        self.lock = ctx.Lock()
+        self.wake_reader, self.wake_writer = ctx.Pipe(duplex=False)
+
+    def is_set(self) -> bool:
+        """True once a winner was posted or ``set()`` was called"""
+        return self.words[_STOP] != 0
+
+    def set(self) -> None:
+        """Ask every worker to stop"""
+        if not self.words[_STOP]:
+            self.words[_STOP] = 1
+            self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self.wake_writer.send_bytes(b'!')
+        except OSError:
+            pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the stop word is set or ``timeout`` passes; return ``is_set()``"""
+        if not self.is_set():
+            self.wake_reader.poll(timeout)
+        return self.is_set()
+
+    def add_hashes(self, worker_id: int, count: int) -> None:
+        """Add to the calling worker's own counter"""
+        self.words[CACHE_LINE_WORDS * (worker_id + 1)] += count
+
+    def hashes(self, worker_id: int) -> int:
+        return self.words[CACHE_LINE_WORDS * (worker_id + 1)]
+
+    def worker_hashes(self) -> List[int]:
+        """Current count of every worker"""
+        return [self.words[CACHE_LINE_WORDS * (i + 1)] for i in range(self.num_workers)]
+
+    def total_hashes(self) -> int:
+        """Exact number of hashes computed by all workers so far"""
+        return sum(self.worker_hashes())
+
+    def post_winner(self, worker_id: int, suffix: str, attempts: int = 0) -> bool:
+        """Claim the winner slot and stop all workers; False if already claimed"""
+        data = suffix.encode('ascii')
+        if len(data) > WINNER_SIZE:
+            raise ValueError(f"Suffix of {len(data)} bytes exceeds {WINNER_SIZE}")
+        with self.lock:
+            if self.words[_WINNER_SET]:
+                return False
+            ctypes.memmove(self.winner_buf, data, len(data))
+            self.words[_WINNER_WORKER] = worker_id
+            self.words[_WINNER_ATTEMPTS] = attempts
+            self.words[_WINNER_LENGTH] = len(data)
+            self.words[_WINNER_FOUND] = time.monotonic_ns()
+            self.words[_WINNER_SET] = 1
+            self.words[_STOP] = 1
+        self._wake()
+        return True
+
+    def winner(self) -> Optional[Tuple[str, int, int]]:
+        """Return ``(suffix, worker_id, attempts)`` or None when nobody won yet"""
+        with self.lock:
+            if not self.words[_WINNER_SET]:
+                return None
+            length = self.words[_WINNER_LENGTH]
+            suffix = bytes(self.winner_buf[:length]).decode('ascii')
+            return suffix, self.words[_WINNER_WORKER], self.words[_WINNER_ATTEMPTS]
+
+    def found_at(self) -> Optional[float]:
+        """``time.monotonic()`` at which the winner was posted, None before that"""
+        if not self.words[_WINNER_SET]:
+            return None
+        return self.words[_WINNER_FOUND] / 1e9
+
+    def reset(self) -> None:
+        """Clear the stop word, winner slot and counters for a new challenge"""
+        with self.lock:
+            ctypes.memset(self.words, 0, ctypes.sizeof(self.words))
+            while self.wake_reader.poll():
+                self.wake_reader.recv_bytes()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Proof-of-Work Deadline Planner
+ETA, success probability and timeouts derived from the server's POW window.
+"""
+
+import math
+import time
+from typing import NamedTuple, Optional, Union
+
+# The server drops the connection this long after sending POW
+POW_WINDOW = 7200.0
+
+# Kept back from the window for writing the answer
+SEND_MARGIN = 5.0
+
+# Give up once finishing before the deadline is less likely than this ...
+GIVE_UP_PROBABILITY = 0.01
+# ... but only after the rate was measured for this long
+MIN_RATE_SECONDS = 30.0
+
+REPORT_INTERVAL = 30.0
+
+# Two-sided band printed around the median ETA
+ETA_BAND = (0.05, 0.95)
+
+
+def expected_attempts(difficulty: Union[int, str]) -> int:
+    """Mean attempts for ``difficulty`` leading hex zeros"""
+    return 16 ** int(difficulty)
+
+
+def success_probability(rate: float, seconds: float, difficulty: Union[int, str]) -> float:
+    """Chance of a hit within ``seconds`` at ``rate`` H/s.
+
+    Each attempt succeeds independently with p = 16^-d, so the number of
+    attempts to the first hit is geometric and, at these sizes, the time to
+    it is exponential: P = 1 - exp(-rate * seconds / 16^d).
+    """
+    if rate <= 0 or seconds <= 0:
+        return 0.0
+    return -math.expm1(-rate * seconds / expected_attempts(difficulty))
+
+
+def eta_quantile(rate: float, difficulty: Union[int, str], q: float) -> float:
+    """Seconds within which a hit arrives with probability ``q``"""
+    if rate <= 0:
+        return math.inf
+    return -math.log1p(-q) * expected_attempts(difficulty) / rate
+
+
+def format_duration(seconds: float) -> str:
+    if math.isinf(seconds):
+        return 'never'
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class Estimate(NamedTuple):
+    elapsed: float
+    hashes: int
+    rate: float
+    remaining: float
+    probability: float
+    eta: float
+    eta_low: float
+    eta_high: float
+
+
+class DeadlinePlanner:
+    """Tracks one challenge against the server deadline.
+
+    The search is memoryless: hashes already done do not shorten the
+    remaining wait, so the ETA is always measured from now.
+    """
+
+    def __init__(self, difficulty: Union[int, str], started: Optional[float] = None,
+                 window: float = POW_WINDOW, margin: float = SEND_MARGIN,
+                 give_up_probability: float = GIVE_UP_PROBABILITY,
+                 report_interval: float = REPORT_INTERVAL):
+        self.difficulty = int(difficulty)
+        self.started = started or time.time()
+        self.deadline = self.started + window - margin
+        self.give_up_probability = give_up_probability
+        self.report_interval = report_interval
+        self.solve_started = None
+        self.last_report = None
+        self.gave_up = False
+        self.cancelled = False
+
+    def timeout(self) -> float:
+        """Seconds a solver may still run"""
+        return max(0.0, self.deadline - time.time())
+
+    @property
+    def expired(self) -> bool:
+        return self.gave_up or time.time() >= self.deadline
+
+    def begin(self, rate_hint: Optional[float] = None) -> None:
+        """Mark the start of hashing and print the plan"""
+        now = time.time()
+        self.solve_started = self.last_report = now
+        remaining = self.deadline - now
+        plan = (f"Deadline plan: difficulty {self.difficulty}, {expected_attempts(self.difficulty):.3g} "
+                f"expected attempts, {format_duration(remaining)} until the POW deadline")
+        if rate_hint:
+            probability = success_probability(rate_hint, remaining, self.difficulty)
+            plan += (f"; at ~{rate_hint:,.0f} H/s median ETA "
+                     f"{format_duration(eta_quantile(rate_hint, self.difficulty, 0.5))}, "
+                     f"P(before deadline) {probability:.1%}")
+        print(plan)
+
+    def update(self, hashes: int, now: Optional[float] = None) -> Estimate:
+        now = now or time.time()
+        if self.solve_started is None:
+            self.solve_started = now
+        elapsed = now - self.solve_started
+        rate = hashes / elapsed if elapsed > 0 else 0.0
+        remaining = max(0.0, self.deadline - now)
+        low, high = ETA_BAND
+        return Estimate(elapsed, hashes, rate, remaining,
+                        success_probability(rate, remaining, self.difficulty),
+                        eta_quantile(rate, self.difficulty, 0.5),
+                        eta_quantile(rate, self.difficulty, low),
+                        eta_quantile(rate, self.difficulty, high))
+
+    def hopeless(self, estimate: Estimate) -> bool:
+        return (estimate.elapsed >= MIN_RATE_SECONDS
+                and estimate.probability < self.give_up_probability)
+
+    def describe(self, estimate: Estimate) -> str:
+        low, high = ETA_BAND
+        return (f"{estimate.hashes:,} hashes in {format_duration(estimate.elapsed)} "
+                f"({estimate.rate:,.0f} H/s), ETA {format_duration(estimate.eta)} "
+                f"[{low:.0%}-{high:.0%}: {format_duration(estimate.eta_low)}-"
+                f"{format_duration(estimate.eta_high)}], "
+                f"P(before deadline) {estimate.probability:.1%}, "
+                f"deadline in {format_duration(estimate.remaining)}")
+
+    def cancel(self) -> None:
+        """Make the solvers stop at their next progress check"""
+        self.cancelled = True
+
+    def check(self, hashes: int) -> bool:
+        """Progress hook for the solvers: report periodically and return
+        False once the deadline passed, success became hopeless or the
+        solve was cancelled"""
+        if self.cancelled:
+            return False
+        now = time.time()
+        estimate = self.update(hashes, now)
+        if self.last_report is None or now - self.last_report >= self.report_interval:
+            self.last_report = now
+            print(f"Progress: {self.describe(estimate)}")
+        if now >= self.deadline:
+            print("POW deadline reached, giving up")
+            self.gave_up = True
+            return False
+        if self.hopeless(estimate):
+            print(f"Giving up: {estimate.probability:.2%} chance of finishing before the deadline "
+                  f"at {estimate.rate:,.0f} H/s")
+            self.gave_up = True
+            return False
+        return True
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Proof-of-Work Deadline Planner')
+    parser.add_argument('--rate', type=float, required=True, help='Aggregate hash rate (H/s)')
+    parser.add_argument('--window', type=float, default=POW_WINDOW, help='POW window in seconds')
+
+    args = parser.parse_args()
+
+    low, high = ETA_BAND
+    print(f"{'d':>2} {'attempts':>10} {'median':>8} {f'{low:.0%}':>8} {f'{high:.0%}':>8} {'P(window)':>10}")
+    for difficulty in range(1, 13):
+        print(f"{difficulty:>2} {expected_attempts(difficulty):>10.3g} "
+              f"{format_duration(eta_quantile(args.rate, difficulty, 0.5)):>8} "
+              f"{format_duration(eta_quantile(args.rate, difficulty, low)):>8} "
+              f"{format_duration(eta_quantile(args.rate, difficulty, high)):>8} "
+              f"{success_probability(args.rate, args.window, difficulty):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Proof-of-Work Hashing Engine
+Shared SHA-1 prefix-state (midstate) hashing, nonce enumeration and
+difficulty checks for every PoW solver.
+"""
+
+import hashlib
+import string
+import timeit
+from typing import Callable, Iterator, NamedTuple, Tuple, Union
+
+# SHA-1 compresses the message in 64-byte blocks
+SHA1_BLOCK_SIZE = 64
+SHA1_DIGEST_SIZE = 20
+# Padding appends at least 0x80 plus the 8-byte message length
+SHA1_PADDING = 9
+
+# 64 printable, non-whitespace ASCII characters. A power-of-two alphabet
+# turns nonce digit extraction into a shift and a mask.
+NONCE_ALPHABET = (string.ascii_letters + string.digits + '+/').encode('ascii')
+NONCE_BITS = 6
+NONCE_BASE = 1 << NONCE_BITS
+NONCE_MASK = NONCE_BASE - 1
+NONCE_LENGTH = 8
+
+# Search space kept beyond the 16**difficulty expected attempts; 16 bits
+# leaves a chance of about e**-65536 that the space holds no solution.
+# The planner gives up headroom down to the minimum (about e**-256) when
+# that saves a compression block per attempt.
+PLAN_MARGIN_BITS = 16
+PLAN_MIN_MARGIN_BITS = 8
+
+# Single-byte tails indexed by the last nonce digit
+NONCE_TAILS = tuple(bytes((c,)) for c in NONCE_ALPHABET)
+
+# Successor of each alphabet byte, wrapping to the first one on carry
+_NONCE_SUCC = bytearray(256)
+for _i, _c in enumerate(NONCE_ALPHABET):
+    _NONCE_SUCC[_c] = NONCE_ALPHABET[(_i + 1) & NONCE_MASK]
+del _i, _c
+
+
+# SHA-1 initial state and round constants (FIPS 180-4)
+SHA1_IV = (0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0)
+SHA1_K = (0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xCA62C1D6)
+_MASK32 = 0xFFFFFFFF
+
+
+def sha1_compress(state: Tuple[int, ...], block: bytes) -> Tuple[int, ...]:
+    """Pure-Python SHA-1 compression of one 64-byte block.
+
+    Only used to expose midstate words (hashlib keeps them private); the
+    solvers themselves hash with hashlib or a vectorized backend.
+    """
+    w = list(int.from_bytes(block[i:i + 4], 'big') for i in range(0, SHA1_BLOCK_SIZE, 4))
+    for t in range(16, 80):
+        x = w[t - 3] ^ w[t - 8] ^ w[t - 14] ^ w[t - 16]
+        w.append(((x << 1) | (x >> 31)) & _MASK32)
+    
+    a, b, c, d, e = state
+    for t in range(80):
+        if t < 20:
+            f = (b & c) | (~b & d)
+        elif t < 40 or t >= 60:
+            f = b ^ c ^ d
+        else:
+            f = (b & c) | (b & d) | (c & d)
+        temp = (((a << 5) | (a >> 27)) + f + e + SHA1_K[t // 20] + w[t]) & _MASK32
+        a, b, c, d, e = temp, a, ((b << 30) | (b >> 2)) & _MASK32, c, d
+    
+    return tuple((x + y) & _MASK32 for x, y in zip(state, (a, b, c, d, e)))
+
+
+def _to_bytes(data: Union[str, bytes, bytearray]) -> bytes:
+    """Encode str input as UTF-8, pass bytes through unchanged"""
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return bytes(data)
+
+
+def difficulty_limit(difficulty: Union[int, str]) -> bytes:
+    """Smallest 20-byte digest that has fewer than ``difficulty`` leading hex zeros.
+
+    A digest has at least ``difficulty`` leading zero nibbles exactly when
+    it sorts below this value, so the check is one bytes comparison.
+    """
+    difficulty = int(difficulty)
+    if not 0 <= difficulty <= 2 * SHA1_DIGEST_SIZE:
+        raise ValueError(f"Difficulty out of range: {difficulty}")
+    if difficulty == 0:
+        # Longer than any digest and greater than all of them
+        return b'\xff' * (SHA1_DIGEST_SIZE + 1)
+    return (1 << (4 * (2 * SHA1_DIGEST_SIZE - difficulty))).to_bytes(SHA1_DIGEST_SIZE, 'big')
+
+
+def make_difficulty_check(difficulty: Union[int, str], method: str = 'limit') -> Callable[[bytes], bool]:
+    """Compile a predicate over raw ``digest()`` bytes for the given difficulty.
+
+    ``limit``: one bytes comparison against ``difficulty_limit()``; the
+    returned predicate is a C-level bound method with no Python frame.
+    ``mask``: whole zero bytes plus a nibble mask for odd difficulties.
+    ``int``: one integer comparison on the leading 8 bytes (difficulty <= 16).
+    
+    Hot loops avoid even the call by comparing inline:
+    ``hasher.digest() < difficulty_limit(difficulty)``.
+    """
+    difficulty = int(difficulty)
+    if method == 'limit':
+        return difficulty_limit(difficulty).__gt__
+    
+    if method == 'mask':
+        full, odd = divmod(difficulty, 2)
+        zeros = bytes(full)
+        if not odd:
+            return lambda digest: digest[:full] == zeros
+        return lambda digest: digest[:full] == zeros and digest[full] < 0x10
+    
+    if method == 'int':
+        if difficulty > 16:
+            raise ValueError(f"Integer check covers at most 16 nibbles, got {difficulty}")
+        bound = 1 << (4 * (16 - difficulty))
+        from_bytes = int.from_bytes
+        return lambda digest: from_bytes(digest[:8], 'big') < bound
+    
+    raise ValueError(f"Unknown difficulty check method: {method}")
+
+
+def verify_suffix(authdata: str, suffix: str, difficulty: Union[int, str]) -> bool:
+    """Independently rehash authdata + suffix and check it against the difficulty"""
+    digest = hashlib.sha1((authdata + suffix).encode('utf-8')).digest()
+    return make_difficulty_check(difficulty)(digest)
+
+
+class PrefixHasher:
+    """SHA-1 state with a fixed message prefix already absorbed.
+
+    The server's authdata is 64 bytes, exactly one SHA-1 block, so the
+    prefix block is compressed once per challenge. Each candidate then
+    only pays for ``copy()`` plus the compression of its own tail block.
+    ``extend()`` builds a second level of the copy tree for a suffix head
+    that stays fixed while only the tail varies.
+    """
+
+    __slots__ = ('prefix', '_state', 'copy')
+
+    def __init__(self, prefix: Union[str, bytes, bytearray] = b'', _state=None):
+        self.prefix = _to_bytes(prefix)
+        self._state = hashlib.sha1(self.prefix) if _state is None else _state
+        # Bound method of the absorbed state; hot loops call this directly
+        self.copy = self._state.copy
+
+    def extend(self, head: Union[str, bytes, bytearray]) -> 'PrefixHasher':
+        """Return a child hasher with ``head`` absorbed after the prefix"""
+        head = _to_bytes(head)
+        state = self._state.copy()
+        state.update(head)
+        return PrefixHasher(self.prefix + head, _state=state)
+
+    def digest(self, tail: Union[bytes, bytearray] = b'') -> bytes:
+        """Raw SHA-1 digest of prefix + tail"""
+        hasher = self._state.copy()
+        hasher.update(tail)
+        return hasher.digest()
+
+    def hexdigest(self, tail: Union[str, bytes, bytearray] = b'') -> str:
+        """Hex SHA-1 digest of prefix + tail"""
+        hasher = self._state.copy()
+        hasher.update(_to_bytes(tail))
+        return hasher.hexdigest()
+
+    def midstate(self) -> Tuple[Tuple[int, ...], bytes]:
+        """Return ``(state_words, pending)`` after absorbing the prefix.
+
+        ``state_words`` are the five 32-bit chaining words after all full
+        prefix blocks; ``pending`` is the partial block still buffered.
+        """
+        state = SHA1_IV
+        full = self.blocks_absorbed() * SHA1_BLOCK_SIZE
+        for i in range(0, full, SHA1_BLOCK_SIZE):
+            state = sha1_compress(state, self.prefix[i:i + SHA1_BLOCK_SIZE])
+        return state, self.prefix[full:]
+    
+    def blocks_absorbed(self) -> int:
+        """Number of full blocks already compressed into the shared state"""
+        return len(self.prefix) // SHA1_BLOCK_SIZE
+
+    def __repr__(self):
+        return f"PrefixHasher(prefix_len={len(self.prefix)}, blocks={self.blocks_absorbed()})"
+
+
+def compression_blocks(message_length: int) -> int:
+    """Number of SHA-1 compression calls for a message of this length"""
+    return (message_length + SHA1_PADDING + SHA1_BLOCK_SIZE - 1) // SHA1_BLOCK_SIZE
+
+
+class SuffixPlan(NamedTuple):
+    """Suffix length chosen for one challenge and what it costs per attempt"""
+
+    prefix_length: int
+    length: int
+    difficulty: int
+
+    @property
+    def search_bits(self) -> int:
+        return NONCE_BITS * self.length
+
+    @property
+    def blocks_per_attempt(self) -> int:
+        """Compressions per candidate once the full prefix blocks are absorbed"""
+        return compression_blocks(self.prefix_length % SHA1_BLOCK_SIZE + self.length)
+
+    @property
+    def full_blocks(self) -> int:
+        """Compressions per candidate when hashing from scratch"""
+        return compression_blocks(self.prefix_length + self.length)
+
+    def describe(self) -> str:
+        text = (f"suffix {self.length} chars ({self.search_bits}-bit space for "
+                f"{4 * self.difficulty}-bit difficulty), {self.blocks_per_attempt} "
+                f"compression(s)/attempt with midstate, {self.full_blocks} from scratch")
+        if self.blocks_per_attempt > 1:
+            text += " - authdata tail leaves no room, every candidate pays an extra block"
+        return text
+
+
+def plan_suffix(authdata: Union[str, bytes, bytearray], difficulty: Union[int, str],
+                preferred: int = NONCE_LENGTH, margin_bits: int = PLAN_MARGIN_BITS) -> SuffixPlan:
+    """Pick the suffix length for a challenge from the authdata length.
+
+    The length covers ``16**difficulty`` expected attempts plus
+    ``margin_bits`` of headroom and stays at ``preferred`` when that is
+    enough. It never grows the padded message by a compression block:
+    when the full headroom would spill over, it falls back to
+    ``PLAN_MIN_MARGIN_BITS`` if that fits in fewer blocks.
+    """
+    prefix_length = len(_to_bytes(authdata))
+    difficulty = int(difficulty)
+    tail = prefix_length % SHA1_BLOCK_SIZE
+
+    def needed(margin):
+        return max(1, -(-(4 * difficulty + margin) // NONCE_BITS))
+
+    length = needed(margin_bits)
+    shortest = needed(min(margin_bits, PLAN_MIN_MARGIN_BITS))
+    if compression_blocks(tail + shortest) < compression_blocks(tail + length):
+        length = shortest
+    # Grow towards the preferred length while the block count stays put
+    blocks = compression_blocks(tail + length)
+    while length < preferred and compression_blocks(tail + length + 1) == blocks:
+        length += 1
+    return SuffixPlan(prefix_length, length, difficulty)
+
+
+def suffix_length(authdata: Union[str, bytes, bytearray], difficulty: Union[int, str]) -> int:
+    """Shorthand for ``plan_suffix(authdata, difficulty).length``"""
+    return plan_suffix(authdata, difficulty).length
+
+
+class NonceEnumerator:
+    """Deterministic enumerator over a contiguous range of integer nonces.
+
+    Nonce ``n`` is encoded big-endian in base 64 over ``NONCE_ALPHABET``
+    into a fixed-length buffer that is advanced odometer-style, so almost
+    every step rewrites only the last byte. Disjoint ranges from
+    ``partition()`` guarantee that no two workers (or hosts) ever hash the
+    same candidate, and the same range always yields the same candidates.
+    """
+
+    def __init__(self, start: int = 0, stop: int = None, length: int = NONCE_LENGTH):
+        if length < 1:
+            raise ValueError(f"Nonce length must be positive: {length}")
+        space = NONCE_BASE ** length
+        if stop is None:
+            stop = space
+        if not 0 <= start <= stop <= space:
+            raise ValueError(f"Invalid nonce range [{start}, {stop}) for length {length}")
+        self.start = start
+        self.stop = stop
+        self.length = length
+
+    @classmethod
+    def partition(cls, index: int, count: int, length: int = NONCE_LENGTH) -> 'NonceEnumerator':
+        """Return slice ``index`` of ``count`` equal, disjoint slices of the nonce space"""
+        if not 0 <= index < count:
+            raise ValueError(f"Partition index {index} out of range for {count} partitions")
+        space = NONCE_BASE ** length
+        return cls(space * index // count, space * (index + 1) // count, length)
+
+    @staticmethod
+    def encode(n: int, length: int = NONCE_LENGTH) -> bytearray:
+        """Encode integer ``n`` as a ``length``-byte nonce"""
+        buf = bytearray(length)
+        for i in range(length - 1, -1, -1):
+            buf[i] = NONCE_ALPHABET[n & NONCE_MASK]
+            n >>= NONCE_BITS
+        return buf
+
+    @staticmethod
+    def advance(buf: bytearray) -> None:
+        """Increment an encoded nonce in place, carrying from the last byte"""
+        first = NONCE_ALPHABET[0]
+        i = len(buf) - 1
+        while i >= 0:
+            c = _NONCE_SUCC[buf[i]]
+            buf[i] = c
+            if c != first:
+                return
+            i -= 1
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self) -> Iterator[bytearray]:
+        """Yield every nonce in the range; the same buffer is reused"""
+        buf = self.encode(self.start, self.length)
+        advance = self.advance
+        for _ in range(self.stop - self.start):
+            yield buf
+            advance(buf)
+
+    def blocks(self) -> Iterator[Tuple[bytes, Tuple[bytes, ...]]]:
+        """Yield ``(head, tails)`` pairs covering the range in order.
+
+        ``head`` is the nonce without its last digit and ``tails`` the
+        single-byte endings sharing it, which maps directly onto a
+        two-level ``PrefixHasher`` copy tree.
+        """
+        n = self.start
+        stop = self.stop
+        head = self.encode(n >> NONCE_BITS, self.length - 1)
+        advance = self.advance
+        while n < stop:
+            first = n & NONCE_MASK
+            last = min(NONCE_BASE, first + stop - n)
+            yield bytes(head), NONCE_TAILS[first:last]
+            n += last - first
+            advance(head)
+
+    def __repr__(self):
+        return f"NonceEnumerator(start={self.start}, stop={self.stop}, length={self.length})"
+
+
+_BENCH_SETUP = """
+import hashlib
+from pow_engine import SHA1_BLOCK_SIZE, difficulty_limit, make_difficulty_check
+copy = hashlib.sha1(b'x' * SHA1_BLOCK_SIZE).copy
+digest = hashlib.sha1(b'nonce').digest()
+hexdigest = digest.hex()
+target = '0' * difficulty
+target_len = difficulty
+limit = difficulty_limit(difficulty)
+check = make_difficulty_check(difficulty)
+mask_check = make_difficulty_check(difficulty, 'mask')
+int_check = make_difficulty_check(difficulty, 'int')
+"""
+
+# Check alone, then the full per-attempt line the solvers run
+_BENCH_STATEMENTS = {
+    'hexdigest startswith': "hexdigest.startswith(target)",
+    'hexdigest slice': "hexdigest[:target_len] == target",
+    'mask predicate': "mask_check(digest)",
+    'int predicate': "int_check(digest)",
+    'limit predicate': "check(digest)",
+    'inline limit': "digest < limit",
+    'attempt: hexdigest startswith': "h = copy(); h.update(b'nonce'); h.hexdigest().startswith(target)",
+    'attempt: digest < limit': "h = copy(); h.update(b'nonce'); h.digest() < limit",
+}
+
+
+def benchmark_difficulty_checks(difficulty: int = 7, number: int = 1000000, repeat: int = 5) -> dict:
+    """Time each way of testing a digest against the difficulty.
+
+    Returns the best-of-``repeat`` nanoseconds per check, keyed by method.
+    """
+    setup = f"difficulty = {int(difficulty)}" + _BENCH_SETUP
+    return {
+        name: min(timeit.repeat(stmt, setup, number=number, repeat=repeat)) * 1e9 / number
+        for name, stmt in _BENCH_STATEMENTS.items()
+    }
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Proof-of-Work Hashing Engine')
+    parser.add_argument('--benchmark', action='store_true', help='Run difficulty check microbenchmark')
+    parser.add_argument('--difficulty', type=int, default=7, help='Difficulty used by the benchmark')
+    parser.add_argument('--number', type=int, default=1000000, help='Checks per benchmark method')
+    parser.add_argument('--plan', type=int, metavar='AUTHDATA_LENGTH',
+                        help='Show the suffix plan for an authdata length at --difficulty')
+    
+    args = parser.parse_args()
+    
+    if args.plan is not None:
+        print(plan_suffix(b'x' * args.plan, args.difficulty).describe())
+        return
+    
+    if not args.benchmark:
+        parser.print_help()
+        return
+    
+    print(f"Difficulty check microbenchmark (difficulty {args.difficulty}, {args.number:,} checks)")
+    results = benchmark_difficulty_checks(args.difficulty, args.number)
+    for name, nsec in results.items():
+        baseline = results['attempt: hexdigest startswith' if name.startswith('attempt') else 'hexdigest startswith']
+        print(f"  {name:32s} {nsec:8.1f} ns  ({baseline / nsec:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+PoW Solver Metrics
+Prometheus text-format metrics over HTTP or a node-exporter textfile.
+"""
+
+import collections
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Union
+
+# Response latency buckets in seconds; the POW bucket range reaches the 2-hour window
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, 7200.0)
+
+# Winner-found to answer-written buckets in seconds, from a pipe wake-up to a slow poll
+FOUND_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+TEXTFILE_INTERVAL = 5.0
+
+# A live hash source returns per-worker cumulative counts for the running solve
+HashSource = Callable[[], Union[List[int], Dict[str, int]]]
+
+
+def command_label(cmd: str) -> str:
+    """MAIL1, MAIL2, ... and ADDRLINE1, ... share one label"""
+    return re.sub(r'\d+$', '', cmd) or cmd
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class SolverMetrics:
+    """Solver and protocol counters shared by the client and its exporters.
+
+    Solvers attach a live hash source (``PowWorkerPool.worker_hashes``,
+    ``ControlBlock.worker_hashes``, ...) so a scrape sees current per-worker
+    counts instead of numbers batched up for a periodic print.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts_total = 0
+        self.solves = collections.Counter()
+        self.commands = collections.Counter()
+        self.handshakes = collections.Counter()
+        self.latency: Dict[str, _Histogram] = {}
+        self.found_to_sent = _Histogram(FOUND_BUCKETS)
+
+        self.difficulty = 0
+        self.solve_started = None
+        self.solve_elapsed = 0.0
+        self.source: Optional[HashSource] = None
+        self.source_started = None
+        self.folded = 0
+        self.found_at = None
+
+    # Solver side
+
+    def begin_solve(self, difficulty: int) -> None:
+        with self.lock:
+            self.difficulty = int(difficulty)
+            self.solve_started = time.time()
+            self.solve_elapsed = 0.0
+            self.source = None
+            self.folded = 0
+            self.found_at = None
+
+    def mark_found(self, at: Optional[float] = None) -> None:
+        """Record the ``time.monotonic()`` at which a worker found the winner"""
+        with self.lock:
+            self.found_at = time.monotonic() if at is None else at
+
+    def attach(self, source: HashSource) -> None:
+        """Follow a solver's live counters; a fallback solver replaces the previous one"""
+        with self.lock:
+            self._fold()
+            self.source = source
+            self.source_started = time.time()
+
+    def add_attempts(self, attempts: int) -> None:
+        """Count attempts of a solver without live counters"""
+        with self.lock:
+            self.folded += attempts
+            self.attempts_total += attempts
+
+    def end_solve(self, solved: bool) -> None:
+        with self.lock:
+            self._fold()
+            if self.solve_started is not None:
+                self.solve_elapsed = time.time() - self.solve_started
+            self.solve_started = None
+            self.solves['solved' if solved else 'failed'] += 1
+            if solved and self.found_at is None:
+                # Solver without a shared found time: count from its return
+                self.found_at = time.monotonic()
+
+    def _fold(self) -> None:
+        # Move the finished source's count into the lifetime total
+        if self.source is not None:
+            hashes = sum(self._worker_counts().values())
+            self.attempts_total += hashes
+            self.folded += hashes
+        self.source = None
+
+    def _worker_counts(self) -> Dict[str, int]:
+        if self.source is None:
+            return {}
+        try:
+            counts = self.source()
+        except Exception:
+            return {}
+        if isinstance(counts, dict):
+            return {str(k): int(v) for k, v in counts.items()}
+        return {str(i): int(v) for i, v in enumerate(counts)}
+
+    # Protocol side
+
+    def observe_command(self, cmd: str, seconds: float) -> None:
+        label = command_label(cmd)
+        with self.lock:
+            self.commands[label] += 1
+            self.latency.setdefault(label, _Histogram()).observe(seconds)
+
+    def observe_handshake(self, resumed: bool) -> None:
+        with self.lock:
+            self.handshakes['resumed' if resumed else 'full'] += 1
+
+    def observe_sent(self) -> Optional[float]:
+        """Call once the answer was written; returns the found-to-sent seconds"""
+        with self.lock:
+            if self.found_at is None:
+                return None
+            seconds = max(0.0, time.monotonic() - self.found_at)
+            self.found_at = None
+            self.found_to_sent.observe(seconds)
+        return seconds
+
+    # Exposition
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        with self.lock:
+            now = time.time()
+            workers = self._worker_counts()
+            live = sum(workers.values())
+            source_elapsed = now - self.source_started if self.source is not None else 0.0
+            active = self.solve_started is not None
+            elapsed = now - self.solve_started if active else self.solve_elapsed
+
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+            metric('pow_worker_hashes', 'gauge', 'Hashes computed by each worker in the current solver run',
+                   [({'worker': w}, n) for w, n in sorted(workers.items())])
+            metric('pow_worker_hash_rate', 'gauge', 'Average H/s of each worker in the current solver run',
+                   [({'worker': w}, f"{n / source_elapsed:.1f}" if source_elapsed > 0 else 0)
+                    for w, n in sorted(workers.items())])
+            metric('pow_hash_rate', 'gauge', 'Aggregate H/s of the current solver run',
+                   [({}, f"{live / source_elapsed:.1f}" if source_elapsed > 0 else 0)])
+            metric('pow_attempts_total', 'counter', 'Hashes computed since start-up',
+                   [({}, self.attempts_total + live)])
+            metric('pow_solve_attempts', 'gauge', 'Hashes computed for the current or last challenge',
+                   [({}, self.folded + live)])
+            metric('pow_difficulty', 'gauge', 'Difficulty of the current or last challenge',
+                   [({}, self.difficulty)])
+            metric('pow_solve_active', 'gauge', '1 while a challenge is being solved',
+                   [({}, int(active))])
+            metric('pow_solve_elapsed_seconds', 'gauge', 'Elapsed time of the current or last solve',
+                   [({}, f"{elapsed:.3f}")])
+            metric('pow_solves_total', 'counter', 'Finished solves by result',
+                   [({'result': r}, self.solves[r]) for r in ('solved', 'failed')])
+            metric('protocol_commands_total', 'counter', 'Server commands handled',
+                   [({'command': c}, n) for c, n in sorted(self.commands.items())])
+            metric('tls_handshakes_total', 'counter', 'TLS connections by handshake kind',
+                   [({'kind': k}, self.handshakes[k]) for k in ('full', 'resumed')])
+
+            lines.append('# HELP protocol_command_latency_seconds Time from reading a command to writing the response')
+            lines.append('# TYPE protocol_command_latency_seconds histogram')
+            for cmd, hist in sorted(self.latency.items()):
+                label = _escape(cmd)
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'protocol_command_latency_seconds_bucket{{command="{label}",le="{bound}"}} {count}')
+                lines.append(f'protocol_command_latency_seconds_bucket{{command="{label}",le="+Inf"}} {hist.count}')
+                lines.append(f'protocol_command_latency_seconds_sum{{command="{label}"}} {hist.total:.6f}')
+                lines.append(f'protocol_command_latency_seconds_count{{command="{label}"}} {hist.count}')
+
+            hist = self.found_to_sent
+            lines.append('# HELP pow_found_to_sent_seconds Time from a worker finding the winner to the answer being written')
+            lines.append('# TYPE pow_found_to_sent_seconds histogram')
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'pow_found_to_sent_seconds_bucket{{le="{bound}"}} {count}')
+            lines.append(f'pow_found_to_sent_seconds_bucket{{le="+Inf"}} {hist.count}')
+            lines.append(f'pow_found_to_sent_seconds_sum {hist.total:.6f}')
+            lines.append(f'pow_found_to_sent_seconds_count {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsHTTPServer:
+    """Serves ``/metrics`` on a local port from a daemon thread"""
+
+    def __init__(self, metrics: SolverMetrics, port: int, host: str = '127.0.0.1'):
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics_ref.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Metrics: http://{host}:{self.port}/metrics")
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TextfileExporter:
+    """Rewrites a node-exporter textfile (``*.prom``) atomically at an interval"""
+
+    def __init__(self, metrics: SolverMetrics, path: str, interval: float = TEXTFILE_INTERVAL):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        threading.Thread(target=self._loop, daemon=True).start()
+        print(f"Metrics: writing {path} every {interval:g}s")
+
+    def write(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.metrics.render())
+        os.replace(tmp, self.path)
+
+    def _loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Metrics textfile error: {e}")
+
+    def close(self) -> None:
+        self.stopped.set()
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+def start_exporters(metrics: SolverMetrics, port: Optional[int] = None,
+                    textfile: Optional[str] = None) -> list:
+    """Start the exporters requested on the command line"""
+    exporters = []
+    if port is not None:
+        exporters.append(MetricsHTTPServer(metrics, port))
+    if textfile:
+        exporters.append(TextfileExporter(metrics, textfile))
+    return exporters
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    from pow_pool import PowWorkerPool
+
+    parser = argparse.ArgumentParser(description='PoW Solver Metrics')
+    parser.add_argument('--port', type=int, default=9336, help='HTTP port for /metrics')
+    parser.add_argument('--difficulty', type=int, default=7, help='Difficulty of the demo solve')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes')
+
+    args = parser.parse_args()
+
+    metrics = SolverMetrics()
+    exporters = start_exporters(metrics, port=args.port)
+    with PowWorkerPool(args.workers) as pool:
+        metrics.begin_solve(args.difficulty)
+        metrics.attach(pool.worker_hashes)
+        suffix = pool.solve(f"metrics-demo-{time.time()}".ljust(64, '.'), args.difficulty)
+        metrics.end_solve(suffix is not None)
+    print(metrics.render())
+    for exporter in exporters:
+        exporter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Numba JIT SHA-1 Backend
+Compiled proof-of-work search loop, registered when Numba is installed.
+"""
+
+from typing import Optional, Tuple, Union
+
+from pow_backends import PowBackend
+from pow_engine import (NONCE_ALPHABET, NONCE_BITS, NONCE_MASK, SHA1_BLOCK_SIZE, NonceEnumerator,
+                        PrefixHasher, compression_blocks, difficulty_limit)
+
+try:
+    import numba
+    import numpy as np
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    np = None
+    NUMBA_AVAILABLE = False
+
+# Candidates per compiled call; bounds the latency of a stop request
+# (~4 ms at 4 MH/s, with no measurable loss against 1 << 20)
+DEFAULT_BATCH_SIZE = 1 << 14
+
+
+def _search_kernel(midstate, template, alphabet, offset, length, start, count, h0_bound, h1_bound):
+    """Return the index of the first candidate passing the word bounds, or -1.
+
+    Candidate ``i`` is nonce ``start + i`` encoded into ``template`` at
+    ``offset``, one ``NONCE_BITS`` digit per byte as ``NonceEnumerator``
+    encodes it (Numba freezes the module constants at compile time). It passes when ``H0 < h0_bound``, or, with ``h0_bound`` of
+    zero, when ``H0 == 0`` and ``H1 < h1_bound``.
+    """
+    mask = 0xFFFFFFFF
+    block = template.copy()
+    w = np.zeros(80, np.int64)
+    for i in range(count):
+        n = start + i
+        for j in range(length):
+            block[offset + j] = alphabet[(n >> (NONCE_BITS * (length - 1 - j))) & NONCE_MASK]
+        for t in range(16):
+            w[t] = (block[4 * t] << 24) | (block[4 * t + 1] << 16) | (block[4 * t + 2] << 8) | block[4 * t + 3]
+        for t in range(16, 80):
+            x = w[t - 3] ^ w[t - 8] ^ w[t - 14] ^ w[t - 16]
+            w[t] = ((x << 1) | (x >> 31)) & mask
+
+        a = midstate[0]
+        b = midstate[1]
+        c = midstate[2]
+        d = midstate[3]
+        e = midstate[4]
+        # Four unrolled phases keep the round function branch-free
+        for t in range(0, 20):
+            temp = ((((a << 5) | (a >> 27)) & mask) + (d ^ (b & (c ^ d))) + e + 0x5A827999 + w[t]) & mask
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & mask, a, temp
+        for t in range(20, 40):
+            temp = ((((a << 5) | (a >> 27)) & mask) + (b ^ c ^ d) + e + 0x6ED9EBA1 + w[t]) & mask
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & mask, a, temp
+        for t in range(40, 60):
+            temp = ((((a << 5) | (a >> 27)) & mask) + ((b & c) | (d & (b | c))) + e + 0x8F1BBCDC + w[t]) & mask
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & mask, a, temp
+        for t in range(60, 80):
+            temp = ((((a << 5) | (a >> 27)) & mask) + (b ^ c ^ d) + e + 0xCA62C1D6 + w[t]) & mask
+            e, d, c, b, a = d, c, ((b << 30) | (b >> 2)) & mask, a, temp
+
+        h0 = (midstate[0] + a) & mask
+        if h0 < h0_bound:
+            return i
+        if h0_bound == 0 and h0 == 0 and ((midstate[1] + b) & mask) < h1_bound:
+            return i
+    return -1
+
+
+if NUMBA_AVAILABLE:
+    _search_kernel = numba.njit(cache=True, nogil=True)(_search_kernel)
+
+
+def _word_bounds(difficulty: int) -> Tuple[int, int]:
+    if difficulty <= 8:
+        return 1 << (32 - 4 * difficulty), 0
+    if difficulty <= 16:
+        return 0, 1 << (64 - 4 * difficulty)
+    # Deeper difficulties only pre-filter on H0 == H1 == 0
+    return 0, 1
+
+
+def numba_search(authdata: str, difficulty: Union[int, str], nonces: NonceEnumerator,
+                 stop_event=None, batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[Optional[str], int]:
+    """Search a nonce range with the compiled kernel; return ``(suffix, attempts)``"""
+    difficulty = int(difficulty)
+    limit = difficulty_limit(difficulty)
+    prefix = PrefixHasher(authdata)
+    midstate, pending = prefix.midstate()
+    length = nonces.length
+
+    template = bytearray(SHA1_BLOCK_SIZE)
+    template[:len(pending)] = pending
+    template[len(pending) + length] = 0x80
+    template[-8:] = ((len(prefix.prefix) + length) * 8).to_bytes(8, 'big')
+    template = np.frombuffer(bytes(template), dtype=np.uint8).astype(np.int64)
+    alphabet = np.frombuffer(NONCE_ALPHABET, dtype=np.uint8).astype(np.int64)
+    midstate = np.array(midstate, dtype=np.int64)
+    h0_bound, h1_bound = _word_bounds(difficulty)
+
+    start = nonces.start
+    attempts = 0
+    while start < nonces.stop:
+        if stop_event is not None and stop_event.is_set():
+            return None, attempts
+        count = min(batch_size, nonces.stop - start)
+        index = _search_kernel(midstate, template, alphabet, len(pending), length,
+                               start, count, h0_bound, h1_bound)
+        if index < 0:
+            attempts += count
+            start += count
+            continue
+        attempts += index + 1
+        suffix = bytes(NonceEnumerator.encode(start + index, length))
+        if prefix.digest(suffix) < limit:
+            return suffix.decode('ascii'), attempts
+        start += index + 1
+    return None, attempts
+
+
+def _supports(authdata: str, suffix_length: int) -> bool:
+    # Nonce indexes are int64 in the kernel
+    return (NONCE_BITS * suffix_length < 63
+            and compression_blocks(len(authdata.encode('utf-8')) % SHA1_BLOCK_SIZE + suffix_length) == 1)
+
+
+BACKEND = PowBackend('numba', numba_search, 'Numba JIT compiled SHA-1 loop',
+                     batched=True, supports=_supports) if NUMBA_AVAILABLE else None
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+NumPy Batch SHA-1 Backend
+Vectorized proof-of-work search over single-block tail messages.
+"""
+
+from typing import Optional, Tuple, Union
+
+from pow_backends import PowBackend
+from pow_engine import (NONCE_ALPHABET, NONCE_BITS, NONCE_MASK, SHA1_BLOCK_SIZE, SHA1_K,
+                        NonceEnumerator, PrefixHasher, difficulty_limit, sha1_compress)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+_MASK32 = 0xFFFFFFFF
+
+# Candidates per vectorized call: large enough to amortise the ~1,500 NumPy
+# calls per batch, small enough to keep the temporaries cache friendly
+DEFAULT_BATCH_SIZE = 1 << 15
+
+# Values are either Python ints (constant across the batch) or uint32 arrays
+# (one lane per candidate). Constant terms fold to scalars automatically, so
+# schedule words and rounds that do not depend on the suffix cost nothing
+# per candidate.
+
+
+def _rotl(x, n):
+    if isinstance(x, int):
+        return ((x << n) | (x >> (32 - n))) & _MASK32
+    return (x << n) | (x >> (32 - n))
+
+
+def _shl(x, n):
+    if isinstance(x, int):
+        return (x << n) & _MASK32
+    return x << n
+
+
+def _or(x, y):
+    if isinstance(x, int) and x == 0:
+        return y
+    if isinstance(y, int) and y == 0:
+        return x
+    return x | y
+
+
+def _add(*terms):
+    const = 0
+    total = None
+    for term in terms:
+        if isinstance(term, int):
+            const += term
+        elif total is None:
+            total = term
+        else:
+            total = total + term
+    const &= _MASK32
+    if total is None:
+        return const
+    return total + const if const else total
+
+
+def _f(t, b, c, d):
+    if t < 20:
+        return d ^ (b & (c ^ d))
+    if t < 40 or t >= 60:
+        return b ^ c ^ d
+    return (b & c) | (d & (b | c))
+
+
+class NumpySHA1Batch:
+    """Vectorized SHA-1 over many candidates sharing one absorbed prefix.
+
+    The prefix midstate is computed once. Each candidate is the pending
+    prefix bytes, a fixed-length suffix, and SHA-1 padding, all in one
+    final 64-byte block. Message-schedule words and leading rounds that do
+    not depend on the suffix are folded to constants up front.
+    """
+
+    def __init__(self, midstate: Tuple[int, ...], pending: bytes, prefix_length: int,
+                 suffix_length: int, difficulty: Union[int, str]):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is not installed")
+        if len(pending) + suffix_length + 9 > SHA1_BLOCK_SIZE:
+            raise ValueError(f"Suffix of {suffix_length} bytes does not fit the final block "
+                             f"after {len(pending)} pending prefix bytes")
+        self.midstate = tuple(midstate)
+        self.pending = bytes(pending)
+        self.prefix_length = prefix_length
+        self.suffix_length = suffix_length
+        self.difficulty = int(difficulty)
+        self.limit = difficulty_limit(self.difficulty)
+        self._alphabet = np.frombuffer(NONCE_ALPHABET, dtype=np.uint8).astype(np.uint32)
+
+        # Final block with the suffix bytes left as None placeholders
+        offset = len(self.pending)
+        block = list(self.pending) + [None] * suffix_length + [0x80]
+        block += [0] * (SHA1_BLOCK_SIZE - 8 - len(block))
+        block += list(((prefix_length + suffix_length) * 8).to_bytes(8, 'big'))
+        self._block = block
+        self._offset = offset
+
+    @staticmethod
+    def fits(prefix_length: int, suffix_length: int) -> bool:
+        """True when the suffix and padding fit in the block after the prefix"""
+        return prefix_length % SHA1_BLOCK_SIZE + suffix_length + 9 <= SHA1_BLOCK_SIZE
+
+    @classmethod
+    def for_challenge(cls, authdata: str, difficulty: Union[int, str],
+                      suffix_length: int) -> 'NumpySHA1Batch':
+        """Build a batch searcher from the challenge authdata"""
+        prefix = PrefixHasher(authdata)
+        midstate, pending = prefix.midstate()
+        return cls(midstate, pending, len(prefix.prefix), suffix_length, difficulty)
+
+    def encode_nonces(self, start: int, count: int):
+        """Return the suffix bytes of nonces ``[start, start + count)``, one entry per position.
+
+        Positions whose character is the same for the whole range are
+        returned as plain ints so they fold into constant message words.
+        """
+        stop = start + count - 1
+        n = None
+        columns = []
+        for i in range(self.suffix_length):
+            shift = NONCE_BITS * (self.suffix_length - 1 - i)
+            if (start >> shift) == (stop >> shift):
+                columns.append(NONCE_ALPHABET[(start >> shift) & NONCE_MASK])
+                continue
+            if n is None:
+                n = np.arange(start, start + count, dtype=np.uint64)
+            columns.append(self._alphabet[(n >> np.uint64(shift)) & np.uint64(NONCE_MASK)])
+        return columns
+
+    def _message_words(self, columns):
+        words = []
+        for w in range(16):
+            word = 0
+            for k in range(4):
+                p = 4 * w + k
+                byte = self._block[p]
+                if byte is None:
+                    byte = columns[p - self._offset]
+                word = _or(word, _shl(byte, 24 - 8 * k))
+            words.append(word)
+        return words
+
+    def _compress(self, columns):
+        """Return the first two output words ``(H0, H1)`` for every candidate"""
+        w = self._message_words(columns)
+        lanes = next((x.shape[0] for x in w if not isinstance(x, int)), 0)
+        spare = np.empty(lanes, dtype=np.uint32)
+        for t in range(16, 80):
+            terms = (w[t - 3], w[t - 8], w[t - 14], w[t - 16])
+            arrays = [x for x in terms if not isinstance(x, int)]
+            if not arrays:
+                w.append(_rotl(terms[0] ^ terms[1] ^ terms[2] ^ terms[3], 1))
+                continue
+            # Expand into a fresh buffer in place: xor the inputs, rotate by one
+            const = 0
+            for term in terms:
+                if isinstance(term, int):
+                    const ^= term
+            x = np.bitwise_xor(arrays[0], arrays[1]) if len(arrays) > 1 else arrays[0].copy()
+            for term in arrays[2:]:
+                x ^= term
+            if const:
+                x ^= const
+            np.left_shift(x, 1, out=spare)
+            x >>= 31
+            x |= spare
+            w.append(x)
+        # Fold the round constant into each schedule word, in place for arrays
+        kw = w
+        for t in range(80):
+            if isinstance(w[t], int):
+                kw[t] = (w[t] + SHA1_K[t // 20]) & _MASK32
+            else:
+                kw[t] += SHA1_K[t // 20]
+
+        # Generic rounds while any state word is still a batch-wide constant
+        a, b, c, d, e = self.midstate
+        t = 0
+        while t < 80 and any(isinstance(x, int) for x in (a, b, c, d, e)):
+            temp = _add(_rotl(a, 5), _f(t, b, c, d), e, kw[t])
+            a, b, c, d, e = temp, a, _rotl(b, 30), c, d
+            t += 1
+
+        if t < 80:
+            # In-place rounds over private buffers, no per-round allocation
+            a, b, c, d, e = (np.array(x, dtype=np.uint32) for x in (a, b, c, d, e))
+            temp = np.empty_like(a)
+            scratch = np.empty_like(a)
+            for t in range(t, 80):
+                np.left_shift(a, 5, out=temp)
+                np.right_shift(a, 27, out=scratch)
+                temp |= scratch
+                temp += e
+                temp += kw[t]
+                if t < 20:
+                    np.bitwise_xor(c, d, out=scratch)
+                    scratch &= b
+                    scratch ^= d
+                elif t < 40 or t >= 60:
+                    np.bitwise_xor(b, c, out=scratch)
+                    scratch ^= d
+                else:
+                    np.bitwise_or(b, c, out=scratch)
+                    scratch &= d
+                    np.bitwise_and(b, c, out=e)
+                    scratch |= e
+                temp += scratch
+                # e is dead now; reuse it for rotl(b, 30)
+                np.left_shift(b, 30, out=e)
+                np.right_shift(b, 2, out=scratch)
+                e |= scratch
+                a, b, c, d, e, temp = temp, a, e, c, d, b
+
+        return _add(self.midstate[0], a), _add(self.midstate[1], b)
+
+    def _winner_mask(self, h0, h1):
+        difficulty = self.difficulty
+        if difficulty <= 8:
+            return h0 < (1 << (32 - 4 * difficulty))
+        if difficulty <= 16:
+            return (h0 == 0) & (h1 < (1 << (64 - 4 * difficulty)))
+        # Deeper difficulties are confirmed with hashlib below
+        return (h0 == 0) & (h1 == 0)
+
+    def search(self, columns) -> 'np.ndarray':
+        """Return indexes of candidates whose digest meets the difficulty.
+
+        ``columns`` holds one uint32 array per suffix byte, as returned by
+        ``encode_nonces()``; a ``(N, suffix_length)`` uint8 array of encoded
+        suffixes is accepted as well.
+        """
+        if isinstance(columns, np.ndarray) and columns.ndim == 2:
+            columns = [columns[:, i].astype(np.uint32) for i in range(columns.shape[1])]
+        h0, h1 = self._compress(columns)
+        return np.flatnonzero(self._winner_mask(h0, h1))
+
+    def search_range(self, start: int, count: int) -> Optional[str]:
+        """Search nonces ``[start, start + count)`` and return the first winning suffix"""
+        columns = self.encode_nonces(start, count)
+        for index in self.search(columns):
+            suffix = bytes(col if isinstance(col, int) else int(col[index]) for col in columns)
+            if self.digest(suffix) < self.limit:
+                return suffix.decode('ascii')
+        return None
+
+    def digest(self, suffix: bytes) -> bytes:
+        """Exact scalar SHA-1 digest of prefix + suffix, used to confirm winners"""
+        block = bytes(self.pending + suffix + bytes(self._block[self._offset + self.suffix_length:]))
+        state = sha1_compress(self.midstate, block)
+        return b''.join(word.to_bytes(4, 'big') for word in state)
+
+
+def numpy_search(authdata: str, difficulty: Union[int, str], nonces: NonceEnumerator,
+                 stop_event=None, batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[Optional[str], int]:
+    """Search a nonce range in vectorized batches; return ``(suffix, attempts)``.
+
+    Batches are aligned to ``batch_size`` so the high nonce characters stay
+    constant inside a batch and fold into constant message words. Every
+    lane of a batch is hashed, so ``attempts`` counts whole batches.
+    """
+    searcher = NumpySHA1Batch.for_challenge(authdata, difficulty, nonces.length)
+    start = nonces.start
+    attempts = 0
+    while start < nonces.stop:
+        if stop_event is not None and stop_event.is_set():
+            return None, attempts
+        end = min(nonces.stop, (start // batch_size + 1) * batch_size)
+        suffix = searcher.search_range(start, end - start)
+        attempts += end - start
+        if suffix:
+            return suffix, attempts
+        start = end
+    return None, attempts
+
+
+def _supports(authdata: str, suffix_length: int) -> bool:
+    # Nonce indexes are uint64 lanes
+    return (NONCE_BITS * suffix_length < 64
+            and NumpySHA1Batch.fits(len(authdata.encode('utf-8')), suffix_length))
+
+
+BACKEND = PowBackend('numpy', numpy_search, 'NumPy uint32 vectorized batches',
+                     batched=True, supports=_supports) if NUMPY_AVAILABLE else None
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Persistent Proof-of-Work Worker Pool
+Pre-forked worker processes fed through a shared-memory job descriptor.
+"""
+
+import ctypes
+import multiprocessing
+import struct
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple, Union
+
+from pow_affinity import Placement, pin_to_cpu
+from pow_backends import get_backend, select_backend
+from pow_control import CACHE_LINE_WORDS
+from pow_engine import NONCE_BASE, NonceEnumerator, suffix_length, verify_suffix
+
+# Descriptor layout (little endian):
+#   0  generation         u64  id of the current job, 0 = none yet
+#   8  stop_generation    u64  jobs up to this id are finished
+#  16  winner_generation  u64  job the winner slot belongs to
+#  24  range start        u64  first nonce of the job
+#  32  range stop         u64  end of the job's nonce range, 0 = whole space
+#  40  difficulty         u32
+#  44  authdata length    u32
+#  48  winner length      u32
+#  52  shutdown           u32
+#  56  workers done       u32  workers that exhausted their share of the range
+#  60  (padding)          u32
+#  64  winner found at    u64  time.monotonic_ns() when the winner was posted
+#  72  winner suffix      WINNER_SIZE bytes
+#  ..  authdata           MAX_AUTHDATA bytes
+_HEADER = struct.Struct('<QQQQQIIIIIIQ')
+WINNER_SIZE = 64
+MAX_AUTHDATA = 1024
+_WINNER_OFFSET = _HEADER.size
+_AUTHDATA_OFFSET = _WINNER_OFFSET + WINNER_SIZE
+DESCRIPTOR_SIZE = _AUTHDATA_OFFSET + MAX_AUTHDATA
+
+_GENERATIONS = struct.Struct('<QQ')
+
+# Starting size of each worker's nonce piece; it is then tuned online per
+# worker so a piece takes about TARGET_PIECE_SECONDS on that core
+DEFAULT_CHUNK_SIZE = 1 << 18
+TARGET_PIECE_SECONDS = 0.05
+MIN_PIECE = 1 << 12
+MAX_PIECE = 1 << 26
+# A claim from the shared cursor holds this many pieces; what is left of it
+# can be stolen by idle workers once the cursor has run out
+PIECES_PER_CLAIM = 4
+
+# Seconds between progress callbacks while solve() waits
+PROGRESS_INTERVAL = 1.0
+
+
+def gil_enabled() -> bool:
+    """False on a free-threaded (no-GIL) CPython build with the GIL disabled"""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def choose_start_method(threads_running: bool = None) -> str:
+    """Process start method for the pool.
+
+    ``fork`` is fastest and inherits imported modules and calibration, but
+    forking while other threads run (a background pre-warm next to the TLS
+    handshake) can copy a lock held mid-operation. Then ``forkserver`` is
+    used: children fork from a clean single-threaded server that preloads
+    this module.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if threads_running is None:
+        threads_running = threading.active_count() > 1
+    if 'fork' in methods and not threads_running:
+        return 'fork'
+    if 'forkserver' in methods:
+        return 'forkserver'
+    return 'spawn'
+
+
+class JobDescriptor:
+    """Current challenge and winner slot in a shared byte buffer.
+
+    Writers hold ``lock``; the stop check in the hot loop reads the two
+    generation words without it.
+    """
+
+    def __init__(self, buf, lock):
+        self.buf = buf
+        self.lock = lock
+
+    @classmethod
+    def create(cls, ctx=multiprocessing) -> 'JobDescriptor':
+        return cls(ctx.RawArray('B', DESCRIPTOR_SIZE), ctx.Lock())
+
+    def _header(self) -> Tuple[int, ...]:
+        return _HEADER.unpack_from(self.buf, 0)
+
+    def publish(self, authdata: str, difficulty: int, start: int = 0, stop: int = 0) -> int:
+        """Post a new job over nonces ``[start, stop)`` and return its generation id"""
+        data = authdata.encode('utf-8')
+        if len(data) > MAX_AUTHDATA:
+            raise ValueError(f"Authdata of {len(data)} bytes exceeds {MAX_AUTHDATA}")
+        with self.lock:
+            header = list(self._header())
+            header[0] += 1
+            header[3:10] = [start, stop, difficulty, len(data), 0, header[8], 0]
+            self.buf[_AUTHDATA_OFFSET:_AUTHDATA_OFFSET + len(data)] = data
+            _HEADER.pack_into(self.buf, 0, *header)
+        return header[0]
+
+    def read(self) -> Tuple[int, int, int, str, bool, int, int]:
+        """Return ``(generation, stop_generation, difficulty, authdata, shutdown,
+        range_start, range_stop)``"""
+        with self.lock:
+            generation, stop, _, start, end, difficulty, length, _, shutdown, _, _, _ = self._header()
+            authdata = bytes(self.buf[_AUTHDATA_OFFSET:_AUTHDATA_OFFSET + length])
+        return generation, stop, difficulty, authdata.decode('utf-8'), bool(shutdown), start, end
+
+    def stop(self, generation: int) -> None:
+        """Mark every job up to ``generation`` as finished"""
+        with self.lock:
+            header = list(self._header())
+            header[1] = max(header[1], generation)
+            _HEADER.pack_into(self.buf, 0, *header)
+
+    def shutdown(self) -> None:
+        with self.lock:
+            header = list(self._header())
+            header[1] = header[0]
+            header[8] = 1
+            _HEADER.pack_into(self.buf, 0, *header)
+
+    def stopped(self, generation: int) -> bool:
+        """True once ``generation`` is finished or superseded"""
+        current, stop = _GENERATIONS.unpack_from(self.buf, 0)
+        return current != generation or stop >= generation
+
+    def post_winner(self, generation: int, suffix: str) -> bool:
+        """Claim the winner slot for ``generation`` and stop the job in the
+        same write, so the other workers quit at their next stop check
+        without waiting for the parent; False if it was taken or stale"""
+        data = suffix.encode('ascii')
+        with self.lock:
+            header = list(self._header())
+            if header[0] != generation or header[2] == generation or len(data) > WINNER_SIZE:
+                return False
+            self.buf[_WINNER_OFFSET:_WINNER_OFFSET + len(data)] = data
+            header[1] = max(header[1], generation)
+            header[2] = generation
+            header[7] = len(data)
+            header[11] = time.monotonic_ns()
+            _HEADER.pack_into(self.buf, 0, *header)
+        return True
+
+    def worker_done(self, generation: int) -> int:
+        """Count a worker out of ``generation``'s range; return the workers
+        done so far, or 0 when the job is stale or already finished.
+
+        ``solve()`` resets the scheduler for the next job before publishing
+        it, so a worker still on the finished job can see its range as
+        exhausted while that job is current. Counting it would wake the
+        next ``solve()`` with no result.
+        """
+        with self.lock:
+            header = list(self._header())
+            if header[0] != generation or header[1] >= generation:
+                return 0
+            header[9] += 1
+            _HEADER.pack_into(self.buf, 0, *header)
+        return header[9]
+
+    def winner(self, generation: int) -> Optional[str]:
+        with self.lock:
+            _, _, winner, _, _, _, _, length, _, _, _, _ = self._header()
+            if winner != generation:
+                return None
+            return bytes(self.buf[_WINNER_OFFSET:_WINNER_OFFSET + length]).decode('ascii')
+
+    def found_at(self, generation: int) -> Optional[float]:
+        """``time.monotonic()`` at which ``generation``'s winner was posted"""
+        with self.lock:
+            header = self._header()
+        if header[2] != generation:
+            return None
+        return header[11] / 1e9
+
+
+class ChunkScheduler:
+    """Shared nonce cursor and per-worker claims for one job.
+
+    Workers pull claims from the cursor instead of walking a fixed stride,
+    so a fast core simply takes more of them. Each claim is searched in
+    pieces; once the cursor reaches the end of a bounded range (a cluster
+    lease), an idle worker steals the back half of the largest unsearched
+    claim, so the job ends when the cores together finish, not when the
+    slowest one does.
+
+    Layout (u64 words, one cache line each): line 0 holds the generation,
+    cursor and range end; line ``i + 1`` holds worker i's claim ``[next, end)``.
+    """
+
+    def __init__(self, num_workers: int, ctx=multiprocessing):
+        self.num_workers = num_workers
+        self.words = ctx.RawArray(ctypes.c_uint64, CACHE_LINE_WORDS * (num_workers + 1))
+        self.lock = ctx.Lock()
+
+    def reset(self, generation: int, start: int, stop: int) -> None:
+        """Prepare the range ``[start, stop)`` of ``generation``; call before publishing it"""
+        with self.lock:
+            ctypes.memset(self.words, 0, ctypes.sizeof(self.words))
+            self.words[0:3] = [generation, start, stop]
+
+    def next_piece(self, index: int, generation: int, piece: int,
+                   min_steal: int = MIN_PIECE) -> Optional[Tuple[int, int]]:
+        """Next ``[start, stop)`` for worker ``index``, or None when the
+        range is exhausted or ``generation`` is no longer current"""
+        words = self.words
+        own = CACHE_LINE_WORDS * (index + 1)
+        with self.lock:
+            if words[0] != generation:
+                return None
+            if words[own] >= words[own + 1]:
+                cursor, stop = words[1], words[2]
+                if cursor < stop:
+                    claim_end = min(stop, cursor + piece * PIECES_PER_CLAIM)
+                    words[1] = claim_end
+                    words[own:own + 2] = [cursor, claim_end]
+                else:
+                    victim, left = None, 2 * min_steal - 1
+                    for i in range(self.num_workers):
+                        slot = CACHE_LINE_WORDS * (i + 1)
+                        if words[slot + 1] - words[slot] > left:
+                            victim, left = slot, words[slot + 1] - words[slot]
+                    if victim is None:
+                        return None
+                    middle = words[victim] + left // 2
+                    words[own:own + 2] = [middle, words[victim + 1]]
+                    words[victim + 1] = middle
+            start = words[own]
+            stop = min(words[own + 1], start + piece)
+            words[own] = stop
+        return start, stop
+
+
+def tune_piece(piece: int, attempts: int, seconds: float) -> int:
+    """Resize a worker's piece towards TARGET_PIECE_SECONDS of work, at most
+    doubling or halving per step so one noisy sample cannot swing it"""
+    if seconds <= 0 or attempts < piece:
+        return piece
+    ideal = int(attempts / seconds * TARGET_PIECE_SECONDS)
+    piece = max(piece // 2, min(piece * 2, ideal))
+    return max(MIN_PIECE, min(MAX_PIECE, piece))
+
+
+class _JobStop:
+    """``stop_event`` stand-in the backends poll between nonce blocks"""
+
+    __slots__ = ('descriptor', 'generation')
+
+    def __init__(self, descriptor: JobDescriptor, generation: int):
+        self.descriptor = descriptor
+        self.generation = generation
+
+    def is_set(self) -> bool:
+        return self.descriptor.stopped(self.generation)
+
+
+def _search_job(index: int, generation: int, authdata: str, difficulty: int, search: Callable,
+                scheduler: ChunkScheduler, stop_flag: _JobStop, counters, slot: int,
+                piece: int) -> Tuple[Optional[str], bool, int]:
+    """Search claimed pieces of one job; returns ``(suffix, exhausted, piece)``"""
+    length = suffix_length(authdata, difficulty)
+    while not stop_flag.is_set():
+        claimed = scheduler.next_piece(index, generation, piece)
+        if claimed is None:
+            return None, True, piece
+        began = time.perf_counter()
+        suffix, attempts = search(authdata, difficulty, NonceEnumerator(*claimed, length), stop_flag)
+        counters[slot] += attempts
+        if suffix:
+            return suffix, False, piece
+        piece = tune_piece(piece, attempts, time.perf_counter() - began)
+    return None, False, piece
+
+
+def _pool_worker(index: int, num_workers: int, descriptor: JobDescriptor, scheduler: ChunkScheduler,
+                 job_event, result_event, ready, counters, backend_name: str, chunk_size: int,
+                 cpu: Optional[int], job_probe: Optional[Callable] = None) -> None:
+    """Worker process main loop: wait for a job, search until it is stopped.
+
+    With ``job_probe`` each finished job is followed by
+    ``job_probe(index, backend, authdata, difficulty, attempts, seconds)``
+    in this worker, before the job is reported finished (pow_profile.py
+    times the search stages this way).
+    """
+    # Pin before the warm-up so the JIT code and buffers are touched on the home CPU
+    pin_to_cpu(cpu)
+    backend = get_backend(backend_name)
+    fallback = get_backend('midstate')
+
+    # Warm-up: imports, JIT compilation and first-call allocations
+    backend.search('warm-up'.ljust(64, '.'), 40, NonceEnumerator(0, 64))
+    ready.release()
+
+    # Cumulative hashes of this worker, on a cache line of its own
+    slot = index * CACHE_LINE_WORDS
+    seen = 0
+    # Tuned across jobs: the core's speed does not change between challenges
+    piece = chunk_size
+    while True:
+        job_event.wait()
+        generation, stop, difficulty, authdata, shutdown, _, _ = descriptor.read()
+        if shutdown:
+            return
+        if generation == seen or stop >= generation:
+            # Finished job; the parent clears job_event shortly
+            time.sleep(0.001)
+            continue
+        seen = generation
+
+        used = backend if backend.supports(authdata, suffix_length(authdata, difficulty)) else fallback
+        before, began = counters[slot], time.perf_counter()
+        suffix, exhausted, piece = _search_job(index, generation, authdata, difficulty, used.search, scheduler,
+                                               _JobStop(descriptor, generation), counters, slot, piece)
+        if job_probe is not None:
+            job_probe(index, used.name, authdata, difficulty, counters[slot] - before,
+                      time.perf_counter() - began)
+
+        if suffix:
+            if descriptor.post_winner(generation, suffix):
+                result_event.set()
+        elif exhausted:
+            # Range exhausted without a winner: the last worker out wakes solve()
+            if descriptor.worker_done(generation) == num_workers:
+                result_event.set()
+
+
+class PowWorkerPool:
+    """Long-lived pool of PoW worker processes.
+
+    Workers are started once and reused for every challenge. A job is a
+    shared-memory descriptor update, so nothing is pickled per challenge
+    and workers run free over disjoint chunks with no batch barrier.
+    """
+
+    def __init__(self, num_workers: int = None, backend: str = 'auto',
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, start_method: str = None,
+                 placement: Placement = None, pin: bool = True, job_probe: Callable = None):
+        # Sized from the CPU mask (sched_getaffinity), one worker per usable CPU
+        self.placement = placement or Placement(num_workers)
+        self.num_workers = self.placement.num_workers
+        self.pin = pin
+        # Called in each worker after every job (pow_profile.py); must be picklable
+        self.job_probe = job_probe
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.start_method = start_method or choose_start_method()
+        self.ctx = multiprocessing.get_context(self.start_method)
+        if self.start_method == 'forkserver':
+            self.ctx.set_forkserver_preload(['pow_pool'])
+        self.descriptor = JobDescriptor.create(self.ctx)
+        self.scheduler = ChunkScheduler(self.num_workers, self.ctx)
+        self.job_event = self.ctx.Event()
+        self.result_event = self.ctx.Event()
+        self.ready = self.ctx.Semaphore(0)
+        self.ready_count = 0
+        # Written only by the owning worker, read by the parent without a lock
+        self.counters = self.ctx.RawArray(ctypes.c_uint64, CACHE_LINE_WORDS * self.num_workers)
+        self.job_baseline = [0] * self.num_workers
+        self.processes = []
+        self.generation = 0
+
+        # perf_counter() timestamps of start() and of the last worker warming up
+        self.started_at = None
+        self.ready_at = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self.processes)
+
+    def start(self) -> 'PowWorkerPool':
+        """Fork the workers; a no-op when they are already running"""
+        if self.processes:
+            return self
+
+        self.started_at = time.perf_counter()
+
+        # Resolve 'auto' once in the parent so workers skip calibration
+        backend_name = select_backend(self.backend).name
+        self.backend = backend_name
+
+        for i in range(self.num_workers):
+            process = self.ctx.Process(
+                target=_pool_worker,
+                args=(i, self.num_workers, self.descriptor, self.scheduler, self.job_event, self.result_event,
+                      self.ready, self.counters, backend_name, self.chunk_size,
+                      self.placement.cpus[i] if self.pin else None, self.job_probe),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every worker finished its warm-up; False on timeout
+        or when a worker died during start-up"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.ready_count < self.num_workers:
+            processes = self.processes
+            if not processes or any(process.exitcode is not None for process in processes):
+                return False
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.perf_counter())
+            if wait <= 0:
+                return False
+            if self.ready.acquire(timeout=wait):
+                self.ready_count += 1
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+        return True
+
+    def worker_hashes(self) -> List[int]:
+        """Hashes of every worker since the current job was published"""
+        return [self.counters[i * CACHE_LINE_WORDS] - self.job_baseline[i]
+                for i in range(self.num_workers)]
+
+    def total_hashes(self) -> int:
+        return sum(self.worker_hashes())
+
+    def solve(self, authdata: str, difficulty: Union[int, str], timeout: Optional[float] = None,
+              start: int = 0, stop: int = 0,
+              progress: Optional[Callable[[int], bool]] = None,
+              cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """Publish a challenge and wait for the first winning suffix.
+
+        ``start``/``stop`` restrict the search to a nonce range (``stop`` of
+        0 means the whole space); None is returned once the range is
+        exhausted, on timeout, or after ``cancel()``. ``progress`` is called
+        with the job's hash count every PROGRESS_INTERVAL seconds and stops
+        the search by returning False. ``cancel_event`` is the caller's
+        per-solve flag: it is checked after the job is published, so a
+        ``cancel()`` that ran before this call cleared the result event is
+        not lost.
+        """
+        self.start()
+        self.result_event.clear()
+        self.job_baseline = [self.counters[i * CACHE_LINE_WORDS] for i in range(self.num_workers)]
+        space = NONCE_BASE ** suffix_length(authdata, difficulty)
+        # The pool is the descriptor's only publisher, so it knows the next generation
+        self.scheduler.reset(self.generation + 1, start, min(stop or space, space))
+        generation = self.descriptor.publish(authdata, int(difficulty), start, stop)
+        self.generation = generation
+        self.job_event.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                wait = PROGRESS_INTERVAL if progress else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    wait = remaining if wait is None else min(wait, remaining)
+                if self.result_event.wait(max(0.0, wait) if wait is not None else None):
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if progress is not None and not progress(self.total_hashes()):
+                    break
+        finally:
+            self.descriptor.stop(generation)
+            self.job_event.clear()
+        return self.descriptor.winner(generation)
+
+    def found_at(self) -> Optional[float]:
+        """``time.monotonic()`` at which the last job's winner was posted"""
+        return self.descriptor.found_at(self.generation)
+
+    def cancel(self) -> None:
+        """Stop the running ``solve()`` from another thread"""
+        self.descriptor.stop(self.generation)
+        self.result_event.set()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop and join every worker"""
+        if not self.processes:
+            return
+        self.descriptor.shutdown()
+        self.job_event.set()
+        # Wakes a solve() still waiting in another thread
+        self.result_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.ready_count = 0
+        self.started_at = self.ready_at = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Persistent PoW Worker Pool')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--backend', default='auto', help='PoW hash backend')
+    parser.add_argument('--difficulty', type=int, default=5, help='Difficulty of each test challenge')
+    parser.add_argument('--challenges', type=int, default=5, help='Number of test challenges')
+
+    args = parser.parse_args()
+
+    with PowWorkerPool(args.workers, args.backend) as pool:
+        print(f"Started {pool.num_workers} workers (backend: {pool.backend})")
+        for i in range(args.challenges):
+            authdata = f"challenge-{i}-{time.time()}".ljust(64, '.')
+            start_time = time.time()
+            suffix = pool.solve(authdata, args.difficulty)
+            elapsed = time.time() - start_time
+            valid = suffix is not None and verify_suffix(authdata, suffix, args.difficulty)
+            print(f"Challenge {i}: {suffix} in {elapsed:.3f}s (valid: {valid})")
+
+
+if __name__ == "__main__":
+    main()
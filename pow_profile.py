@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Proof-of-Work Hot Loop Profiler
+Per-stage time accounting of the pool worker loop, measured with
+perf_counter_ns inside the worker processes of the real pool configuration.
+"""
+
+import functools
+import json
+import os
+import tempfile
+import time
+from hashlib import sha1
+from typing import Dict, List, Tuple
+
+from pow_affinity import Placement
+from pow_backends import CALIBRATION_AUTHDATA, get_backend
+from pow_engine import NonceEnumerator, PrefixHasher, difficulty_limit, suffix_length
+from pow_pool import DEFAULT_CHUNK_SIZE, PowWorkerPool
+
+DEFAULT_PROFILE_ATTEMPTS = 1 << 19
+
+# Keeps the usual suffix length, so the batched kernels accept the challenge,
+# while a match stays a ~1e-12 per hash event
+PROFILE_DIFFICULTY = 10
+# Seconds to wait for every worker's stage timings after the job ended
+STATS_TIMEOUT = 30.0
+
+# Candidates per stage batch and rounds over every stage loop; the fastest
+# round of each loop is kept, as timeit does, since noise only adds time
+STAGE_SAMPLE = 1 << 16
+STAGE_REPEAT = 7
+
+# Stages of each backend's search, in loop order. The remainder of the
+# measured job time is reported as REST_STAGE, so the rows sum to the
+# unprofiled ns/attempt of the pool.
+STAGES = {
+    'hashlib': ('nonce enumeration', 'message encoding', 'sha1() create + hash', 'digest()',
+                'comparison'),
+    'midstate': ('nonce enumeration', 'head midstate (extend)', 'hasher copy()', 'update(tail)',
+                 'digest()', 'comparison'),
+}
+BATCHED_STAGES = ('search kernel',)
+REST_STAGE = 'loop, stop checks, pool dispatch'
+
+
+def _batch_ns(*loops) -> List[int]:
+    """Fastest perf_counter_ns of each loop over ``STAGE_REPEAT`` rounds.
+
+    The loops take turns within a round, so a slow spell of the machine
+    hits all of them rather than one stage.
+    """
+    best = [None] * len(loops)
+    for _ in range(STAGE_REPEAT):
+        for i, loop in enumerate(loops):
+            began = time.perf_counter_ns()
+            loop()
+            elapsed = time.perf_counter_ns() - began
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return best
+
+
+def _loop_stages(backend: str, authdata: str, difficulty: int, count: int) -> List[float]:
+    """Nanoseconds per candidate of each ``STAGES[backend]`` entry.
+
+    Each loop adds one operation to a loop it builds on, over the same
+    candidates, so a stage is the difference of two batch timings and the
+    calibrated empty-loop cost never counts towards it. The enumeration stage is the full
+    ``blocks()`` walk the search itself performs.
+    """
+    limit = difficulty_limit(difficulty)
+    length = suffix_length(authdata, difficulty)
+    blocks = list(NonceEnumerator(0, count, length).blocks())
+
+    def enumerate_nonces():
+        for head, tails in NonceEnumerator(0, count, length).blocks():
+            for tail in tails:
+                pass
+
+    def empty():
+        for head, tails in blocks:
+            for tail in tails:
+                pass
+
+    if backend == 'hashlib':
+        prefix = authdata.encode('utf-8')
+
+        def encode():
+            for head, tails in blocks:
+                base = prefix + head
+                for tail in tails:
+                    base + tail
+
+        def create():
+            for head, tails in blocks:
+                base = prefix + head
+                for tail in tails:
+                    sha1(base + tail)
+
+        def digest():
+            for head, tails in blocks:
+                base = prefix + head
+                for tail in tails:
+                    sha1(base + tail).digest()
+
+        def compare():
+            for head, tails in blocks:
+                base = prefix + head
+                for tail in tails:
+                    sha1(base + tail).digest() < limit
+
+        # (loop, loop it adds one operation to)
+        steps = ((encode, empty), (create, encode), (digest, create), (compare, digest))
+    else:
+        root = PrefixHasher(authdata)
+        copies = [(root.extend(head).copy, tails) for head, tails in blocks]
+
+        def extend():
+            for head, tails in blocks:
+                root.extend(head).copy
+                for tail in tails:
+                    pass
+
+        def copy():
+            for new_hasher, tails in copies:
+                for tail in tails:
+                    new_hasher()
+
+        def update():
+            for new_hasher, tails in copies:
+                for tail in tails:
+                    new_hasher().update(tail)
+
+        def digest():
+            for new_hasher, tails in copies:
+                for tail in tails:
+                    hasher = new_hasher()
+                    hasher.update(tail)
+                    hasher.digest()
+
+        def compare():
+            for new_hasher, tails in copies:
+                for tail in tails:
+                    hasher = new_hasher()
+                    hasher.update(tail)
+                    hasher.digest() < limit
+
+        steps = ((extend, empty), (copy, empty), (update, copy), (digest, update), (compare, digest))
+
+    loops = [enumerate_nonces, empty] + [loop for loop, _ in steps]
+    timings = dict(zip(loops, _batch_ns(*loops)))
+    return ([timings[enumerate_nonces] / count] +
+            [max(0, timings[loop] - timings[baseline]) / count for loop, baseline in steps])
+
+
+def measure_stages(backend: str, authdata: str, difficulty: int, count: int = STAGE_SAMPLE) -> List[float]:
+    """Nanoseconds per attempt of each stage of ``backend``'s search.
+
+    The batched backends run nonce generation, hashing and comparison
+    inside one kernel call, so they have a single stage: the kernel
+    itself, timed over ``count`` candidates.
+    """
+    if backend in STAGES:
+        return _loop_stages(backend, authdata, difficulty, count)
+    search = get_backend(backend).search
+    nonces = NonceEnumerator(0, count, suffix_length(authdata, difficulty))
+    return [_batch_ns(lambda: search(authdata, difficulty, nonces))[0] / count]
+
+
+def stage_names(backend: str) -> Tuple[str, ...]:
+    return STAGES.get(backend, BATCHED_STAGES)
+
+
+def record_stages(profile_dir: str, index: int, backend: str, authdata: str, difficulty: int,
+                  attempts: int, seconds: float) -> None:
+    """``PowWorkerPool`` job probe: time the stages in this worker and
+    write them next to the job's own unprofiled attempts and seconds"""
+    stages = measure_stages(backend, authdata, difficulty, max(1, min(attempts, STAGE_SAMPLE)))
+    path = os.path.join(profile_dir, f'worker-{index}.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'backend': backend, 'attempts': attempts, 'seconds': seconds, 'stages': stages}, f)
+    os.replace(path + '.tmp', path)
+
+
+class ProfileReport:
+    """Per-stage timings of every pool worker for one profiled job"""
+
+    def __init__(self, backend: str, workers: List[Dict[str, object]], start_method: str,
+                 placement: Placement, wall: float):
+        self.backend = backend
+        self.workers = workers
+        self.start_method = start_method
+        self.placement = placement
+        self.wall = wall
+
+    @property
+    def attempts(self) -> int:
+        return sum(worker['attempts'] for worker in self.workers)
+
+    @property
+    def total_ns(self) -> float:
+        """Unprofiled ns/attempt of the pool job, per worker"""
+        seconds = sum(worker['seconds'] for worker in self.workers)
+        return seconds * 1e9 / self.attempts if self.attempts else 0.0
+
+    def stages(self) -> Dict[str, float]:
+        """ns/attempt per stage, weighted by each worker's attempts, plus
+        the remainder that makes them sum to ``total_ns``"""
+        backend = self.workers[0]['backend'] if self.workers else self.backend
+        names = stage_names(backend)
+        merged = {name: sum(worker['stages'][i] * worker['attempts'] for worker in self.workers) / self.attempts
+                  for i, name in enumerate(names)}
+        merged[REST_STAGE] = self.total_ns - sum(merged.values())
+        return merged
+
+    def describe(self) -> str:
+        count = self.attempts
+        backend = self.workers[0]['backend'] if self.workers else self.backend
+        note = '' if backend == self.backend else f" (fallback {backend})"
+        lines = [f"Profile: backend {self.backend}{note}, {len(self.workers)} worker(s), {count:,} attempts "
+                 f"({self.start_method}; {self.placement.describe()})",
+                 f"  {'stage':34s} {'ns/attempt':>11s} {'share':>7s}"]
+        total = self.total_ns
+        if not count or total <= 0:
+            lines.append("  no attempts recorded")
+            return '\n'.join(lines)
+        for name, ns in self.stages().items():
+            lines.append(f"  {name:34s} {ns:11.1f} {ns / total:7.1%}")
+        lines.append(f"  {'total':34s} {total:11.1f}")
+        rate = sum(worker['attempts'] / worker['seconds'] for worker in self.workers if worker['seconds'] > 0)
+        lines.append(f"  Rate: {rate:,.0f} H/s aggregate, unprofiled pool loop; wall {self.wall:.2f}s")
+        return '\n'.join(lines)
+
+
+def run_profile(backend: str = 'auto', num_workers: int = None,
+                attempts: int = DEFAULT_PROFILE_ATTEMPTS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                start_method: str = None, placement: Placement = None) -> ProfileReport:
+    """Run one never-matching job of ``attempts`` per worker on a
+    ``PowWorkerPool`` running ``backend``, then time its stages in each worker"""
+    with tempfile.TemporaryDirectory(prefix='pow_profile_') as profile_dir:
+        pool = PowWorkerPool(num_workers, backend, chunk_size, start_method, placement,
+                             job_probe=functools.partial(record_stages, profile_dir))
+        with pool:
+            pool.wait_ready()
+            started = time.perf_counter()
+            # Every worker runs until the range is exhausted
+            pool.solve(CALIBRATION_AUTHDATA, PROFILE_DIFFICULTY, stop=attempts * pool.num_workers)
+            wall = time.perf_counter() - started
+            # Workers time their stages before reporting the job finished;
+            # after an unlikely winner the others are still measuring
+            deadline = time.perf_counter() + STATS_TIMEOUT
+            while (sum(name.endswith('.json') for name in os.listdir(profile_dir)) < pool.num_workers
+                   and time.perf_counter() < deadline):
+                time.sleep(0.01)
+        workers = []
+        for name in sorted(os.listdir(profile_dir)):
+            if name.endswith('.json'):
+                with open(os.path.join(profile_dir, name)) as f:
+                    workers.append(json.load(f))
+
+    return ProfileReport(pool.backend, [worker for worker in workers if worker['attempts']],
+                         pool.start_method, pool.placement, wall)
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    from pow_backends import available_backends
+
+    parser = argparse.ArgumentParser(description='Proof-of-Work Hot Loop Profiler')
+    parser.add_argument('--backend', default='auto', choices=['auto'] + available_backends(),
+                        help='Backend the profiled pool workers run')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: usable CPUs)')
+    parser.add_argument('--attempts', type=int, default=DEFAULT_PROFILE_ATTEMPTS, help='Attempts per worker')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Starting nonces per piece')
+
+    args = parser.parse_args()
+
+    print(run_profile(args.backend, args.workers, args.attempts, args.chunk_size).describe())
+
+
+if __name__ == "__main__":
+    main()
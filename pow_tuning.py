@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Proof-of-Work Tuning Profile
+Measures worker count, chunk size, strategy crossovers and backend on this
+host and persists them for the clients to load at start-up.
+"""
+
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import time
+from typing import Dict, List
+
+from pow_affinity import available_cpu_count
+from pow_backends import (CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY, available_backends, calibrate,
+                          get_backend, measure_backend, midstate_search)
+from pow_deadline import expected_attempts
+from pow_engine import NonceEnumerator, suffix_length
+from pow_pool import DEFAULT_CHUNK_SIZE, PowWorkerPool
+
+# Profile location; POW_TUNING_FILE overrides it
+DEFAULT_TUNING_FILE = os.path.join(os.path.expanduser('~'), '.pow_tuning.json')
+TUNING_VERSION = 1
+
+# Expected-time model never pushes a crossover past this difficulty
+MAX_CROSSOVER_DIFFICULTY = 12
+
+# Attempt budget of the clients' simple solver; it gives up after this many
+SIMPLE_MAX_ATTEMPTS = 1000000
+# The simple solver is only chosen while its budget covers this many times the
+# expected attempts, so it runs out with a chance of about e**-8
+SIMPLE_BUDGET_MARGIN = 8
+
+# A chunk size is good enough once it reaches this share of the best rate;
+# smaller chunks react faster to a stop request
+CHUNK_RATE_SHARE = 0.95
+CHUNK_CANDIDATES = tuple(1 << n for n in range(12, 22, 2))
+
+# Fewer workers are preferred when they reach this share of the best total
+WORKER_RATE_SHARE = 0.97
+
+
+def default_tuning_file() -> str:
+    return os.environ.get('POW_TUNING_FILE', DEFAULT_TUNING_FILE)
+
+
+def host_fingerprint() -> Dict[str, object]:
+    """Identity of the machine a profile was measured on"""
+    return {
+        'hostname': socket.gethostname(),
+        'machine': platform.machine(),
+        'cpu_count': available_cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+class TuningProfile:
+    """Per-machine solver settings; the defaults match the old hard-coded values"""
+
+    FIELDS = ('backend', 'workers', 'threads', 'chunk_size', 'simple_max_difficulty',
+              'single_process_max_difficulty', 'threaded_max_difficulty')
+
+    def __init__(self, backend: str = 'auto', workers: int = None, threads: int = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, simple_max_difficulty: int = 3,
+                 single_process_max_difficulty: int = 5, threaded_max_difficulty: int = 4,
+                 host: Dict[str, object] = None, measurements: Dict[str, object] = None,
+                 path: str = None):
+        self.backend = backend
+        self.workers = workers or available_cpu_count()
+        self.threads = threads or available_cpu_count()
+        self.chunk_size = chunk_size
+        self.simple_max_difficulty = simple_max_difficulty
+        self.single_process_max_difficulty = single_process_max_difficulty
+        # optimized_tls_client_v4.py: threads below, the process pool above
+        self.threaded_max_difficulty = threaded_max_difficulty
+        self.host = host or host_fingerprint()
+        self.measurements = measurements or {}
+        self.path = path
+
+    @property
+    def tuned(self) -> bool:
+        """True when loaded from a profile file rather than defaults"""
+        return self.path is not None
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data.update(version=TUNING_VERSION, host=self.host, measurements=self.measurements)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict, path: str = None) -> 'TuningProfile':
+        kwargs = {name: data[name] for name in cls.FIELDS if name in data}
+        return cls(host=data.get('host'), measurements=data.get('measurements'), path=path, **kwargs)
+
+    def save(self, path: str = None) -> str:
+        path = path or self.path or default_tuning_file()
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+            f.write('\n')
+        self.path = path
+        return path
+
+    def describe(self) -> str:
+        source = self.path if self.tuned else 'built-in defaults'
+        return (f"backend={self.backend} workers={self.workers} threads={self.threads} "
+                f"chunk={self.chunk_size} simple<={self.simple_max_difficulty} "
+                f"single-process<={self.single_process_max_difficulty} "
+                f"threaded<={self.threaded_max_difficulty} ({source})")
+
+
+def load_profile(path: str = None, quiet: bool = False) -> TuningProfile:
+    """Load the tuning profile, falling back to defaults when it is missing,
+    unreadable or was measured on a different machine"""
+    path = path or default_tuning_file()
+    if not os.path.exists(path):
+        return TuningProfile()
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        if not quiet:
+            print(f"Ignoring tuning profile {path}: {e}")
+        return TuningProfile()
+
+    current = host_fingerprint()
+    host = data.get('host') or {}
+    stale = [key for key in ('hostname', 'machine', 'cpu_count') if host.get(key) != current[key]]
+    if data.get('version') != TUNING_VERSION or stale:
+        if not quiet:
+            print(f"Ignoring tuning profile {path}: measured on a different host/version "
+                  f"({', '.join(stale) or 'version'}); rerun with --tune")
+        return TuningProfile()
+    return TuningProfile.from_dict(data, path)
+
+
+def profile_backend(name: str, profile: TuningProfile) -> str:
+    """Backend to use: an explicit choice wins, 'auto' takes the tuned backend"""
+    if name in (None, 'auto') and profile.tuned and profile.backend in available_backends():
+        return profile.backend
+    return name or 'auto'
+
+
+def _measure_rate(backend_name: str, duration: float) -> float:
+    return measure_backend(get_backend(backend_name), duration)
+
+
+def measure_workers(backend_name: str, workers: int, duration: float) -> float:
+    """Aggregate H/s of ``workers`` processes hashing concurrently"""
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.starmap(_measure_rate, [(backend_name, duration)] * workers))
+
+
+def worker_candidates(cpu_count: int) -> List[int]:
+    counts = {1, cpu_count, cpu_count * 2}
+    n = 2
+    while n < cpu_count:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def measure_chunk_rate(backend_name: str, chunk_size: int, duration: float) -> float:
+    """H/s when every search call covers one chunk, including per-call setup"""
+    search = get_backend(backend_name).search
+    search(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY, NonceEnumerator(0, 64))
+    hashed = 0
+    start = time.perf_counter()
+    while True:
+        search(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY, NonceEnumerator(hashed, hashed + chunk_size))
+        hashed += chunk_size
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return hashed / elapsed
+
+
+def measure_simple_rate(duration: float) -> float:
+    """H/s of the simple solver: one midstate loop from nonce 0, no backend dispatch"""
+    length = suffix_length(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY)
+    batch = CHUNK_CANDIDATES[0]
+    hashed = 0
+    start = time.perf_counter()
+    while True:
+        hashed += midstate_search(CALIBRATION_AUTHDATA, CALIBRATION_DIFFICULTY,
+                                  NonceEnumerator(0, batch, length))[1]
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return hashed / elapsed
+
+
+def simple_budget_difficulty(budget: int = SIMPLE_MAX_ATTEMPTS) -> int:
+    """Largest difficulty whose expected attempts fit the simple solver's budget"""
+    difficulty = 0
+    while expected_attempts(difficulty + 1) * SIMPLE_BUDGET_MARGIN <= budget:
+        difficulty += 1
+    return difficulty
+
+
+def measure_pool_overhead(workers: int, backend_name: str, chunk_size: int, rounds: int = 7) -> float:
+    """Median seconds to publish a trivial challenge to a warm pool and collect it"""
+    with PowWorkerPool(workers, backend_name, chunk_size) as pool:
+        pool.solve(CALIBRATION_AUTHDATA, 0, timeout=60)
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            pool.solve(CALIBRATION_AUTHDATA, 0, timeout=60)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def crossover(rate_a: float, overhead_a: float, rate_b: float, overhead_b: float) -> int:
+    """Largest difficulty at which strategy A is still expected to be no slower than B"""
+    for difficulty in range(1, MAX_CROSSOVER_DIFFICULTY + 1):
+        attempts = expected_attempts(difficulty)
+        if overhead_a + attempts / rate_a > overhead_b + attempts / rate_b:
+            return difficulty - 1
+    return MAX_CROSSOVER_DIFFICULTY
+
+
+def run_tuning(duration: float = 0.5, log=print) -> TuningProfile:
+    """Measure this host and return a profile (not yet saved)"""
+    cpu_count = available_cpu_count()
+    measurements = {}
+
+    log(f"Calibrating backends ({duration:.2f}s each)...")
+    rates = calibrate(duration, force=True)
+    backend = max(rates, key=rates.get)
+    measurements['backend_rates'] = {name: round(rate) for name, rate in rates.items()}
+    log(f"  fastest backend: {backend} ({rates[backend]:,.0f} H/s)")
+
+    log("Measuring chunk sizes...")
+    chunk_rates = {size: measure_chunk_rate(backend, size, duration) for size in CHUNK_CANDIDATES}
+    best_chunk_rate = max(chunk_rates.values())
+    chunk_size = min(size for size, rate in chunk_rates.items()
+                     if rate >= CHUNK_RATE_SHARE * best_chunk_rate)
+    measurements['chunk_rates'] = {str(size): round(rate) for size, rate in chunk_rates.items()}
+    log(f"  chunk size: {chunk_size:,}")
+
+    log("Measuring worker counts...")
+    worker_rates = {}
+    for workers in worker_candidates(cpu_count):
+        worker_rates[workers] = measure_workers(backend, workers, duration)
+        log(f"  {workers:3d} workers: {worker_rates[workers]:>14,.0f} H/s")
+    best_total = max(worker_rates.values())
+    workers = min(n for n, rate in worker_rates.items() if rate >= WORKER_RATE_SHARE * best_total)
+    measurements['worker_rates'] = {str(n): round(rate) for n, rate in worker_rates.items()}
+
+    log("Measuring strategy overheads...")
+    simple_rate = measure_simple_rate(duration)
+    single_rate = rates[backend]
+    # Per-call setup of the backend: the smallest chunk's time beyond its pure hashing time
+    smallest = CHUNK_CANDIDATES[0]
+    single_overhead = max(0.0, smallest / chunk_rates[smallest] - smallest / best_chunk_rate)
+    pool_overhead = measure_pool_overhead(workers, backend, chunk_size)
+    pool_rate = worker_rates[workers]
+    measurements.update(simple_rate=round(simple_rate), single_overhead=single_overhead,
+                        pool_overhead=pool_overhead)
+    log(f"  simple solver: {simple_rate:,.0f} H/s, backend setup: {single_overhead * 1000:.2f} ms, "
+        f"pool round-trip: {pool_overhead * 1000:.2f} ms")
+
+    # The simple solver stops after SIMPLE_MAX_ATTEMPTS, however fast it is
+    simple_max = min(crossover(simple_rate, 0.0, single_rate, single_overhead), simple_budget_difficulty())
+    pool_crossover = crossover(single_rate, single_overhead, pool_rate, pool_overhead)
+    single_max = max(simple_max, pool_crossover)
+    log(f"  simple<={simple_max} (budget allows <={simple_budget_difficulty()}), "
+        f"single-process<={single_max} (pool crossover {pool_crossover})")
+
+    return TuningProfile(backend=backend, workers=workers, threads=workers, chunk_size=chunk_size,
+                         simple_max_difficulty=simple_max, single_process_max_difficulty=single_max,
+                         threaded_max_difficulty=single_max, measurements=measurements)
+
+
+def tune_and_save(path: str = None, duration: float = 0.5) -> TuningProfile:
+    """Run ``--tune``: measure, write the profile and print it"""
+    profile = run_tuning(duration)
+    path = profile.save(path or default_tuning_file())
+    print(f"Tuning profile written to {path}")
+    print(f"  {profile.describe()}")
+    return profile
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Proof-of-Work Tuning Profile')
+    parser.add_argument('--tune', action='store_true', help='Measure this host and write the profile')
+    parser.add_argument('--tuning-file', default=None, help=f'Profile path (default: {default_tuning_file()})')
+    parser.add_argument('--duration', type=float, default=0.5, help='Seconds per measurement')
+
+    args = parser.parse_args()
+
+    if args.tune:
+        tune_and_save(args.tuning_file, args.duration)
+    else:
+        print(load_profile(args.tuning_file).describe())
+
+
+if __name__ == "__main__":
+    main()
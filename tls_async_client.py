@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Asyncio TLS Protocol Client
+The protocol loop on an event loop, with the PoW solve awaited off-loop.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from pow_affinity import pin_to_cpu
+from tls_connect_race import race_open_connection
+from tls_protocol_client import UltraOptimizedTLSClient, main as protocol_main
+from tls_session_cache import client_context, session_reused
+
+# Matches the blocking clients' socket timeout
+CONNECT_TIMEOUT = 30.0
+READ_TIMEOUT = 30.0
+
+# How often the connection is checked while a solve runs
+LIVENESS_INTERVAL = 1.0
+# How long a cancelled solve may take to stop before the session moves on
+CANCEL_GRACE = 2.0
+
+
+class AsyncTLSClient(UltraOptimizedTLSClient):
+    """``UltraOptimizedTLSClient`` with the protocol loop as coroutines.
+
+    The connection is an ``asyncio`` stream pair, so many sessions can
+    share one event loop. A solve runs on the session's executor thread;
+    the heavy hashing still happens in the persistent worker pool, the
+    thread only waits for it. While it waits, the loop stays free: it
+    notices a server hang-up and cancels the solve, and other sessions
+    keep talking. Solvers, responses and metrics are inherited unchanged.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream_reader: Optional[asyncio.StreamReader] = None
+        self.stream_writer: Optional[asyncio.StreamWriter] = None
+        self.pow_executor = None
+        # Set by the stream protocol when the server's EOF arrives
+        self.peer_eof = False
+
+    async def tls_connect_async(self) -> bool:
+        """Establish TLS connection with client certificates"""
+        try:
+            # asyncio streams take the cached context but cannot offer a
+            # stored session, so these handshakes are always full ones
+            self.tls_cache = client_context(self.cert_path, self.key_path)
+            if self.ports:
+                self.stream_reader, self.stream_writer, self.port = await race_open_connection(
+                    self.host, self.ports, self.tls_cache.context, self.port_stats, timeout=CONNECT_TIMEOUT)
+            else:
+                self.stream_reader, self.stream_writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.tls_cache.context,
+                                            server_hostname=self.host),
+                    CONNECT_TIMEOUT)
+            self.watch_eof()
+            self.report_handshake(session_reused(self.stream_writer.get_extra_info('ssl_object')))
+            return True
+        except Exception as e:
+            print(f"Connection failed: {e}")
+            return False
+
+    async def read_line_async(self) -> str:
+        """Read a line from the connection"""
+        try:
+            line = await asyncio.wait_for(self.stream_reader.readline(), READ_TIMEOUT)
+            return line.decode('utf-8').strip()
+        except Exception as e:
+            print(f"Read error: {e}")
+            return ""
+
+    async def write_line_async(self, data: str) -> bool:
+        """Write a line to the connection"""
+        return await self.write_bytes_async((data + '\n').encode('utf-8'))
+
+    async def write_bytes_async(self, payload: bytes) -> bool:
+        """Write an encoded, newline-terminated line to the connection"""
+        try:
+            self.stream_writer.write(payload)
+            await self.stream_writer.drain()
+            return True
+        except Exception as e:
+            print(f"Write error: {e}")
+            return False
+
+    def watch_eof(self) -> None:
+        """Record the server's EOF when the protocol delivers it.
+
+        ``StreamReader.at_eof()`` stays False until the buffer is drained,
+        and nothing reads during a solve, so unread data would hide a hang-up.
+        """
+        self.peer_eof = False
+        reader = self.stream_reader
+        feed_eof = reader.feed_eof
+
+        def eof_received():
+            self.peer_eof = True
+            feed_eof()
+
+        # StreamReaderProtocol calls this on EOF and on a clean connection_lost
+        reader.feed_eof = eof_received
+
+    def connection_lost(self) -> bool:
+        """True once the server closed or reset the connection, even with
+        unread data still buffered"""
+        transport = self.stream_writer.transport
+        return (self.peer_eof or self.stream_reader.exception() is not None
+                or transport is None or transport.is_closing())
+
+    async def solve_pow_async(self, difficulty: str) -> Optional[str]:
+        """Run the solver on the executor and watch the connection meanwhile"""
+        if self.pow_executor is None:
+            self.pow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pow')
+        loop = asyncio.get_running_loop()
+        solving = loop.run_in_executor(self.pow_executor, self.solve_proof_of_work,
+                                       self.authdata, difficulty)
+        while True:
+            done, _ = await asyncio.wait({solving}, timeout=LIVENESS_INTERVAL)
+            if done:
+                return solving.result()
+            if self.connection_lost():
+                print("Connection closed by server during proof-of-work, cancelling the solve")
+                self.cancel_pow()
+                # A solver that misses the cancel must not hold the session
+                done, _ = await asyncio.wait({solving}, timeout=CANCEL_GRACE)
+                if not done:
+                    print(f"Solve still running {CANCEL_GRACE:.0f}s after the cancel, abandoning it")
+                    # Its eventual result is dropped; retrieve it so asyncio does not log it
+                    solving.add_done_callback(lambda future: future.cancelled() or future.exception())
+                return None
+
+    async def handle_command_async(self, args) -> bool:
+        """Handle server commands"""
+        if args[0] == "POW":
+            difficulty = self.start_pow(args)
+            solution = await self.solve_pow_async(difficulty)
+            self.pow_received_at = None
+            if solution:
+                # Write first: printing is not on the found-to-sent path
+                sent = await self.write_line_async(solution)
+                self.report_pow_sent(solution)
+                return sent
+            else:
+                print("Failed to solve proof-of-work within time limit")
+                return False
+
+        response = self.command_response(args)
+        return response is not None and await self.write_bytes_async(response)
+
+    async def run_async(self) -> bool:
+        """Main protocol loop"""
+        # Worker start-up overlaps the TCP connect, TLS handshake and HELO
+        self.completed = False
+        self.prewarm_pow_pool()
+        loop = asyncio.get_running_loop()
+        if not await self.tls_connect_async():
+            await loop.run_in_executor(None, self.stop_pow_pool)
+            return False
+
+        try:
+            print("Starting protocol communication (asyncio)...")
+
+            while True:
+                line = await self.read_line_async()
+                if not line:
+                    print("Connection closed by server")
+                    break
+
+                received = time.perf_counter()
+                print(f"Received: {line}")
+                args = line.split(' ')
+
+                handled = await self.handle_command_async(args)
+                self.metrics.observe_command(args[0], time.perf_counter() - received)
+                if not handled:
+                    break
+
+                if args[0] == "END":
+                    print("Protocol completed successfully")
+                    self.completed = True
+                    break
+
+            return True
+
+        except Exception as e:
+            print(f"Protocol error: {e}")
+            return False
+
+        finally:
+            if self.pow_executor is not None:
+                # A solve abandoned after CANCEL_GRACE is still running:
+                # cancel it again, and closing the pool wakes a pool wait
+                self.cancel_pow()
+            # Joining the workers and the solve thread blocks, so both run off the loop
+            await loop.run_in_executor(None, self.stop_pow_pool)
+            if self.pow_executor is not None:
+                await loop.run_in_executor(None, self.pow_executor.shutdown)
+                self.pow_executor = None
+            if self.stream_writer is not None:
+                self.stream_writer.close()
+                try:
+                    await self.stream_writer.wait_closed()
+                except Exception:
+                    pass
+                print("Connection closed")
+
+    def run(self) -> bool:
+        """Run one session on its own event loop"""
+        # The event loop gets its own CPU when one is reserved
+        if pin_to_cpu(self.placement.protocol_cpu):
+            print(f"Protocol loop pinned to CPU {self.placement.protocol_cpu}")
+        return asyncio.run(self.run_async())
+
+
+def main():
+    """Main function with command line argument support"""
+    protocol_main(AsyncTLSClient)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,12 @@ import time
 import sys
 import os
 
+from pow_affinity import available_cpu_count
+from pow_engine import NonceEnumerator, PrefixHasher, difficulty_limit, plan_suffix, suffix_length
+from tls_line_reader import LineReader
+from tls_responses import ResponseTable
+from tls_session_cache import client_context, session_reused
+
 class OptimizedTLSClient:
     def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None):
         self.host = host
@@ -23,6 +29,8 @@ class OptimizedTLSClient:
         self.cert_path = cert_path
         self.key_path = key_path
         self.conn = None
+        self.reader = None
+        self.tls_cache = None
         self.authdata = ""
         
         # Pre-compiled character set for random string generation (excluding \n\r\t )
@@ -38,24 +46,24 @@ class OptimizedTLSClient:
             'country': 'India',
             'address_lines': ['Whitefield', 'Benguluru', 'Karnataka', '560066']
         }
+        
+        # Response bytes per command, compiled once from personal_info
+        self.responses = ResponseTable(self.personal_info)
     
     def tls_connect(self):
         """Establish TLS connection with client certificates"""
         try:
-            # Create SSL context
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
+            # Process-wide SSL context with the client certificate (tls_session_cache.py)
+            self.tls_cache = client_context(self.cert_path, self.key_path)
             
-            # Load client certificate and key if provided
-            if self.cert_path and self.key_path:
-                context.load_cert_chain(self.cert_path, self.key_path)
-            
-            # Create socket and wrap with SSL
+            # Create socket and wrap with SSL, resuming a stored session if any
             sock = socket.create_connection((self.host, self.port), timeout=30)
-            self.conn = context.wrap_socket(sock, server_hostname=self.host)
+            self.conn = self.tls_cache.wrap_socket(sock, self.host, self.port)
+            self.reader = LineReader(self.conn)
             
-            print(f"Connected to {self.host}:{self.port}")
+            resumed = session_reused(self.conn)
+            print(f"Connected to {self.host}:{self.port} "
+                  f"({'resumed TLS session' if resumed else 'full TLS handshake'})")
             return True
             
         except Exception as e:
@@ -65,23 +73,19 @@ class OptimizedTLSClient:
     def read_line(self):
         """Read a line from the connection"""
         try:
-            data = b''
-            while True:
-                chunk = self.conn.recv(1)
-                if not chunk:
-                    break
-                data += chunk
-                if chunk == b'\n':
-                    break
-            return data.decode('utf-8').strip()
+            return self.reader.readline().decode('utf-8').strip()
         except Exception as e:
             print(f"Read error: {e}")
             return ""
     
     def write_line(self, data):
         """Write a line to the connection"""
+        return self.write_bytes((data + '\n').encode('utf-8'))
+    
+    def write_bytes(self, payload):
+        """Write an encoded, newline-terminated line to the connection"""
         try:
-            self.conn.sendall((data + '\n').encode('utf-8'))
+            self.conn.sendall(payload)
             return True
         except Exception as e:
             print(f"Write error: {e}")
@@ -95,22 +99,34 @@ class OptimizedTLSClient:
         """Calculate SHA1 hash and return hex string"""
         return hashlib.sha1(data.encode('utf-8')).hexdigest()
     
-    def pow_worker(self, authdata, difficulty, result_queue, stop_event):
+    def pow_worker(self, authdata, difficulty, result_queue, stop_event, worker_id=0, num_workers=1):
         """Worker function for proof-of-work calculation"""
-        target = '0' * int(difficulty)
+        limit = difficulty_limit(difficulty)
         
-        while not stop_event.is_set():
-            # Generate random suffix of varying length for better distribution
-            suffix = self.generate_random_string(secrets.randbelow(8) + 4)
-            cksum = self.sha1_hash(authdata + suffix)
-            
-            if cksum.startswith(target):
-                result_queue.put(suffix)
-                stop_event.set()
+        # Absorb authdata once, then copy the midstate per candidate
+        root = PrefixHasher(authdata)
+        
+        # Each worker walks its own disjoint slice of the nonce space, at the
+        # suffix length planned for this authdata and difficulty
+        nonces = NonceEnumerator.partition(worker_id, num_workers, suffix_length(authdata, difficulty))
+        
+        for block, (head, tails) in enumerate(nonces.blocks()):
+            if stop_event.is_set():
                 return
             
-            # Check every 10000 iterations to avoid busy waiting
-            if secrets.randbelow(10000) == 0:
+            new_hasher = root.extend(head).copy
+            for tail in tails:
+                hasher = new_hasher()
+                hasher.update(tail)
+                digest = hasher.digest()
+                
+                if digest < limit:
+                    result_queue.append((head + tail).decode('ascii'))
+                    stop_event.set()
+                    return
+            
+            # Yield roughly every 10000 iterations to avoid busy waiting
+            if block % 156 == 155:
                 time.sleep(0.001)
     
     def solve_proof_of_work(self, authdata, difficulty):
@@ -123,7 +139,7 @@ class OptimizedTLSClient:
         # print(f"Using {num_threads} threads for proof-of-work")
 
         # Use more threads for better parallelism
-        cpu_count = multiprocessing.cpu_count()
+        cpu_count = available_cpu_count()
         print(f"CPU cores available: {cpu_count}")
         num_threads = min(cpu_count * 2, 32)  # Up to 32 threads
         print(f"Using {num_threads} threads for proof-of-work")
@@ -133,13 +149,16 @@ class OptimizedTLSClient:
         
         with ThreadPoolExecutor(max_workers=num_threads) as executor:
             futures = []
-            for _ in range(num_threads):
-                future = executor.submit(self.pow_worker, authdata, difficulty, result_queue, stop_event)
+            for i in range(num_threads):
+                future = executor.submit(self.pow_worker, authdata, difficulty, result_queue, stop_event,
+                                         i, num_threads)
                 futures.append(future)
             
             # Wait for first result
-            while not stop_event.is_set() and not result_queue:
-                time.sleep(0.1)
+            # The finding worker sets stop_event, which wakes this wait at once
+            while not result_queue:
+                if stop_event.wait(0.1):
+                    break
             
             if result_queue:
                 solution = result_queue[0]
@@ -149,24 +168,19 @@ class OptimizedTLSClient:
         
         return None
     
-    def create_authenticated_response(self, nonce, data):
-        """Create authenticated response with SHA1 hash"""
-        return self.sha1_hash(self.authdata + nonce) + " " + data
-    
     def handle_command(self, args):
         """Handle server commands"""
         cmd = args[0]
         
-        if cmd == "HELO":
-            return self.write_line("TOAKUEI")
-        
-        elif cmd == "ERROR":
+        if cmd == "ERROR":
             print("ERROR: " + " ".join(args[1:]))
             return False
         
         elif cmd == "POW":
             self.authdata = args[1]
+            self.responses.set_authdata(self.authdata)
             difficulty = args[2]
+            print(f"Suffix plan: {plan_suffix(self.authdata, difficulty).describe()}")
             solution = self.solve_proof_of_work(self.authdata, difficulty)
             if solution:
                 return self.write_line(solution)
@@ -174,53 +188,16 @@ class OptimizedTLSClient:
                 print("Failed to solve proof-of-work")
                 return False
         
-        elif cmd == "END":
-            print("Data submission confirmed")
-            return self.write_line("OK")
-        
-        elif cmd == "NAME":
-            response = self.create_authenticated_response(args[1], self.personal_info['name'])
-            return self.write_line(response)
-        
-        elif cmd == "MAILNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['emails'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("MAIL"):
-            mail_idx = int(cmd[4:]) - 1
-            if mail_idx < len(self.personal_info['emails']):
-                email = self.personal_info['emails'][mail_idx]
-                response = self.create_authenticated_response(args[1], email)
-                return self.write_line(response)
-            return False
-        
-        elif cmd == "SKYPE":
-            response = self.create_authenticated_response(args[1], self.personal_info['skype'])
-            return self.write_line(response)
-        
-        elif cmd == "BIRTHDATE":
-            response = self.create_authenticated_response(args[1], self.personal_info['birthdate'])
-            return self.write_line(response)
-        
-        elif cmd == "COUNTRY":
-            response = self.create_authenticated_response(args[1], self.personal_info['country'])
-            return self.write_line(response)
-        
-        elif cmd == "ADDRNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['address_lines'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("ADDRLINE"):
-            addr_idx = int(cmd[8:]) - 1
-            if addr_idx < len(self.personal_info['address_lines']):
-                addr_line = self.personal_info['address_lines'][addr_idx]
-                response = self.create_authenticated_response(args[1], addr_line)
-                return self.write_line(response)
-            return False
-        
         else:
-            print(f"Unknown command: {cmd}")
-            return False
+            if cmd == "END":
+                print("Data submission confirmed")
+            
+            # HELO, END and the personal-data commands come from the response table
+            response = self.responses.answer(args)
+            if response is None:
+                print(f"Unknown command: {cmd}")
+                return False
+            return self.write_bytes(response)
     
     def run(self):
         """Main protocol loop"""
@@ -257,6 +234,7 @@ class OptimizedTLSClient:
         
         finally:
             if self.conn:
+                self.tls_cache.remember(self.host, self.port, self.conn)
                 self.conn.close()
                 print("Connection closed")
 
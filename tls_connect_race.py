@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Multi-Port TLS Connection Racing
+Happy-eyeballs style staggered TCP+TLS handshakes across the server ports,
+ordered by the latency and failures remembered from earlier runs.
+"""
+
+import asyncio
+import errno
+import json
+import os
+import selectors
+import socket
+import ssl
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Ports the server listens on
+SERVER_PORTS = (3336, 8083, 8446, 49155, 3481, 65532)
+
+# Delay before the next port joins the race (RFC 8305 "Connection Attempt
+# Delay"); a failed attempt starts the next one at once
+STAGGER = 0.25
+CONNECT_TIMEOUT = 30.0
+
+# Stats location; POW_PORT_STATS_FILE overrides it
+DEFAULT_STATS_FILE = os.path.join(os.path.expanduser('~'), '.pow_ports.json')
+STATS_VERSION = 1
+
+# Weight of the newest handshake in the latency average
+LATENCY_ALPHA = 0.3
+# Ranking latency for a port without a successful handshake yet
+UNKNOWN_LATENCY = 1.0
+
+
+def default_stats_file() -> str:
+    return os.environ.get('POW_PORT_STATS_FILE', DEFAULT_STATS_FILE)
+
+
+def race_ports(port: int, ports: Optional[Sequence[int]] = None) -> List[int]:
+    """Ports to race: ``port`` first as the tie-break, then the others"""
+    return [port] + [p for p in (ports or SERVER_PORTS) if p != port]
+
+
+class PortStats:
+    """Per ``host:port`` handshake latency and failure history, kept as JSON.
+
+    Ports are ranked by consecutive failures first, then by the moving
+    average of their handshake time, so a port that just failed drops
+    behind every working one and the fastest working port goes first.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or default_stats_file()
+        self.ports: Dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, path: str = None, quiet: bool = False) -> 'PortStats':
+        stats = cls(path)
+        if not os.path.exists(stats.path):
+            return stats
+        try:
+            with open(stats.path) as f:
+                data = json.load(f)
+            if data.get('version') == STATS_VERSION:
+                stats.ports = data.get('ports', {})
+        except (OSError, ValueError) as e:
+            if not quiet:
+                print(f"Ignoring port stats {stats.path}: {e}")
+        return stats
+
+    def save(self) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': STATS_VERSION, 'ports': self.ports}, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not write port stats {self.path}: {e}")
+
+    def entry(self, host: str, port: int) -> dict:
+        return self.ports.setdefault(f"{host}:{port}", {
+            'attempts': 0, 'failures': 0, 'consecutive_failures': 0,
+            'latency': None, 'last_error': None, 'updated': None})
+
+    def record_success(self, host: str, port: int, seconds: float) -> None:
+        entry = self.entry(host, port)
+        entry['attempts'] += 1
+        entry['consecutive_failures'] = 0
+        latency = entry['latency']
+        entry['latency'] = seconds if latency is None else latency + LATENCY_ALPHA * (seconds - latency)
+        entry['updated'] = time.time()
+
+    def record_failure(self, host: str, port: int, error: str) -> None:
+        entry = self.entry(host, port)
+        entry['attempts'] += 1
+        entry['failures'] += 1
+        entry['consecutive_failures'] += 1
+        entry['last_error'] = error
+        entry['updated'] = time.time()
+
+    def order(self, host: str, ports: Sequence[int]) -> List[int]:
+        """``ports`` with the historically best first; ties keep the given order"""
+        def rank(item):
+            index, port = item
+            entry = self.ports.get(f"{host}:{port}") or {}
+            latency = entry.get('latency')
+            return (entry.get('consecutive_failures', 0),
+                    UNKNOWN_LATENCY if latency is None else latency, index)
+        return [port for _, port in sorted(enumerate(ports), key=rank)]
+
+    def describe(self, host: str, ports: Sequence[int]) -> str:
+        lines = []
+        for port in self.order(host, ports):
+            entry = self.ports.get(f"{host}:{port}")
+            if not entry:
+                lines.append(f"  {port:>5}  no history")
+                continue
+            latency = entry['latency']
+            text = (f"  {port:>5}  {'-' if latency is None else f'{latency * 1000:.1f} ms':>9}  "
+                    f"{entry['failures']}/{entry['attempts']} failed")
+            if entry['consecutive_failures']:
+                text += f" ({entry['consecutive_failures']} in a row, last: {entry['last_error']})"
+            lines.append(text)
+        return '\n'.join(lines)
+
+
+def _error_text(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class _Attempt:
+    """One non-blocking TCP connect plus TLS handshake"""
+
+    def __init__(self, host: str, sockaddr: tuple, family: int, port: int, context: ssl.SSLContext,
+                 session: Optional[ssl.SSLSession] = None):
+        self.host = host
+        self.port = port
+        self.context = context
+        self.session = session
+        self.started = time.perf_counter()
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.tls = None
+        self.want = selectors.EVENT_WRITE
+        err = self.sock.connect_ex(sockaddr)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.sock.close()
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self) -> int:
+        return (self.tls or self.sock).fileno()
+
+    def step(self) -> bool:
+        """Advance on readiness; True once the handshake completed"""
+        if self.tls is None:
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, os.strerror(err))
+            self.tls = self.context.wrap_socket(self.sock, server_hostname=self.host,
+                                                do_handshake_on_connect=False, session=self.session)
+        try:
+            self.tls.do_handshake()
+            return True
+        except ssl.SSLWantReadError:
+            self.want = selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            self.want = selectors.EVENT_WRITE
+        return False
+
+    def close(self) -> None:
+        try:
+            (self.tls or self.sock).close()
+        except OSError:
+            pass
+
+
+def _resolve(host: str) -> Tuple[int, tuple]:
+    family, _, _, _, sockaddr = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0]
+    return family, sockaddr
+
+
+def race_connect(host: str, ports: Sequence[int], context: ssl.SSLContext,
+                 stats: Optional[PortStats] = None, stagger: float = STAGGER,
+                 timeout: float = CONNECT_TIMEOUT, sessions=None) -> Tuple[ssl.SSLSocket, int]:
+    """Race TLS handshakes to ``host`` on ``ports``; return ``(socket, port)``.
+
+    Ports start ``stagger`` seconds apart in ``stats`` order, and the next
+    one starts at once when an attempt fails. The first completed
+    handshake wins and every other attempt is closed. The winner is
+    switched back to a blocking socket with ``timeout``, like
+    ``socket.create_connection``. Raises ConnectionError when all fail.
+    ``sessions`` (a ``tls_session_cache.CachedContext`` for ``context``)
+    offers each attempt the stored session of its port.
+    """
+    order = stats.order(host, ports) if stats else list(ports)
+    family, sockaddr = _resolve(host)
+    selector = selectors.DefaultSelector()
+    waiting = list(order)
+    errors = {}
+    winner = None
+    started = time.perf_counter()
+    deadline = started + timeout
+    next_start = started
+
+    def fail(port, error):
+        errors[port] = _error_text(error)
+        if stats:
+            stats.record_failure(host, port, errors[port])
+
+    try:
+        while winner is None and (waiting or selector.get_map()):
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if waiting and now >= next_start:
+                port = waiting.pop(0)
+                try:
+                    session = sessions.session(host, port) if sessions else None
+                    attempt = _Attempt(host, sockaddr[:1] + (port,) + sockaddr[2:], family, port,
+                                       context, session)
+                    selector.register(attempt.fileno(), attempt.want, attempt)
+                except OSError as e:
+                    fail(port, e)
+                    continue
+                next_start = now + stagger
+
+            wait = deadline - now
+            if waiting:
+                wait = min(wait, max(0.0, next_start - now))
+            for key, _ in selector.select(wait):
+                attempt = key.data
+                try:
+                    done = attempt.step()
+                except (OSError, ssl.SSLError) as e:
+                    selector.unregister(key.fd)
+                    attempt.close()
+                    fail(attempt.port, e)
+                    # Happy eyeballs: a failure starts the next port at once
+                    next_start = time.perf_counter()
+                    continue
+                if done:
+                    winner = attempt
+                    break
+                selector.modify(key.fd, attempt.want, attempt)
+    finally:
+        for key in list(selector.get_map().values()):
+            if key.data is not winner:
+                key.data.close()
+                if key.data.port not in errors:
+                    errors[key.data.port] = 'cancelled'
+        selector.close()
+
+    elapsed = time.perf_counter() - started
+    if winner is None:
+        for port, error in errors.items():
+            if error == 'cancelled':
+                errors[port] = 'timed out'
+                if stats:
+                    stats.record_failure(host, port, 'timed out')
+        if stats:
+            stats.save()
+        tried = ', '.join(f"{port} ({errors.get(port, 'not started')})" for port in order)
+        raise ConnectionError(f"No port of {host} completed a TLS handshake in {elapsed:.1f}s: {tried}")
+
+    handshake = time.perf_counter() - winner.started
+    if stats:
+        stats.record_success(host, winner.port, handshake)
+        stats.save()
+    failed = [f"{port} ({error})" for port, error in errors.items() if error != 'cancelled']
+    print(f"Port race: {winner.port} won in {elapsed * 1000:.1f} ms (handshake {handshake * 1000:.1f} ms)"
+          + (f"; failed: {', '.join(failed)}" if failed else ''))
+    winner.tls.settimeout(timeout)
+    return winner.tls, winner.port
+
+
+async def race_open_connection(host: str, ports: Sequence[int], context: ssl.SSLContext,
+                               stats: Optional[PortStats] = None, stagger: float = STAGGER,
+                               timeout: float = CONNECT_TIMEOUT):
+    """``race_connect`` for asyncio; returns ``(reader, writer, port)``"""
+    order = stats.order(host, ports) if stats else list(ports)
+    loop = asyncio.get_running_loop()
+    waiting = list(order)
+    attempts = {}
+    errors = {}
+    winner = None
+    started = loop.time()
+    deadline = started + timeout
+
+    def fail(port, error):
+        errors[port] = _error_text(error)
+        if stats:
+            stats.record_failure(host, port, errors[port])
+
+    try:
+        while winner is None and (waiting or attempts):
+            now = loop.time()
+            if now >= deadline:
+                break
+            if waiting:
+                port = waiting.pop(0)
+                task = asyncio.ensure_future(
+                    asyncio.open_connection(host, port, ssl=context, server_hostname=host))
+                attempts[task] = (port, time.perf_counter())
+            wait = deadline - now
+            if waiting:
+                wait = min(wait, stagger)
+            done, _ = await asyncio.wait(attempts, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                port, attempt_started = attempts.pop(task)
+                try:
+                    reader, writer = task.result()
+                except (OSError, ssl.SSLError) as e:
+                    fail(port, e)
+                    continue
+                if winner is None:
+                    winner = (reader, writer, port, time.perf_counter() - attempt_started)
+                else:
+                    writer.close()
+    finally:
+        for task, (port, _) in attempts.items():
+            task.cancel()
+            errors.setdefault(port, 'cancelled')
+
+    elapsed = loop.time() - started
+    if winner is None:
+        for port, error in errors.items():
+            if error == 'cancelled':
+                errors[port] = 'timed out'
+                if stats:
+                    stats.record_failure(host, port, 'timed out')
+        if stats:
+            stats.save()
+        tried = ', '.join(f"{port} ({errors.get(port, 'not started')})" for port in order)
+        raise ConnectionError(f"No port of {host} completed a TLS handshake in {elapsed:.1f}s: {tried}")
+
+    reader, writer, port, handshake = winner
+    if stats:
+        stats.record_success(host, port, handshake)
+        stats.save()
+    failed = [f"{p} ({error})" for p, error in errors.items() if error != 'cancelled']
+    print(f"Port race: {port} won in {elapsed * 1000:.1f} ms (handshake {handshake * 1000:.1f} ms)"
+          + (f"; failed: {', '.join(failed)}" if failed else ''))
+    return reader, writer, port
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Multi-Port TLS Connection Racing')
+    parser.add_argument('--host', default='18.202.148.130', help='Server hostname')
+    parser.add_argument('--ports', type=int, nargs='+', default=list(SERVER_PORTS), help='Ports to race')
+    parser.add_argument('--cert', help='Client certificate file path')
+    parser.add_argument('--key', help='Client private key file path')
+    parser.add_argument('--stagger', type=float, default=STAGGER, help='Seconds between attempt starts')
+    parser.add_argument('--timeout', type=float, default=CONNECT_TIMEOUT, help='Overall connect timeout')
+    parser.add_argument('--port-stats', default=None, help='Port stats file')
+    parser.add_argument('--show', action='store_true', help='Only print the remembered port ranking')
+
+    args = parser.parse_args()
+
+    stats = PortStats.load(args.port_stats)
+    if not args.show:
+        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        if args.cert and args.key:
+            context.load_cert_chain(args.cert, args.key)
+        try:
+            conn, _ = race_connect(args.host, args.ports, context, stats, args.stagger, args.timeout)
+            conn.close()
+        except ConnectionError as e:
+            print(e)
+    print(f"Port ranking for {args.host} ({stats.path}):")
+    print(stats.describe(args.host, args.ports))
+
+
+if __name__ == "__main__":
+    main()
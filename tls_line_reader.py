@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Buffered TLS Line Reader
+Newline-delimited reads over a socket through one preallocated buffer.
+"""
+
+import socket
+import ssl
+import threading
+import time
+from typing import Callable, List
+
+# One TLS record carries at most 16 KiB of plaintext; the buffer holds a few
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class LineReader:
+    """Reads lines from ``conn`` with ``recv_into`` a fixed buffer.
+
+    A single read takes everything the TLS record (or socket) has ready,
+    so several lines that arrive together are returned by later
+    ``readline()`` calls without another read. Newlines are found with
+    ``bytearray.find``, the scan resumes where the previous one stopped,
+    and the buffer is never reallocated: consumed bytes are reclaimed by
+    moving the unread tail to the front once the end is reached.
+    """
+
+    def __init__(self, conn, size: int = DEFAULT_BUFFER_SIZE):
+        self.conn = conn
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0   # first unread byte
+        self.scan = 0    # no newline in [start, scan)
+        self.end = 0     # end of received data
+
+    @property
+    def buffered(self) -> int:
+        """Bytes received but not returned yet"""
+        return self.end - self.start
+
+    def has_line(self) -> bool:
+        """True when ``readline()`` can return without reading the connection"""
+        return self.buf.find(b'\n', self.scan, self.end) >= 0
+
+    def readline(self) -> bytes:
+        """Return the next line including its newline.
+
+        At end of stream the unterminated rest is returned, then b''.
+        Raises ValueError for a line longer than the buffer.
+        """
+        while True:
+            newline = self.buf.find(b'\n', self.scan, self.end)
+            if newline >= 0:
+                line = bytes(self.view[self.start:newline + 1])
+                self.start = self.scan = newline + 1
+                if self.start == self.end:
+                    self.start = self.scan = self.end = 0
+                return line
+            self.scan = self.end
+
+            if self.end == len(self.buf):
+                if self.start == 0:
+                    raise ValueError(f"Line exceeds the {len(self.buf)}-byte read buffer")
+                pending = self.end - self.start
+                self.buf[:pending] = self.buf[self.start:self.end]
+                self.start, self.scan, self.end = 0, pending, pending
+
+            received = self.conn.recv_into(self.view[self.end:])
+            if not received:
+                line = bytes(self.view[self.start:self.end])
+                self.start = self.scan = self.end = 0
+                return line
+            self.end += received
+
+
+def read_line_bytewise(conn) -> bytes:
+    """The clients' previous reader: one ``recv(1)`` per byte"""
+    data = b''
+    while True:
+        chunk = conn.recv(1)
+        if not chunk:
+            break
+        data += chunk
+        if chunk == b'\n':
+            break
+    return data
+
+
+def _protocol_lines(count: int) -> List[bytes]:
+    """Server lines shaped like the real protocol"""
+    nonce = 'Q' * 32
+    lines = [b'HELO\n', b'POW ' + b'A' * 64 + b' 9\n']
+    commands = ['NAME', 'MAILNUM', 'MAIL1', 'SKYPE', 'BIRTHDATE', 'COUNTRY', 'ADDRNUM', 'ADDRLINE1']
+    while len(lines) < count - 1:
+        lines.append(f"{commands[len(lines) % len(commands)]} {nonce}\n".encode('ascii'))
+    lines.append(b'END\n')
+    return lines[:count]
+
+
+def _loopback_pair(cert_path: str = None, key_path: str = None):
+    """Connected (client, server) sockets, TLS-wrapped when a certificate is given"""
+    listener = socket.create_server(('127.0.0.1', 0))
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+    for sock in (client, server):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if not cert_path:
+        return client, server
+
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_path, key_path)
+    client_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    client_context.check_hostname = False
+    client_context.verify_mode = ssl.CERT_NONE
+
+    wrapped = {}
+    handshake = threading.Thread(
+        target=lambda: wrapped.setdefault('server', server_context.wrap_socket(server, server_side=True)))
+    handshake.start()
+    client = client_context.wrap_socket(client, server_hostname='127.0.0.1')
+    handshake.join()
+    return client, wrapped['server']
+
+
+def benchmark_reader(read: Callable, lines: List[bytes], burst: int,
+                     cert_path: str = None, key_path: str = None) -> float:
+    """Seconds ``read`` takes to receive ``lines`` sent ``burst`` lines per write"""
+    client, server = _loopback_pair(cert_path, key_path)
+    try:
+        payload = [b''.join(lines[i:i + burst]) for i in range(0, len(lines), burst)]
+        sender = threading.Thread(target=lambda: [server.sendall(chunk) for chunk in payload])
+        started = time.perf_counter()
+        sender.start()
+        for expected in lines:
+            if read(client) != expected:
+                raise RuntimeError("Reader returned a different line")
+        elapsed = time.perf_counter() - started
+        sender.join()
+        return elapsed
+    finally:
+        client.close()
+        server.close()
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Buffered TLS Line Reader benchmark')
+    parser.add_argument('--lines', type=int, default=20000, help='Lines per run')
+    parser.add_argument('--burst', type=int, nargs='+', default=[1, 8], help='Lines sent per write')
+    parser.add_argument('--cert', help='Server certificate for a TLS loopback (plain TCP without)')
+    parser.add_argument('--key', help='Server private key')
+
+    args = parser.parse_args()
+
+    lines = _protocol_lines(args.lines)
+    transport = 'TLS' if args.cert else 'TCP'
+    print(f"Loopback {transport}, {len(lines):,} lines of ~{sum(map(len, lines)) // len(lines)} bytes")
+    for burst in args.burst:
+        # One LineReader per connection, created on its first read
+        readers = {}
+
+        def buffered(conn):
+            if conn not in readers:
+                readers[conn] = LineReader(conn)
+            return readers[conn].readline()
+
+        bytewise = benchmark_reader(read_line_bytewise, lines, burst, args.cert, args.key)
+        reader = benchmark_reader(buffered, lines, burst, args.cert, args.key)
+        for name, seconds in (('recv(1) loop', bytewise), ('LineReader', reader)):
+            print(f"  burst {burst:>3}  {name:<14} {seconds * 1000:9.1f} ms  "
+                  f"{seconds / len(lines) * 1e6:7.2f} us/line  {len(lines) / seconds:>10,.0f} lines/s")
+        print(f"  burst {burst:>3}  speed-up {bytewise / reader:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,44 +4,80 @@ Ultra-Optimized TLS Protocol Client Implementation
 High-performance proof-of-work solver with advanced optimizations
 """
 
-import ssl
 import socket
 import hashlib
-import secrets
-import string
 import threading
-import multiprocessing
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import time
 import sys
-import os
-import itertools
-import queue
-from typing import Optional, Tuple
+from typing import Optional, Sequence
+
+from pow_affinity import Placement, available_cpu_count, pin_to_cpu
+from pow_backends import (available_backends, calibration_report, calibration_results, get_backend, midstate_search,
+                          select_backend)
+from pow_cluster import PowCoordinator, parse_address
+from pow_control import ControlBlock
+from pow_deadline import DeadlinePlanner
+from pow_engine import NONCE_BASE, NonceEnumerator, PrefixHasher, difficulty_limit, plan_suffix, suffix_length
+from pow_metrics import SolverMetrics, start_exporters
+from pow_pool import PROGRESS_INTERVAL, PowWorkerPool, choose_start_method, gil_enabled
+from pow_profile import DEFAULT_PROFILE_ATTEMPTS, run_profile
+from pow_tuning import SIMPLE_MAX_ATTEMPTS, TuningProfile, load_profile, profile_backend, tune_and_save
+from tls_connect_race import PortStats, race_connect, race_ports
+from tls_line_reader import LineReader
+from tls_responses import ResponseTable
+from tls_session_cache import CachedContext, client_context, session_reused
 
 class UltraOptimizedTLSClient:
-    def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None):
+    def __init__(self, host="18.202.148.130", port=3336, cert_path=None, key_path=None,
+                 backend: str = 'auto', tuning: TuningProfile = None,
+                 cluster: PowCoordinator = None, reserve_cpu: bool = False,
+                 metrics: SolverMetrics = None, ports: Sequence[int] = None,
+                 port_stats: PortStats = None):
         self.host = host
         self.port = port
+        # With several ports, tls_connect races them (tls_connect_race.py)
+        self.ports = ports
+        self.port_stats = port_stats
         self.cert_path = cert_path
         self.key_path = key_path
         self.conn = None
+        self.reader = None
         self.authdata = ""
         
-        # Optimized character sets for faster generation
-        self.ascii_letters = string.ascii_letters
-        self.ascii_digits = string.digits
-        self.special_chars = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+        # Shared context of this certificate and its TLS sessions
+        # (tls_session_cache.py); set by tls_connect
+        self.tls_cache: Optional[CachedContext] = None
+        self.completed = False
+        
+        # Per-machine tuning profile (pow_tuning.py --tune), defaults otherwise
+        self.tuning = tuning or load_profile()
+        
+        # PoW hash backend name; 'auto' uses the tuned backend, or the fastest
+        # one by start-up calibration
+        self.backend = profile_backend(backend, self.tuning)
+        
+        # Worker -> CPU placement from the affinity mask, computed before the
+        # protocol thread pins itself
+        self.placement = Placement(self.tuning.workers, reserve_cpu)
         
-        # Combined valid characters (excluding forbidden ones)
-        forbidden = set('\n\r\t ')
-        all_printable = set(string.printable)
-        self.valid_chars = ''.join(sorted(all_printable - forbidden))
-        self.valid_chars_list = list(self.valid_chars)
-        self.char_count = len(self.valid_chars_list)
+        # Persistent worker processes, pre-warmed by run() during connect
+        self.pow_pool = None
+        self.pow_pool_lock = threading.Lock()
+        self.prewarm_reported = False
         
-        # Pre-compute common prefixes for faster string operations
-        self.prefix_cache = {}
+        # Coordinator leasing nonce ranges to remote agents (pow_cluster.py)
+        self.cluster = cluster
+        
+        # Timeouts and give-up decisions follow the server's POW deadline,
+        # counted from when the POW line arrived
+        self.pow_received_at = None
+        self.planner = None
+        # Per-solve cancel flag, replaced when a POW line arrives; a cancel
+        # stays visible to solver stages that have not started yet
+        self.pow_cancel = threading.Event()
+        
+        # Live solver and protocol metrics (pow_metrics.py)
+        self.metrics = metrics or SolverMetrics()
         
         # Personal information - UPDATE THESE WITH YOUR ACTUAL DETAILS
         self.personal_info = {
@@ -52,21 +88,31 @@ class UltraOptimizedTLSClient:
             'country': 'India',
             'address_lines': ['Whitefield', 'Benguluru', 'Karnataka', '560066']
         }
+        
+        # Response bytes per command, compiled once from personal_info
+        self.responses = ResponseTable(self.personal_info)
+    
+    def report_handshake(self, resumed: bool) -> None:
+        """Count the handshake kind and announce the connection"""
+        self.metrics.observe_handshake(resumed)
+        kind = "resumed TLS session" if resumed else "full TLS handshake"
+        print(f"Connected to {self.host}:{self.port} ({kind})")
     
     def tls_connect(self):
         """Establish TLS connection with client certificates"""
         try:
-            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            
-            if self.cert_path and self.key_path:
-                context.load_cert_chain(self.cert_path, self.key_path)
-            
-            sock = socket.create_connection((self.host, self.port), timeout=30)
-            self.conn = context.wrap_socket(sock, server_hostname=self.host)
+            # Certificate parsed once per process; a stored session makes
+            # reconnects an abbreviated handshake
+            self.tls_cache = client_context(self.cert_path, self.key_path)
+            if self.ports:
+                self.conn, self.port = race_connect(self.host, self.ports, self.tls_cache.context,
+                                                    self.port_stats, sessions=self.tls_cache)
+            else:
+                sock = socket.create_connection((self.host, self.port), timeout=30)
+                self.conn = self.tls_cache.wrap_socket(sock, self.host, self.port)
+            self.reader = LineReader(self.conn)
             
-            print(f"Connected to {self.host}:{self.port}")
+            self.report_handshake(session_reused(self.conn))
             return True
             
         except Exception as e:
@@ -76,134 +122,66 @@ class UltraOptimizedTLSClient:
     def read_line(self):
         """Read a line from the connection"""
         try:
-            data = b''
-            while True:
-                chunk = self.conn.recv(1)
-                if not chunk:
-                    break
-                data += chunk
-                if chunk == b'\n':
-                    break
-            return data.decode('utf-8').strip()
+            return self.reader.readline().decode('utf-8').strip()
         except Exception as e:
             print(f"Read error: {e}")
             return ""
     
     def write_line(self, data):
         """Write a line to the connection"""
+        return self.write_bytes((data + '\n').encode('utf-8'))
+    
+    def write_bytes(self, payload: bytes) -> bool:
+        """Write an encoded, newline-terminated line to the connection"""
         try:
-            self.conn.sendall((data + '\n').encode('utf-8'))
+            self.conn.sendall(payload)
             return True
         except Exception as e:
             print(f"Write error: {e}")
             return False
     
-    def generate_optimized_string(self, length: int, worker_id: int = 0) -> str:
-        """Generate optimized random string using worker-specific seeding"""
-        # Use worker_id and current time for better distribution
-        seed = (worker_id << 32) | int(time.time() * 1000000) % (2**32)
-        
-        # Fast random generation using secrets but with optimization
-        result = []
-        for _ in range(length):
-            # More efficient character selection
-            idx = (seed ^ secrets.randbits(16)) % self.char_count
-            result.append(self.valid_chars_list[idx])
-            seed = (seed * 1103515245 + 12345) & 0x7fffffff  # Linear congruential generator
-        
-        return ''.join(result)
-    
     def fast_sha1(self, data: str) -> str:
         """Optimized SHA1 computation"""
         return hashlib.sha1(data.encode('utf-8')).hexdigest()
     
-    def batch_pow_worker(self, authdata: str, difficulty: int, worker_id: int, 
-                        result_queue: queue.Queue, stop_event: threading.Event,
-                        batch_size: int = 10000) -> None:
+    def batch_pow_worker(self, authdata: str, difficulty: int, worker_id: int,
+                        control: ControlBlock, num_workers: int = 1) -> None:
         """Ultra-optimized batch proof-of-work worker"""
-        target = '0' * difficulty
-        target_len = len(target)
+        pin_to_cpu(self.placement.cpus[worker_id % len(self.placement.cpus)])
+        limit = difficulty_limit(difficulty)
         
-        # Pre-compile authdata as bytes for faster hashing
-        authdata_bytes = authdata.encode('utf-8')
+        # Absorb authdata once; each candidate copies the midstate. The
+        # hasher tree is local to this thread.
+        root = PrefixHasher(authdata)
         
-        # Local variables for speed
-        sha1 = hashlib.sha1
-        valid_chars = self.valid_chars_list
-        char_count = self.char_count
-        
-        # Worker-specific random state
-        local_random = secrets.SystemRandom()
+        # Worker-specific, disjoint slice of the nonce space at the planned suffix length
+        nonces = NonceEnumerator.partition(worker_id, num_workers, suffix_length(authdata, difficulty))
         
         iteration = 0
-        while not stop_event.is_set():
-            # Process in batches for better performance
-            for batch in range(batch_size):
-                # Generate suffix with varying length (4-12 chars for better distribution)
-                suffix_len = 4 + (iteration % 9)
-                
-                # Fast suffix generation
-                suffix = ''.join(valid_chars[local_random.randrange(char_count)] 
-                               for _ in range(suffix_len))
-                
+        for head, tails in nonces.blocks():
+            # Early termination check: a shared-memory read, no lock
+            if control.is_set():
+                return
+            
+            # Absorb the nonce head once, vary only the last character
+            new_hasher = root.extend(head).copy
+            
+            for tail in tails:
                 # Fast hash computation
-                hasher = sha1()
-                hasher.update(authdata_bytes)
-                hasher.update(suffix.encode('utf-8'))
-                cksum = hasher.hexdigest()
-                
-                # Quick prefix check (faster than startswith for short strings)
-                if cksum[:target_len] == target:
-                    if not stop_event.is_set():
-                        result_queue.put(suffix)
-                        stop_event.set()
-                    return
-                
-                iteration += 1
+                hasher = new_hasher()
+                hasher.update(tail)
+                digest = hasher.digest()
                 
-                # Early termination check
-                if iteration % 1000 == 0 and stop_event.is_set():
+                # Raw digest below the difficulty limit means enough leading zeros
+                if digest < limit:
+                    position = tails.index(tail) + 1
+                    control.add_hashes(worker_id, position)
+                    control.post_winner(worker_id, (head + tail).decode('ascii'), iteration + position)
                     return
             
-            # Brief pause to prevent CPU overload
-            if iteration % 100000 == 0:
-                time.sleep(0.001)
-    
-    def parallel_pow_worker(self, args: Tuple[str, int, int, int]) -> Optional[str]:
-        """Process-based proof-of-work worker for maximum parallelism"""
-        authdata, difficulty, worker_id, max_iterations = args
-        
-        target = '0' * difficulty
-        target_len = len(target)
-        authdata_bytes = authdata.encode('utf-8')
-        
-        # Use different random seeds per process
-        local_random = secrets.SystemRandom()
-        local_random.seed(worker_id * int(time.time()))
-        
-        valid_chars = self.valid_chars_list
-        char_count = self.char_count
-        sha1 = hashlib.sha1
-        
-        for iteration in range(max_iterations):
-            # Variable length suffix (4-16 chars)
-            suffix_len = 4 + (iteration % 13)
-            
-            # Generate suffix
-            suffix = ''.join(valid_chars[local_random.randrange(char_count)] 
-                           for _ in range(suffix_len))
-            
-            # Hash computation
-            hasher = sha1()
-            hasher.update(authdata_bytes)
-            hasher.update(suffix.encode('utf-8'))
-            cksum = hasher.hexdigest()
-            
-            # Check solution
-            if cksum[:target_len] == target:
-                return suffix
-        
-        return None
+            # Per-thread counter slot, never contended
+            iteration += len(tails)
+            control.add_hashes(worker_id, len(tails))
     
     def solve_proof_of_work_hybrid(self, authdata: str, difficulty: int) -> Optional[str]:
         """Hybrid proof-of-work solver using both threads and processes"""
@@ -213,7 +191,7 @@ class UltraOptimizedTLSClient:
         difficulty_int = int(difficulty)
         
         # Estimate complexity and choose strategy
-        if difficulty_int <= 5:
+        if difficulty_int <= self.tuning.single_process_max_difficulty:
             # Use thread-based approach for lower difficulty
             return self.solve_proof_of_work_threaded(authdata, difficulty_int)
         else:
@@ -222,18 +200,21 @@ class UltraOptimizedTLSClient:
     
     def solve_proof_of_work_threaded(self, authdata: str, difficulty: int) -> Optional[str]:
         """Thread-based proof-of-work solver"""
-        # Use more threads for better parallelism
-        cpu_count = multiprocessing.cpu_count()
-        num_threads = min(cpu_count * 2, 32)  # Up to 32 threads
+        if gil_enabled():
+            # Threads serialise on the GIL; the process pool scales instead
+            print("GIL enabled, routing threaded proof-of-work to worker processes")
+            return self.solve_proof_of_work_multiprocess(authdata, difficulty)
         
-        result_queue = queue.Queue()
-        stop_event = threading.Event()
+        # Free-threaded interpreter: one thread per core runs truly in parallel
+        num_threads = self.tuning.threads
+        control = ControlBlock(num_threads)
+        self.metrics.attach(control.worker_hashes)
         
         threads = []
         for i in range(num_threads):
             thread = threading.Thread(
                 target=self.batch_pow_worker,
-                args=(authdata, difficulty, i, result_queue, stop_event, 50000)
+                args=(authdata, difficulty, i, control, num_threads)
             )
             thread.daemon = True
             threads.append(thread)
@@ -242,201 +223,316 @@ class UltraOptimizedTLSClient:
         for thread in threads:
             thread.start()
         
-        # Wait for result with timeout
-        timeout = 14400  # 4 hour timeout
+        # Wait for a result until the POW deadline, or until it is hopeless
+        planner = self.deadline_planner(difficulty)
+        planner.begin()
         start_time = time.time()
         
-        while time.time() - start_time < timeout:
-            try:
-                result = result_queue.get(timeout=1)
-                stop_event.set()
-                
-                # Wait for threads to finish
-                for thread in threads:
-                    thread.join(timeout=1)
-                
-                elapsed = time.time() - start_time
-                print(f"Proof-of-work solved in {elapsed:.2f} seconds (threaded)")
-                return result
-                
-            except queue.Empty:
-                if stop_event.is_set():
-                    break
-                continue
+        # The winner's post wakes the wait at once; the timeout only paces progress checks
+        while not control.wait(PROGRESS_INTERVAL):
+            if not planner.check(control.total_hashes()):
+                break
+        control.set()
+        
+        # Wait for threads to finish
+        for thread in threads:
+            thread.join(timeout=1)
+        
+        winner = control.winner()
+        if winner:
+            self.metrics.mark_found(control.found_at())
+            elapsed = time.time() - start_time
+            print(f"Proof-of-work solved in {elapsed:.2f} seconds, "
+                  f"{control.total_hashes():,} hashes (threaded)")
+            return winner[0]
         
-        stop_event.set()
         print("Proof-of-work timeout (threaded)")
         return None
     
+    def start_pow_pool(self, start_method: str = None) -> PowWorkerPool:
+        """Start the persistent worker pool once; later challenges reuse it"""
+        # The pre-warm thread may be starting it right now; wait and attach
+        with self.pow_pool_lock:
+            if self.pow_pool is None:
+                self.pow_pool = PowWorkerPool(backend=self.backend, chunk_size=self.tuning.chunk_size,
+                                              start_method=start_method, placement=self.placement)
+            if not self.pow_pool.started:
+                self.pow_pool.start()
+                if self.backend in (None, 'auto'):
+                    print(f"PoW backend calibration:\n{calibration_report()}")
+                print(f"Started {self.pow_pool.num_workers} PoW worker processes "
+                      f"(backend: {self.pow_pool.backend}, start method: {self.pow_pool.start_method})")
+                print(f"Worker placement: {self.placement.describe()}")
+            return self.pow_pool
+    
+    def stop_pow_pool(self) -> None:
+        """Shut down the persistent worker pool"""
+        with self.pow_pool_lock:
+            if self.pow_pool is not None:
+                self.pow_pool.close()
+                self.pow_pool = None
+    
+    def prewarm_pow_pool(self) -> None:
+        """Start the worker pool in the background during connect and HELO.
+
+        Process creation, imports and JIT warm-up then overlap with network
+        round-trips instead of following the POW line. The workers park on
+        the pool's job event until a challenge is published.
+        """
+        def warm():
+            # The protocol thread keeps running, so fork() is not safe here
+            pool = self.start_pow_pool(start_method=choose_start_method(threads_running=True))
+            pool.wait_ready()
+        
+        threading.Thread(target=warm, daemon=True).start()
+    
+    def report_prewarm(self, pow_at: float) -> None:
+        """Print how much pool start-up the pre-warm moved off the POW path"""
+        pool = self.pow_pool
+        if pool is None or pool.started_at is None or self.prewarm_reported:
+            return
+        self.prewarm_reported = True
+        ready_at = pool.ready_at
+        overlapped = (min(ready_at or pow_at, pow_at) - pool.started_at) * 1000
+        if ready_at is None:
+            print(f"PoW pool pre-warm ({pool.start_method}): {overlapped:.0f} ms overlapped "
+                  f"with connect/HELO, workers still warming up")
+        else:
+            remaining = max(0.0, ready_at - pow_at) * 1000
+            print(f"PoW pool pre-warm ({pool.start_method}): ready in "
+                  f"{(ready_at - pool.started_at) * 1000:.0f} ms, {overlapped:.0f} ms saved on the "
+                  f"POW path, {remaining:.0f} ms left")
+    
+    def profile_pow(self, attempts: int = DEFAULT_PROFILE_ATTEMPTS) -> None:
+        """Run the pool's backend for a fixed attempt count in the pool's
+        worker layout and print the per-stage time breakdown"""
+        report = run_profile(self.backend, attempts=attempts, chunk_size=self.tuning.chunk_size,
+                             placement=self.placement)
+        print(report.describe())
+    
     def solve_proof_of_work_multiprocess(self, authdata: str, difficulty: int) -> Optional[str]:
         """Process-based proof-of-work solver for maximum performance"""
-        cpu_count = multiprocessing.cpu_count()
-        num_processes = cpu_count
-        print(f"Using {num_processes} processes for proof-of-work")
-        
-        # Distribute work among processes
-        iterations_per_process = 1000000  # 1M iterations per process
-        print(f"Using {iterations_per_process} iterations per process for proof-of-work")
-        
-        # Create process pool
-        with ProcessPoolExecutor(max_workers=num_processes) as executor:
-            # Submit tasks
-            futures = []
-            for i in range(num_processes):
-                args = (authdata, difficulty, i, iterations_per_process)
-                future = executor.submit(self.parallel_pow_worker, args)
-                futures.append(future)
-            
-            # Wait for first result
-            start_time = time.time()
-            timeout = 14400  # 4 hour timeout
-            
-            try:
-                for future in as_completed(futures, timeout=timeout):
-                    result = future.result()
-                    if result:
-                        # Cancel remaining tasks
-                        for f in futures:
-                            f.cancel()
-                        
-                        elapsed = time.time() - start_time
-                        print(f"Proof-of-work solved in {elapsed:.2f} seconds (multiprocess)")
-                        return result
-                
-            except Exception as e:
-                print(f"Process execution error: {e}")
+        # Workers are forked once and fed each challenge through shared memory
+        pool = self.start_pow_pool()
+        print(f"Using {pool.num_workers} processes for proof-of-work")
+        
+        planner = self.deadline_planner(difficulty)
+        planner.begin(calibration_results().get(pool.backend, 0.0) * pool.num_workers or None)
+        start_time = time.time()
+        
+        self.metrics.attach(pool.worker_hashes)
+        try:
+            result = pool.solve(authdata, difficulty, timeout=planner.timeout(), progress=planner.check,
+                                cancel_event=self.pow_cancel)
+            if result:
+                self.metrics.mark_found(pool.found_at())
+                elapsed = time.time() - start_time
+                print(f"Proof-of-work solved in {elapsed:.2f} seconds (multiprocess)")
+                return result
+        
+        except Exception as e:
+            print(f"Process execution error: {e}")
         
         print("Proof-of-work timeout (multiprocess)")
         return None
     
+    def solve_proof_of_work_cluster(self, authdata: str, difficulty: int) -> Optional[str]:
+        """Distributed solver: remote agents plus the local pool take nonce-range leases"""
+        # The local pool joins as one more agent; the TLS connection stays in
+        # this thread, the coordinator only talks to agents
+        self.cluster.start_local_agent(self.start_pow_pool())
+        print(f"Using PoW cluster with {self.cluster.agent_count} agents")
+        
+        planner = self.deadline_planner(difficulty)
+        planner.begin(self.cluster.aggregate_rate() or None)
+        self.metrics.attach(self.cluster.agent_hashes)
+        start_time = time.time()
+        result = self.cluster.solve(authdata, difficulty, timeout=planner.timeout(), progress=planner.check)
+        if result:
+            self.metrics.mark_found(self.cluster.found_at)
+            elapsed = time.time() - start_time
+            print(f"Proof-of-work solved in {elapsed:.2f} seconds (cluster)")
+            return result
+        
+        print("Proof-of-work timeout (cluster)")
+        return None
+    
+    def deadline_planner(self, difficulty: int) -> DeadlinePlanner:
+        """Planner for the challenge being solved; fallbacks share it"""
+        if self.planner is None or self.planner.difficulty != int(difficulty):
+            self.planner = DeadlinePlanner(difficulty, started=self.pow_received_at)
+            # cancel_pow() may have run before this planner existed
+            if self.pow_cancel.is_set():
+                self.planner.cancel()
+        return self.planner
+    
     def solve_proof_of_work(self, authdata: str, difficulty: str) -> Optional[str]:
         """Main proof-of-work solver with adaptive strategy"""
+        self.planner = None
         try:
             difficulty_int = int(difficulty)
-            
-            # Choose optimal strategy based on difficulty
-            if difficulty_int <= 3:
-                # Very low difficulty - use simple approach
-                return self.solve_proof_of_work_simple(authdata, difficulty_int)
-            elif difficulty_int <= 5:
-                # Medium difficulty - use threaded approach
-                return self.solve_proof_of_work_threaded(authdata, difficulty_int)
-            else:
-                # High difficulty - use multiprocess approach
-                return self.solve_proof_of_work_multiprocess(authdata, difficulty_int)
-                
         except ValueError:
             print(f"Invalid difficulty value: {difficulty}")
             return None
+        
+        self.metrics.begin_solve(difficulty_int)
+        result = None
+        try:
+            result = self.solve_proof_of_work_adaptive(authdata, difficulty_int)
+            return result
+        finally:
+            self.metrics.end_solve(result is not None)
+    
+    def solve_proof_of_work_adaptive(self, authdata: str, difficulty_int: int) -> Optional[str]:
+        """Pick the solver for this difficulty"""
+        # Choose optimal strategy based on difficulty; crossovers come
+        # from the tuning profile
+        if difficulty_int <= self.tuning.simple_max_difficulty:
+            # Very low difficulty - use simple approach
+            return self.solve_proof_of_work_simple(authdata, difficulty_int)
+        elif difficulty_int <= self.tuning.single_process_max_difficulty:
+            # Medium difficulty - a batched backend (NumPy, Numba) runs
+            # single-process, otherwise the threaded hashlib approach
+            backend = self.pow_backend(authdata, difficulty_int)
+            if backend.batched:
+                return self.solve_proof_of_work_backend(authdata, difficulty_int, backend)
+            return self.solve_proof_of_work_threaded(authdata, difficulty_int)
+        elif self.cluster is not None and self.cluster.agent_count:
+            # High difficulty with remote agents connected - distribute
+            return self.solve_proof_of_work_cluster(authdata, difficulty_int)
+        else:
+            # High difficulty - use multiprocess approach
+            return self.solve_proof_of_work_multiprocess(authdata, difficulty_int)
+    
+    def pow_backend(self, authdata: str, difficulty: int):
+        """Resolve the configured PoW backend for this challenge"""
+        length = suffix_length(authdata, difficulty)
+        if self.backend in (None, 'auto'):
+            backend = select_backend('auto', authdata, length)
+            print(f"PoW backend calibration:\n{calibration_report()}")
+        else:
+            backend = get_backend(self.backend)
+            if not backend.supports(authdata, length):
+                print(f"PoW backend {backend.name} cannot handle this challenge, using midstate")
+                backend = get_backend('midstate')
+        print(f"Using PoW backend: {backend.name}")
+        return backend
+    
+    def solve_proof_of_work_backend(self, authdata: str, difficulty: int, backend) -> Optional[str]:
+        """Single-process proof-of-work solver using one registered backend"""
+        planner = self.deadline_planner(difficulty)
+        planner.begin(calibration_results().get(backend.name))
+        start_time = time.time()
+        
+        # Search in chunks so the deadline, hopelessness and cancel_pow()
+        # are checked between them
+        length = suffix_length(authdata, difficulty)
+        space = NONCE_BASE ** length
+        chunk = self.tuning.chunk_size
+        attempts = 0
+        for start in range(0, space, chunk):
+            result, searched = backend.search(authdata, difficulty,
+                                              NonceEnumerator(start, min(start + chunk, space), length))
+            attempts += searched
+            self.metrics.add_attempts(searched)
+            if result:
+                elapsed = time.time() - start_time
+                print(f"Proof-of-work solved in {elapsed:.2f} seconds, {attempts} attempts ({backend.name})")
+                return result
+            if not planner.check(attempts):
+                break
+        
+        print(f"Proof-of-work timeout ({backend.name})")
+        return None
     
     def solve_proof_of_work_simple(self, authdata: str, difficulty: int) -> Optional[str]:
         """Simple proof-of-work solver for very low difficulty"""
-        target = '0' * difficulty
-        target_len = len(target)
-        authdata_bytes = authdata.encode('utf-8')
-        
-        sha1 = hashlib.sha1
-        valid_chars = self.valid_chars_list
-        char_count = self.char_count
-        
-        for iteration in range(1000000):  # 1M iterations max
-            # Generate suffix
-            suffix_len = 4 + (iteration % 8)
-            suffix = ''.join(valid_chars[secrets.randbelow(char_count)] 
-                           for _ in range(suffix_len))
-            
-            # Hash and check
-            hasher = sha1()
-            hasher.update(authdata_bytes)
-            hasher.update(suffix.encode('utf-8'))
-            cksum = hasher.hexdigest()
-            
-            if cksum[:target_len] == target:
-                print(f"Proof-of-work solved in {iteration + 1} iterations (simple)")
-                return suffix
-        
+        length = suffix_length(authdata, difficulty)
+        nonces = NonceEnumerator(0, min(SIMPLE_MAX_ATTEMPTS, NONCE_BASE ** length), length)
+        result, iteration = midstate_search(authdata, difficulty, nonces)
+        self.metrics.add_attempts(iteration)
+        if result:
+            print(f"Proof-of-work solved in {iteration} iterations (simple)")
+            return result
         print("Proof-of-work timeout (simple)")
         return None
     
-    def create_authenticated_response(self, nonce, data):
-        """Create authenticated response with SHA1 hash"""
-        return self.fast_sha1(self.authdata + nonce) + " " + data
+    def start_pow(self, args) -> str:
+        """Record the POW challenge and print the plan; returns the difficulty"""
+        pow_at = time.perf_counter()
+        self.pow_received_at = time.time()
+        self.pow_cancel = threading.Event()
+        self.authdata = args[1]
+        self.responses.set_authdata(self.authdata)
+        difficulty = args[2]
+        print(f"Starting proof-of-work with difficulty {difficulty}")
+        self.report_prewarm(pow_at)
+        print(f"Suffix plan: {plan_suffix(self.authdata, difficulty).describe()}")
+        return difficulty
     
-    def handle_command(self, args):
-        """Handle server commands"""
+    def report_pow_sent(self, solution: str) -> None:
+        """Print the solution and its found-to-sent latency once it was written"""
+        found_to_sent = self.metrics.observe_sent()
+        print(f"Found solution: {solution[:20]}...")
+        if found_to_sent is not None:
+            print(f"Found-to-sent: {found_to_sent * 1000:.3f} ms")
+    
+    def cancel_pow(self) -> None:
+        """Abandon the running solve from another thread, e.g. after the server hung up"""
+        # Set first: a planner or pool job created after this point sees the flag
+        self.pow_cancel.set()
+        if self.planner is not None:
+            self.planner.cancel()
+        pool = self.pow_pool
+        if pool is not None:
+            pool.cancel()
+    
+    def command_response(self, args) -> Optional[bytes]:
+        """Encoded line answering a server command other than POW; None ends the session"""
         cmd = args[0]
         
-        if cmd == "HELO":
-            return self.write_line("TOAKUEI")
-        
-        elif cmd == "ERROR":
+        if cmd == "ERROR":
             print("ERROR: " + " ".join(args[1:]))
-            return False
+            return None
         
-        elif cmd == "POW":
-            self.authdata = args[1]
-            difficulty = args[2]
-            print(f"Starting proof-of-work with difficulty {difficulty}")
-            
+        if cmd == "END":
+            print("Data submission confirmed")
+        
+        response = self.responses.answer(args)
+        if response is None:
+            print(f"Unknown command: {cmd}")
+        return response
+    
+    def handle_command(self, args):
+        """Handle server commands"""
+        if args[0] == "POW":
+            difficulty = self.start_pow(args)
             solution = self.solve_proof_of_work(self.authdata, difficulty)
+            self.pow_received_at = None
             if solution:
-                print(f"Found solution: {solution[:20]}...")
-                return self.write_line(solution)
+                # Write first: printing is not on the found-to-sent path
+                sent = self.write_line(solution)
+                self.report_pow_sent(solution)
+                return sent
             else:
                 print("Failed to solve proof-of-work within time limit")
                 return False
         
-        elif cmd == "END":
-            print("Data submission confirmed")
-            return self.write_line("OK")
-        
-        elif cmd == "NAME":
-            response = self.create_authenticated_response(args[1], self.personal_info['name'])
-            return self.write_line(response)
-        
-        elif cmd == "MAILNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['emails'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("MAIL"):
-            mail_idx = int(cmd[4:]) - 1
-            if mail_idx < len(self.personal_info['emails']):
-                email = self.personal_info['emails'][mail_idx]
-                response = self.create_authenticated_response(args[1], email)
-                return self.write_line(response)
-            return False
-        
-        elif cmd == "SKYPE":
-            response = self.create_authenticated_response(args[1], self.personal_info['skype'])
-            return self.write_line(response)
-        
-        elif cmd == "BIRTHDATE":
-            response = self.create_authenticated_response(args[1], self.personal_info['birthdate'])
-            return self.write_line(response)
-        
-        elif cmd == "COUNTRY":
-            response = self.create_authenticated_response(args[1], self.personal_info['country'])
-            return self.write_line(response)
-        
-        elif cmd == "ADDRNUM":
-            response = self.create_authenticated_response(args[1], str(len(self.personal_info['address_lines'])))
-            return self.write_line(response)
-        
-        elif cmd.startswith("ADDRLINE"):
-            addr_idx = int(cmd[8:]) - 1
-            if addr_idx < len(self.personal_info['address_lines']):
-                addr_line = self.personal_info['address_lines'][addr_idx]
-                response = self.create_authenticated_response(args[1], addr_line)
-                return self.write_line(response)
-            return False
-        
-        else:
-            print(f"Unknown command: {cmd}")
-            return False
+        response = self.command_response(args)
+        return response is not None and self.write_bytes(response)
     
     def run(self):
         """Main protocol loop"""
+        # The protocol loop gets its own CPU when one is reserved; threads
+        # and processes started from here re-pin themselves
+        if pin_to_cpu(self.placement.protocol_cpu):
+            print(f"Protocol loop pinned to CPU {self.placement.protocol_cpu}")
+        
+        # Worker start-up overlaps the TCP connect, TLS handshake and HELO
+        self.completed = False
+        self.prewarm_pow_pool()
         if not self.tls_connect():
+            self.stop_pow_pool()
             return False
         
         try:
@@ -448,14 +544,18 @@ class UltraOptimizedTLSClient:
                     print("Connection closed by server")
                     break
                 
+                received = time.perf_counter()
                 print(f"Received: {line}")
                 args = line.split(' ')
                 
-                if not self.handle_command(args):
+                handled = self.handle_command(args)
+                self.metrics.observe_command(args[0], time.perf_counter() - received)
+                if not handled:
                     break
                 
                 if args[0] == "END":
                     print("Protocol completed successfully")
+                    self.completed = True
                     break
             
             return True
@@ -465,14 +565,17 @@ class UltraOptimizedTLSClient:
             return False
         
         finally:
+            self.stop_pow_pool()
             if self.conn:
+                # The session (and a TLS 1.3 ticket) is complete once data was read
+                self.tls_cache.remember(self.host, self.port, self.conn)
                 self.conn.close()
                 print("Connection closed")
 
 # Alias for backward compatibility
 OptimizedTLSClient = UltraOptimizedTLSClient
 
-def main():
+def main(client_class=UltraOptimizedTLSClient):
     """Main function with command line argument support"""
     import argparse
     
@@ -482,13 +585,50 @@ def main():
     parser.add_argument('--cert', help='Client certificate file path')
     parser.add_argument('--key', help='Client private key file path')
     parser.add_argument('--benchmark', action='store_true', help='Run proof-of-work benchmark')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time the stages of the pool worker loop in the pool worker layout')
+    parser.add_argument('--profile-attempts', type=int, default=DEFAULT_PROFILE_ATTEMPTS,
+                        help='Attempts per worker in --profile mode')
+    parser.add_argument('--backend', default='auto', choices=['auto'] + available_backends(),
+                        help='PoW hash backend (default: tuned, else fastest by start-up calibration)')
+    parser.add_argument('--tune', action='store_true', help='Measure this host and write the tuning profile')
+    parser.add_argument('--tuning-file', default=None, help='Tuning profile path')
+    parser.add_argument('--reserve-cpu', action='store_true',
+                        help='Keep one CPU for the TLS/protocol loop; PoW workers are pinned to the rest')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-textfile', default=None,
+                        help='Write Prometheus metrics to a node-exporter textfile (*.prom)')
+    parser.add_argument('--cluster-listen', metavar='HOST[:PORT]',
+                        help='Accept pow_cluster.py agents and distribute high-difficulty PoW to them')
+    parser.add_argument('--race', action='store_true',
+                        help='Race TLS handshakes on all server ports and keep the first to finish')
+    parser.add_argument('--ports', type=int, nargs='+', default=None,
+                        help='Ports for --race (default: the six server ports)')
+    parser.add_argument('--port-stats', default=None, help='Port latency/failure history file for --race')
+    parser.add_argument('--retries', type=int, default=0,
+                        help='Reconnect up to N times after ERROR or a dropped connection, resuming the TLS session')
     
     args = parser.parse_args()
     
+    # Tuning mode
+    if args.tune:
+        tune_and_save(args.tuning_file)
+        return
+    
+    tuning = load_profile(args.tuning_file)
+    print(f"Tuning: {tuning.describe()}")
+    
+    # Profile mode
+    if args.profile:
+        client = client_class(backend=args.backend, tuning=tuning, reserve_cpu=args.reserve_cpu)
+        client.profile_pow(args.profile_attempts)
+        return
+    
     # Benchmark mode
     if args.benchmark:
         print("Running proof-of-work benchmark...")
-        client = UltraOptimizedTLSClient()
+        client = client_class(backend=args.backend, tuning=tuning)
         
         for difficulty in range(1, 7):
             print(f"\nTesting difficulty {difficulty}...")
@@ -501,21 +641,52 @@ def main():
             else:
                 print(f"Difficulty {difficulty}: TIMEOUT")
         
+        client.stop_pow_pool()
         return
     
+    # Agents can join before the POW command arrives
+    cluster = None
+    if args.cluster_listen:
+        cluster = PowCoordinator(*parse_address(args.cluster_listen)).start()
+    
+    # --race / --ports: race the TLS handshakes, historically fastest port first
+    ports = race_ports(args.port, args.ports) if args.race or args.ports else None
+    
     # Normal client mode
-    client = UltraOptimizedTLSClient(
+    client = client_class(
         host=args.host,
         port=args.port,
         cert_path=args.cert,
-        key_path=args.key
+        key_path=args.key,
+        backend=args.backend,
+        tuning=tuning,
+        cluster=cluster,
+        reserve_cpu=args.reserve_cpu,
+        ports=ports,
+        port_stats=PortStats.load(args.port_stats) if ports else None
     )
     
     print("=== Ultra-Optimized TLS Protocol Client ===")
-    print(f"Connecting to {args.host}:{args.port}")
-    print(f"CPU cores available: {multiprocessing.cpu_count()}")
+    if ports:
+        order = client.port_stats.order(args.host, ports)
+        print(f"Connecting to {args.host}, racing ports {', '.join(map(str, order))}")
+    else:
+        print(f"Connecting to {args.host}:{args.port}")
+    print(f"CPU cores available: {available_cpu_count()}")
+    
+    exporters = start_exporters(client.metrics, args.metrics_port, args.metrics_textfile)
+    success = client.run()
+    for retry in range(1, args.retries + 1):
+        if client.completed:
+            break
+        print(f"Reconnecting ({retry}/{args.retries})...")
+        success = client.run()
+    if cluster is not None:
+        cluster.close()
+    for exporter in exporters:
+        exporter.close()
     
-    if client.run():
+    if success:
         print("Client completed successfully")
         sys.exit(0)
     else:
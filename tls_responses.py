@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Protocol Response Table
+Pre-encoded answers to the personal-data commands and the authdata midstate.
+"""
+
+import hashlib
+import time
+from binascii import hexlify
+from typing import Dict, List, Optional
+
+# Answers that do not depend on the challenge
+STATIC_RESPONSES = {
+    'HELO': b'TOAKUEI\n',
+    'END': b'OK\n',
+}
+
+
+class ResponseTable:
+    """Command -> response bytes, compiled once from ``personal_info``.
+
+    Every authenticated command maps to ``b' ' + value + b'\\n'`` with the
+    value already UTF-8 encoded; ``MAIL<n>`` and ``ADDRLINE<n>`` get one
+    entry per index, so dispatch is a single dict lookup with no prefix
+    tests or index parsing. The SHA-1 state of the authdata is absorbed
+    once per POW, and each answer copies it, adds the nonce and joins the
+    hex digest with the value, without any string formatting.
+    """
+
+    def __init__(self, personal_info: dict):
+        values = {
+            'NAME': personal_info['name'],
+            'MAILNUM': str(len(personal_info['emails'])),
+            'SKYPE': personal_info['skype'],
+            'BIRTHDATE': personal_info['birthdate'],
+            'COUNTRY': personal_info['country'],
+            'ADDRNUM': str(len(personal_info['address_lines'])),
+        }
+        for i, email in enumerate(personal_info['emails'], 1):
+            values[f'MAIL{i}'] = email
+        for i, line in enumerate(personal_info['address_lines'], 1):
+            values[f'ADDRLINE{i}'] = line
+        self.tails: Dict[str, bytes] = {cmd: b' ' + value.encode('utf-8') + b'\n'
+                                        for cmd, value in values.items()}
+        self.midstate = hashlib.sha1()
+
+    def set_authdata(self, authdata: str) -> None:
+        """Absorb the challenge's authdata; call once when POW arrives"""
+        self.midstate = hashlib.sha1(authdata.encode('utf-8'))
+
+    def authenticate(self, nonce: str, tail: bytes) -> bytes:
+        """``hex(SHA1(authdata + nonce)) + tail``"""
+        hasher = self.midstate.copy()
+        hasher.update(nonce.encode('utf-8'))
+        return hexlify(hasher.digest()) + tail
+
+    def answer(self, args: List[str]) -> Optional[bytes]:
+        """Encoded response line for a command other than POW/ERROR, None if unknown"""
+        cmd = args[0]
+        static = STATIC_RESPONSES.get(cmd)
+        if static is not None:
+            return static
+        tail = self.tails.get(cmd)
+        if tail is None:
+            return None
+        return self.authenticate(args[1], tail)
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Protocol Response Table')
+    parser.add_argument('--rounds', type=int, default=100000, help='Responses per command set')
+
+    args = parser.parse_args()
+
+    personal_info = {
+        'name': 'Jane Example',
+        'emails': ['jane@example.com', 'jane.example@example.org'],
+        'skype': 'N/A',
+        'birthdate': '01.01.1990',
+        'country': 'Nowhere',
+        'address_lines': ['1 Example Street', 'Example City', '00000'],
+    }
+    authdata = 'A' * 64
+    nonce = 'Q' * 32
+    table = ResponseTable(personal_info)
+    table.set_authdata(authdata)
+    commands = list(table.tails)
+
+    def chained(cmd):
+        # The clients' previous path: prefix tests, index parsing, full rehash
+        if cmd == 'NAME':
+            value = personal_info['name']
+        elif cmd == 'MAILNUM':
+            value = str(len(personal_info['emails']))
+        elif cmd.startswith('MAIL'):
+            value = personal_info['emails'][int(cmd[4:]) - 1]
+        elif cmd == 'SKYPE':
+            value = personal_info['skype']
+        elif cmd == 'BIRTHDATE':
+            value = personal_info['birthdate']
+        elif cmd == 'COUNTRY':
+            value = personal_info['country']
+        elif cmd == 'ADDRNUM':
+            value = str(len(personal_info['address_lines']))
+        else:
+            value = personal_info['address_lines'][int(cmd[8:]) - 1]
+        response = hashlib.sha1((authdata + nonce).encode('utf-8')).hexdigest() + " " + value
+        return (response + '\n').encode('utf-8')
+
+    for cmd in commands:
+        if table.answer([cmd, nonce]) != chained(cmd):
+            raise RuntimeError(f"Responses differ for {cmd}")
+
+    lines = [[cmd, nonce] for cmd in commands]
+    timings = {}
+    for name, respond in (('if/elif chain', lambda line: chained(line[0])),
+                          ('ResponseTable', table.answer)):
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for line in lines:
+                respond(line)
+        timings[name] = time.perf_counter() - started
+    count = args.rounds * len(commands)
+    for name, seconds in timings.items():
+        print(f"{name:<14} {seconds / count * 1e9:8.0f} ns/response")
+    print(f"speed-up {timings['if/elif chain'] / timings['ResponseTable']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+TLS Context and Session Cache
+One client SSLContext per certificate and options, with sessions kept for resumption.
+"""
+
+import os
+import socket
+import ssl
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class CachedContext:
+    """A client ``SSLContext`` and the TLS sessions it negotiated.
+
+    OpenSSL only resumes a session on the context that created it, so the
+    sessions live next to the context, one per ``(host, port)``. Store one
+    with ``remember()`` before closing a connection: under TLS 1.3 the
+    server sends its session ticket after the handshake, so the session
+    becomes resumable only once some application data has been read.
+    """
+
+    def __init__(self, context: ssl.SSLContext):
+        self.context = context
+        self.sessions: Dict[Tuple[str, int], ssl.SSLSession] = {}
+        self.lock = threading.Lock()
+
+    def session(self, host: str, port: int) -> Optional[ssl.SSLSession]:
+        """The stored session for ``host:port``, None when missing or expired"""
+        with self.lock:
+            session = self.sessions.get((host, port))
+            if session is not None and session.time + session.timeout <= time.time():
+                del self.sessions[(host, port)]
+                session = None
+        return session
+
+    def remember(self, host: str, port: int, conn) -> None:
+        """Keep the session of ``conn`` (SSLSocket or SSLObject) for the next connect"""
+        try:
+            session = conn.session
+        except (AttributeError, ValueError, OSError):
+            return
+        if session is not None and (session.has_ticket or session.id):
+            with self.lock:
+                self.sessions[(host, port)] = session
+
+    def forget(self, host: str, port: int) -> None:
+        with self.lock:
+            self.sessions.pop((host, port), None)
+
+    def wrap_socket(self, sock: socket.socket, host: str, port: int, **kwargs) -> ssl.SSLSocket:
+        """``context.wrap_socket`` offering the stored session for ``host:port``"""
+        return self.context.wrap_socket(sock, server_hostname=host,
+                                        session=self.session(host, port), **kwargs)
+
+
+_contexts: Dict[tuple, CachedContext] = {}
+_contexts_lock = threading.Lock()
+
+
+def _file_stamp(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    """(mtime, size) of ``path`` so a replaced certificate is loaded again"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def client_context(cert_path: str = None, key_path: str = None, verify: bool = False) -> CachedContext:
+    """Process-wide client context for (certificate, key, options).
+
+    The PEM files are parsed once; later calls with the same arguments
+    return the same ``CachedContext`` and with it the stored sessions.
+    ``verify=False`` matches the clients' unverified server certificate.
+    """
+    cert_path = os.path.abspath(cert_path) if cert_path and key_path else None
+    key_path = os.path.abspath(key_path) if cert_path else None
+    key = (cert_path, key_path, verify, _file_stamp(cert_path), _file_stamp(key_path))
+    with _contexts_lock:
+        cached = _contexts.get(key)
+        if cached is None:
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            if cert_path:
+                context.load_cert_chain(cert_path, key_path)
+            cached = _contexts[key] = CachedContext(context)
+    return cached
+
+
+def clear_contexts() -> None:
+    """Drop every cached context and its sessions"""
+    with _contexts_lock:
+        _contexts.clear()
+
+
+def session_reused(conn) -> bool:
+    """True when ``conn`` (SSLSocket or SSLObject) resumed a previous session"""
+    try:
+        return bool(conn.session_reused)
+    except (AttributeError, ValueError, OSError):
+        return False
+
+
+def _fresh_context(cert_path: str, key_path: str) -> ssl.SSLContext:
+    """The clients' previous per-connect context"""
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+def _serve(listener: socket.socket, context: ssl.SSLContext, count: int) -> None:
+    """Accept ``count`` TLS connections and greet each with one line"""
+    for _ in range(count):
+        sock, _ = listener.accept()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            with context.wrap_socket(sock, server_side=True) as conn:
+                conn.sendall(b'HELO\n')
+                conn.recv(1)
+        except (OSError, ssl.SSLError):
+            pass
+
+
+def main():
+    """Main function with command line argument support"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TLS Context and Session Cache benchmark')
+    parser.add_argument('--cert', required=True, help='Certificate used by the loopback server and client')
+    parser.add_argument('--key', required=True, help='Private key for --cert')
+    parser.add_argument('--connections', type=int, default=200, help='Connections per mode')
+
+    args = parser.parse_args()
+
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(args.cert, args.key)
+
+    def tcp(port):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def fresh(port):
+        sock = tcp(port)
+        return _fresh_context(args.cert, args.key).wrap_socket(sock, server_hostname='127.0.0.1')
+
+    def cached(port):
+        sock = tcp(port)
+        return client_context(args.cert, args.key).context.wrap_socket(sock, server_hostname='127.0.0.1')
+
+    def resumed(port):
+        sock = tcp(port)
+        return client_context(args.cert, args.key).wrap_socket(sock, '127.0.0.1', port)
+
+    print(f"Loopback TLS, {args.connections} connections per mode (connect, handshake, read one line)")
+    results = {}
+    for name, connect in (('fresh context', fresh), ('cached context', cached),
+                          ('cached + session', resumed)):
+        clear_contexts()
+        listener = socket.create_server(('127.0.0.1', 0))
+        port = listener.getsockname()[1]
+        server = threading.Thread(target=_serve, args=(listener, server_context, args.connections), daemon=True)
+        server.start()
+        reused = 0
+        started = time.perf_counter()
+        for _ in range(args.connections):
+            conn = connect(port)
+            conn.recv(64)
+            reused += session_reused(conn)
+            client_context(args.cert, args.key).remember('127.0.0.1', port, conn)
+            conn.sendall(b'\n')
+            conn.close()
+        results[name] = time.perf_counter() - started
+        server.join()
+        listener.close()
+        print(f"  {name:<17} {results[name] / args.connections * 1000:7.3f} ms/connection  "
+              f"{reused}/{args.connections} resumed")
+    print(f"speed-up {results['fresh context'] / results['cached + session']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()